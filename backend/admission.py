@@ -0,0 +1,228 @@
+import asyncio
+import os
+import socket
+import uuid
+from contextlib import asynccontextmanager, suppress
+from datetime import datetime, timedelta, timezone
+
+from fastapi import HTTPException
+
+# Heavy reads (whole-collection streams) running at once per worker
+HEAVY_READ_LIMIT = int(os.getenv("HEAVY_READ_LIMIT", "4"))
+# Requests allowed to wait for a slot before new ones are shed with 429
+HEAVY_READ_QUEUE = int(os.getenv("HEAVY_READ_QUEUE", "32"))
+# Longest a request waits for a slot before giving up with 429
+QUEUE_TIMEOUT = 10.0
+# Model jobs (train / batch predict) allowed to wait behind the running one
+MAX_PENDING_JOBS = 2
+# Shared claim on "a model job is running", so workers don't overlap; the
+# holder renews it while the job runs, a crashed one frees it on expiry
+JOB_LEASES = "job_leases"
+JOB_LEASE_SECONDS = 60
+# Released leases older than this are deleted
+JOB_LEASE_RETENTION = timedelta(days=1)
+RETRY_AFTER_SECONDS = 2
+
+
+def _too_busy(detail):
+    return HTTPException(429, detail, headers={"Retry-After": str(RETRY_AFTER_SECONDS)})
+
+
+# -------------------------------------------------
+# SINGLE-FLIGHT
+# -------------------------------------------------
+class SingleFlight:
+    """Concurrent calls with the same key share one computation.
+
+    The first caller starts `fn()` as a task; everyone arriving while it runs
+    awaits the same task and gets the same result (or exception). Nothing is
+    kept once it finishes, so this never serves stale data.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+
+    @property
+    def inflight(self):
+        return len(self._inflight)
+
+    async def do(self, key, fn):
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # one caller disconnecting must not cancel the others' result
+        return await asyncio.shield(task)
+
+
+# -------------------------------------------------
+# CONCURRENCY LIMIT + LOAD SHEDDING
+# -------------------------------------------------
+class ConcurrencyLimiter:
+    """At most `limit` holders at once and `max_waiting` queued behind them.
+
+    Past that, or after waiting `timeout` seconds, requests get a 429 with
+    Retry-After instead of piling up on the worker.
+    """
+
+    def __init__(self, name, limit=HEAVY_READ_LIMIT, max_waiting=HEAVY_READ_QUEUE,
+                 timeout=QUEUE_TIMEOUT):
+        self.name = name
+        self.limit = limit
+        self.max_waiting = max_waiting
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(limit)
+        self._waiting = 0
+        self._active = 0
+        self.shed = 0
+
+    def status(self):
+        return {
+            "limit": self.limit,
+            "active": self._active,
+            "waiting": self._waiting,
+            "shed": self.shed
+        }
+
+    @asynccontextmanager
+    async def slot(self):
+        if self._semaphore.locked() and self._waiting >= self.max_waiting:
+            self.shed += 1
+            raise _too_busy(f"Too many concurrent {self.name} requests, retry shortly")
+
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            self.shed += 1
+            raise _too_busy(f"Timed out waiting for a {self.name} slot, retry shortly")
+        finally:
+            self._waiting -= 1
+
+        self._active += 1
+        try:
+            yield
+        finally:
+            self._active -= 1
+            self._semaphore.release()
+
+
+# -------------------------------------------------
+# EXCLUSIVE JOBS
+# -------------------------------------------------
+class JobQueue:
+    """Runs jobs that replace shared state (the model, all predictions) one at
+    a time, in arrival order. A few may queue; more are rejected with 429.
+
+    The queue itself is per process. With `adb` (storage.AsyncDatabase) the
+    running job also holds a lease in `job_leases`, so a job arriving on
+    another worker meanwhile gets a 429 too. Leases use the pipeline's
+    scheme: one document per generation, claimed with create(), and the
+    next generation is only taken once the current one has expired.
+    """
+
+    def __init__(self, max_pending=MAX_PENDING_JOBS, adb=None, lease_seconds=JOB_LEASE_SECONDS):
+        self.max_pending = max_pending
+        self.adb = adb
+        self.lease_seconds = lease_seconds
+        self.holder = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self._lock = asyncio.Lock()
+        self._pending = []
+        self.running = None
+
+    def status(self):
+        return {"running": self.running, "queued": list(self._pending)}
+
+    # -------------------------------------------------
+    # SHARED LEASE
+    # -------------------------------------------------
+    def _expires(self):
+        return (datetime.now(timezone.utc) + timedelta(seconds=self.lease_seconds)).isoformat()
+
+    def _claim(self, name):
+        """(ref, None) once claimed, (None, job) while `job` holds it elsewhere"""
+        from google.api_core.exceptions import Conflict
+        from storage import DESCENDING
+
+        leases = self.adb.db.collection(JOB_LEASES)
+        latest = list(leases.order_by("generation", DESCENDING).limit(1).stream())
+        generation = 0
+        if latest:
+            lease = latest[0].to_dict()
+            if lease["expires_at"] > datetime.now(timezone.utc).isoformat():
+                return None, lease["job"]
+            generation = lease["generation"] + 1
+
+        ref = leases.document(str(generation))
+        try:
+            ref.create({
+                "generation": generation,
+                "job": name,
+                "holder": self.holder,
+                "expires_at": self._expires()
+            })
+        except Conflict:
+            # another worker claimed this generation first
+            doc = ref.get()
+            return None, doc.to_dict()["job"] if doc.exists else name
+        return ref, None
+
+    def _renew(self, ref):
+        ref.set({"expires_at": self._expires()}, merge=True)
+
+    def _release(self, ref):
+        now = datetime.now(timezone.utc)
+        ref.set({"expires_at": now.isoformat()}, merge=True)
+        generation = int(ref.id)
+        # only long-dead generations: a claim can't still be reading them
+        cutoff = (now - JOB_LEASE_RETENTION).isoformat()
+        for doc in self.adb.db.collection(JOB_LEASES).where("expires_at", "<", cutoff).stream():
+            if doc.to_dict()["generation"] < generation:
+                doc.reference.delete()
+
+    async def _heartbeat(self, ref):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            await self.adb.run(self._renew, ref)
+
+    @asynccontextmanager
+    async def _shared(self, name):
+        if self.adb is None:
+            yield
+            return
+
+        ref, running = await self.adb.run(self._claim, name)
+        if ref is None:
+            raise _too_busy(f"'{running}' is running on another worker, retry later")
+        heartbeat = asyncio.ensure_future(self._heartbeat(ref))
+        try:
+            yield
+        finally:
+            heartbeat.cancel()
+            with suppress(asyncio.CancelledError):
+                await heartbeat
+            await self.adb.run(self._release, ref)
+
+    @asynccontextmanager
+    async def run(self, name):
+        if self._lock.locked() and len(self._pending) >= self.max_pending:
+            raise _too_busy(
+                f"'{self.running}' is running with {len(self._pending)} job(s) queued, retry later"
+            )
+
+        self._pending.append(name)
+        try:
+            await self._lock.acquire()
+        finally:
+            self._pending.remove(name)
+
+        try:
+            async with self._shared(name):
+                self.running = name
+                try:
+                    yield
+                finally:
+                    self.running = None
+        finally:
+            self._lock.release()
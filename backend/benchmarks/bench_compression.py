@@ -0,0 +1,75 @@
+"""Size, load time, latency and accuracy of the full vs. compressed forest,
+both saved and loaded through DropoutPredictor.save_model / load_model.
+
+Run from backend/:  python -m benchmarks.bench_compression [n_samples] [max_accuracy_loss]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from ml_model import DropoutPredictor
+
+
+def profile(path, X, y):
+    predictor = DropoutPredictor()
+    t0 = time.perf_counter()
+    predictor.load_model(path)
+    t_load = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    prob = predictor.model.predict_proba(X)
+    t_predict = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    predictor.explain_batch(X)
+    t_explain = time.perf_counter() - t0
+
+    return {
+        "trees": predictor.model.n_estimators,
+        "file": os.path.getsize(path),
+        "load": t_load,
+        "predict": t_predict,
+        "explain": t_explain,
+        "accuracy": float(np.mean(prob.argmax(axis=1) == y)),
+    }, prob
+
+
+def main(n=5_000, max_accuracy_loss=0.01):
+    predictor = DropoutPredictor()
+    predictor.train_model(predictor.generate_synthetic_data(n))
+
+    # a fresh sample neither training nor tree selection has seen
+    X, y = predictor.preprocess_data(predictor.generate_synthetic_data(10_000, seed=11))
+    X = np.asarray(X, dtype=np.float32)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        full_path, compact_path = os.path.join(tmp, "full.pkl"), os.path.join(tmp, "compact.pkl")
+        predictor.save_model(full_path)
+        report = predictor.compress(max_accuracy_loss)
+        predictor.save_model(compact_path)
+
+        before, p_full = profile(full_path, X, y)
+        after, p_compact = profile(compact_path, X, y)
+
+    print(f"trained on {n:,}, evaluated on {len(y):,} unseen students, "
+          f"max held-out loss {max_accuracy_loss}")
+    print(f"  {'':18}{'full':>12}{'compressed':>14}")
+    print(f"  {'trees':18}{before['trees']:>12}{after['trees']:>14}")
+    print(f"  {'file (KB)':18}{before['file'] / 1024:>12,.0f}{after['file'] / 1024:>14,.0f}")
+    print(f"  {'load (ms)':18}{before['load'] * 1000:>12.1f}{after['load'] * 1000:>14.1f}")
+    print(f"  {'predict (ms)':18}{before['predict'] * 1000:>12.1f}{after['predict'] * 1000:>14.1f}")
+    print(f"  {'explain (ms)':18}{before['explain'] * 1000:>12.1f}{after['explain'] * 1000:>14.1f}")
+    print(f"  {'accuracy':18}{before['accuracy']:>12.4f}{after['accuracy']:>14.4f}")
+    print(f"  held-out accuracy used for selection: "
+          f"{report['before']['accuracy']:.4f} -> {report['after']['accuracy']:.4f}")
+    print(f"  predictions that changed: {np.mean(p_full.argmax(1) != p_compact.argmax(1)):.2%}")
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 5_000,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 0.01,
+    )
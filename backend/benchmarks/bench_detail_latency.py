@@ -0,0 +1,87 @@
+"""Student detail latency: sequential reads vs. concurrent AsyncDatabase reads.
+
+Every storage round trip is delayed by LATENCY seconds to stand in for the
+network hop to Firestore. Run from backend/:
+
+    python -m benchmarks.bench_detail_latency [latency_ms]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+os.environ["STORAGE_BACKEND"] = "local"
+os.environ.setdefault("LOCAL_DB_PATH", os.path.join(tempfile.mkdtemp(), "bench.db"))
+
+import server  # noqa: E402
+from history import query_history  # noqa: E402
+from storage import LocalDatabase  # noqa: E402
+
+LATENCY = float(sys.argv[1]) / 1000 if len(sys.argv) > 1 else 0.05
+STUDENT_ID = "BENCH001"
+
+
+def seed():
+    db = server.db
+    db.collection("students").document(STUDENT_ID).set({
+        "student_id": STUDENT_ID, "age": 14, "attendance_percentage": 70.0,
+        "average_marks": 55.0, "created_at": "2026-01-01T00:00:00+00:00",
+    })
+    db.collection("predictions").document(STUDENT_ID).set({
+        "student_id": STUDENT_ID, "predicted_risk": "Medium", "confidence": 0.7,
+    })
+    for i in range(100):
+        db.collection("interventions").add({
+            "student_id": STUDENT_ID, "intervention_type": "Counselling",
+            "created_at": f"2026-01-01T00:00:{i:02d}+00:00",
+        })
+
+
+def add_latency():
+    execute = LocalDatabase.execute
+
+    def slow_execute(self, sql, params=()):
+        time.sleep(LATENCY)  # outside the store's lock, like a network hop
+        return execute(self, sql, params)
+
+    LocalDatabase.execute = slow_execute
+
+
+def sequential_detail():
+    """The pre-AsyncDatabase handler body: three blocking reads in a row"""
+    db = server.db
+    student = db.collection("students").document(STUDENT_ID).get().to_dict()
+    pred = db.collection("predictions").document(STUDENT_ID).get()
+    if pred.exists:
+        student.update(pred.to_dict())
+    interventions, _ = query_history(db, "interventions", STUDENT_ID, limit=20)
+    return student, interventions
+
+
+async def measure(fn, repeat=20):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        if asyncio.iscoroutine(result):
+            await result
+        samples.append(time.perf_counter() - t0)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+async def main():
+    seed()
+    add_latency()
+
+    seq = await measure(sequential_detail)
+    conc = await measure(lambda: server._load_student_detail(STUDENT_ID))
+
+    print(f"simulated round trip: {LATENCY * 1000:.0f} ms")
+    print(f"  sequential (3 reads)            {seq * 1000:7.1f} ms")
+    print(f"  concurrent (get_all || query)   {conc * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
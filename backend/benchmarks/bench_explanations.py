@@ -0,0 +1,44 @@
+"""Throughput of batch scoring with per-student explanations.
+
+Run from backend/:  python -m benchmarks.bench_explanations [n_students]
+"""
+import sys
+import time
+
+import numpy as np
+
+from ml_model import DropoutPredictor
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return time.perf_counter() - t0, out
+
+
+def main(n=10_000):
+    predictor = DropoutPredictor()
+    predictor.train_model(predictor.generate_synthetic_data(500))
+
+    students = predictor.generate_synthetic_data(n, seed=7).to_dict("records")
+    sample = students[:500]
+
+    t_single, _ = timed(lambda: [predictor.predict_single(s) for s in sample])
+    t_batch, _ = timed(predictor.predict_batch, students, False)
+    t_explain, results = timed(predictor.predict_batch, students, True)
+
+    X, _ = predictor.preprocess_data(
+        predictor.generate_synthetic_data(n, seed=7), training=False
+    )
+    bias, contributions = predictor.explain_batch(X)
+    error = np.abs(bias + contributions.sum(axis=1) - predictor.model.predict_proba(X)).max()
+
+    print(f"{n:,} students, forest of {len(predictor.model.estimators_)} trees")
+    print(f"  predict_single loop (extrapolated) {t_single / len(sample) * n:8.2f} s")
+    print(f"  predict_batch                      {t_batch:8.2f} s  {n / t_batch:>10,.0f} students/s")
+    print(f"  predict_batch + explanations       {t_explain:8.2f} s  {n / t_explain:>10,.0f} students/s")
+    print(f"  max |bias + sum(contrib) - proba|  {error:.2e}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
@@ -0,0 +1,78 @@
+"""Compare the /api/students response path before and after `responses.py`.
+
+Run from backend/:  python -m benchmarks.bench_responses [n_students]
+"""
+import gzip
+import json
+import math
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+
+import responses
+from ml_model import DropoutPredictor
+
+
+def build_students(n):
+    """Merged student + prediction records shaped like the Firestore docs"""
+    df = DropoutPredictor().generate_synthetic_data(n)
+    df["dropout_risk"] = df["dropout_risk"].astype(object)
+    df["phone_number"] = pd.Series(["9876543210"] * n, dtype=object).mask(np.arange(n) % 7 == 0)
+    df["predicted_risk"] = df["dropout_risk"]
+    df["confidence"] = np.random.default_rng(0).uniform(0.4, 1.0, n)
+    df["created_at"] = "2026-01-01T00:00:00+00:00"
+    df["predicted_at"] = "2026-01-02T00:00:00+00:00"
+    return df.to_dict("records")
+
+
+def legacy_encode(students):
+    """clean_nan copy per record, then FastAPI's jsonable_encoder + JSONResponse"""
+    def clean_nan(value):
+        if isinstance(value, float) and math.isnan(value):
+            return 0.0
+        return value
+
+    cleaned = [{k: clean_nan(v) for k, v in s.items()} for s in students]
+    payload = jsonable_encoder({"total_students": len(cleaned), "students": cleaned})
+    return json.dumps(
+        payload, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def timeit(fn, *args, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main(n=10_000):
+    students = build_students(n)
+    payload = {"total_students": len(students), "students": students}
+
+    rows = [("legacy (clean_nan + jsonable_encoder)", *timeit(legacy_encode, students))]
+    rows.append(("stdlib fallback", *timeit(responses._encode_stdlib, payload)))
+    if responses.orjson is not None:
+        rows.append(("orjson", *timeit(responses._encode_orjson, payload)))
+
+    print(f"/api/students payload, {n:,} students")
+    for name, elapsed, body in rows:
+        print(f"  {name:<40} {elapsed * 1000:8.1f} ms  {len(body) / 1e6:6.2f} MB")
+
+    body = rows[-1][2]
+    elapsed, gz = timeit(gzip.compress, body, responses.GZIP_LEVEL)
+    print(f"  {'gzip level ' + str(responses.GZIP_LEVEL):<40} {elapsed * 1000:8.1f} ms  {len(gz) / 1e6:6.2f} MB")
+    if responses.brotli is not None:
+        elapsed, br = timeit(
+            lambda b: responses.brotli.compress(b, quality=responses.BROTLI_QUALITY), body
+        )
+        print(f"  {'brotli quality ' + str(responses.BROTLI_QUALITY):<40} {elapsed * 1000:8.1f} ms  {len(br) / 1e6:6.2f} MB")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
@@ -0,0 +1,97 @@
+"""Memory per student and query latency of the columnar roster vs. the
+dict -> DataFrame path /stats used to take, on synthetic students.
+
+Run from backend/:  python -m benchmarks.bench_roster [n_students]
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from roster import Roster
+
+SCHOOLS = [f"School {i}" for i in range(400)]
+DISTRICTS = [f"District {i}" for i in range(38)]
+REGIONS = ["Urban", "Semi-Urban", "Rural"]
+RISKS = ["High", "Medium", "Low"]
+
+
+def make_records(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            "student_id": f"STU{i:07d}",
+            "name": f"Student {i}",
+            "age": int(rng.integers(10, 18)),
+            "attendance_percentage": float(rng.uniform(40, 100)),
+            "average_marks": float(rng.uniform(20, 100)),
+            "absences_per_month": int(rng.integers(0, 15)),
+            "distance_to_school_km": float(rng.uniform(0, 20)),
+            "family_income_level": RISKS[int(rng.integers(3))],
+            "parents_education_level": "Primary",
+            "health_issues": "No",
+            "school": SCHOOLS[int(rng.integers(len(SCHOOLS)))],
+            "district": DISTRICTS[int(rng.integers(len(DISTRICTS)))],
+            "region": REGIONS[int(rng.integers(3))],
+            "predicted_risk": RISKS[int(rng.integers(3))],
+            "confidence": float(rng.uniform(0.4, 1)),
+        }
+        for i in range(n)
+    ]
+
+
+def timed(fn, repeat=20):
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat * 1000
+
+
+def old_stats(records):
+    df = pd.DataFrame(records)
+    counts = df["predicted_risk"].value_counts().to_dict()
+    return counts, df["attendance_percentage"].mean(), df["average_marks"].mean()
+
+
+def old_groups(records):
+    df = pd.DataFrame(records)
+    return df.groupby("district").agg(
+        total=("student_id", "size"), attendance=("attendance_percentage", "mean")
+    )
+
+
+def main(n=100_000):
+    records = make_records(n)
+    roster = Roster()
+
+    t0 = time.perf_counter()
+    roster.upsert(records)
+    t_load = time.perf_counter() - t0
+
+    memory = roster.memory_bytes()
+    total = memory["arrays"] + memory["index"] + memory["categories"]
+    # a roster grown by doubling can hold up to 2x spare capacity
+    used = memory["arrays"] * roster.size // roster.capacity + memory["index"] + memory["categories"]
+    dataframe = pd.DataFrame(records).memory_usage(deep=True).sum()
+
+    one = [{"student_id": "STU0000042", "predicted_risk": "High", "confidence": 0.9}]
+    print(f"{n:,} students")
+    print(f"  build from records      {t_load * 1000:>9.1f} ms")
+    print(f"  memory / student        {total / n:>9.1f} B  ({used / n:.1f} B without spare capacity)")
+    print(f"    arrays {memory['arrays'] / n:.1f} B, id index {memory['index'] / n:.1f} B")
+    print(f"  DataFrame / student     {dataframe / n:>9.1f} B")
+    print(f"  {'':24}{'roster':>10}{'dict->DataFrame':>18}")
+    print(f"  {'stats (ms)':24}{timed(roster.stats):>10.2f}{timed(lambda: old_stats(records), 3):>18.1f}")
+    print(f"  {'stats, 1 district (ms)':24}{timed(lambda: roster.stats(district='District 7')):>10.2f}")
+    print(f"  {'group by district (ms)':24}{timed(lambda: roster.group_by('district')):>10.2f}"
+          f"{timed(lambda: old_groups(records), 3):>18.1f}")
+    print(f"  {'group by school (ms)':24}{timed(lambda: roster.group_by('school')):>10.2f}")
+    print(f"  {'filter + sort (ms)':24}"
+          f"{timed(lambda: roster.select(risk='High', max_attendance=60, sort='-confidence')):>10.2f}")
+    print(f"  {'patch one student (ms)':24}{timed(lambda: roster.upsert(one)):>10.3f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,167 @@
+import inspect
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import format_datetime
+
+from fastapi.responses import Response
+from firebase_admin import firestore
+
+from admission import SingleFlight
+from responses import choose_encoding, compress_body, encode_json, encoded_response
+
+# How long a worker trusts its last read of the shared revision
+REVISION_TTL = 1.0
+# How long a cached response body may be served for an unchanged revision
+RESPONSE_TTL = 30.0
+MAX_CACHED_RESPONSES = 128
+
+
+# -------------------------------------------------
+# DATA REVISION
+# -------------------------------------------------
+class DataRevision:
+    """Monotonically increasing revision of students, predictions and the model.
+
+    Stored in `meta/revision` so every worker sees the same value; each worker
+    only re-reads it after `REVISION_TTL` seconds, or right after its own bump.
+    Alerts and interventions don't move it, so nothing built from them may be
+    served through the ResponseCache.
+
+    With `adb` (storage.AsyncDatabase), `current_async` reads on its thread
+    pool; handlers on the event loop use that one.
+    """
+
+    def __init__(self, db, ttl=REVISION_TTL, adb=None):
+        self.ref = db.collection("meta").document("revision")
+        self.ttl = ttl
+        self.adb = adb
+        self._value = 0
+        self._updated_at = datetime.now(timezone.utc)
+        self._checked = 0.0
+        self._reads = SingleFlight()
+
+    def _expired(self):
+        return time.monotonic() - self._checked > self.ttl
+
+    def _read(self):
+        doc = self.ref.get()
+        if doc.exists:
+            data = doc.to_dict()
+            self._value = int(data.get("value", 0))
+            self._updated_at = datetime.fromisoformat(data["updated_at"])
+        self._checked = time.monotonic()
+
+    def current(self):
+        """(revision, updated_at) as last seen by this worker (may block)"""
+        if self._expired():
+            self._read()
+        return self._value, self._updated_at
+
+    async def current_async(self):
+        """current() without blocking the event loop; concurrent callers
+        share one read"""
+        if self._expired():
+            if self.adb is None:
+                self._read()
+            else:
+                await self._reads.do("revision", lambda: self.adb.run(self._read))
+        return self._value, self._updated_at
+
+    def bump(self):
+        self.ref.set({
+            "value": firestore.Increment(1),
+            "updated_at": datetime.now(timezone.utc).isoformat()
+        }, merge=True)
+        # force the next current() to read the new value
+        self._checked = 0.0
+
+
+# -------------------------------------------------
+# CONDITIONAL + CACHED RESPONSES
+# -------------------------------------------------
+def _etag_matches(request, etag):
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    tags = [t.strip() for t in header.split(",")]
+    # weak comparison: W/"5" matches "5"
+    return any(t.removeprefix("W/") == etag.removeprefix("W/") for t in tags)
+
+
+class ResponseCache:
+    """Encoded response bodies keyed by URL, valid for one data revision.
+
+    Repeat dashboard loads either get a 304 from the ETag or reuse the already
+    encoded and compressed body, without touching the collections. Misses for
+    the same URL and revision that arrive together share one build.
+    """
+
+    def __init__(self, revision, ttl=RESPONSE_TTL, max_entries=MAX_CACHED_RESPONSES):
+        self.revision = revision
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._flights = SingleFlight()
+
+    def _lookup(self, key, rev):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry["revision"] != rev or time.monotonic() > entry["expires"]:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _store(self, key, rev, body):
+        self._entries[key] = {
+            "revision": rev,
+            "expires": time.monotonic() + self.ttl,
+            "bodies": {None: body},
+        }
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return self._entries[key]
+
+    async def _build(self, key, rev, build):
+        payload = build()
+        if inspect.isawaitable(payload):
+            payload = await payload
+        return self._store(key, rev, encode_json(payload))
+
+    def clear(self):
+        self._entries.clear()
+
+    async def respond(self, request, build):
+        """Serve `build()` for this request with ETag / Last-Modified headers.
+
+        `build` (a plain or async function) is only called when neither the
+        client nor the cache already has the body for the current revision.
+        """
+        rev, updated_at = await self.revision.current_async()
+        etag = f'W/"{rev}"'
+        headers = {
+            "ETag": etag,
+            "Last-Modified": format_datetime(updated_at, usegmt=True),
+            # let browsers keep the body but revalidate every time
+            "Cache-Control": "no-cache",
+        }
+
+        if _etag_matches(request, etag):
+            return Response(status_code=304, headers=headers)
+
+        key = str(request.url.path) + "?" + str(request.url.query)
+        entry = self._lookup(key, rev)
+        if entry is None:
+            entry = await self._flights.do((key, rev), lambda: self._build(key, rev, build))
+
+        raw = entry["bodies"][None]
+        encoding = choose_encoding(request, len(raw))
+        if encoding not in entry["bodies"]:
+            entry["bodies"][encoding] = compress_body(raw, encoding)
+
+        return encoded_response(entry["bodies"][encoding], encoding, request, headers=headers)
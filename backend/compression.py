@@ -0,0 +1,180 @@
+import numpy as np
+
+from explain import tree_arrays
+
+# Largest held-out accuracy drop accepted when dropping trees
+MAX_ACCURACY_LOSS = 0.01
+# Never keep fewer trees than this, so confidences stay smooth
+MIN_TREES = 10
+# Bits per stored class probability (8 or 16)
+LEAF_BITS = 16
+
+
+# -------------------------------------------------
+# COMPACT FOREST
+# -------------------------------------------------
+def _smallest_int(max_value):
+    return np.min_scalar_type(-max(int(max_value), 1))
+
+
+def _threshold_float32(threshold):
+    """float32 thresholds that split float32 inputs exactly like the originals.
+
+    sklearn compares float32 features against float64 midpoints; rounding the
+    midpoint down keeps every `x <= t` decision unchanged.
+    """
+    t32 = threshold.astype(np.float32)
+    too_high = t32.astype(np.float64) > threshold
+    t32[too_high] = np.nextafter(t32[too_high], np.float32(-np.inf))
+    return t32
+
+
+def forest_importances(estimators, n_features):
+    """Impurity-based importances of a forest made of `estimators`, computed
+    like RandomForestClassifier.feature_importances_ (single-node trees left out)"""
+    per_tree = [e.feature_importances_ for e in estimators if e.tree_.node_count > 1]
+    if not per_tree:
+        return np.zeros(n_features)
+    importances = np.mean(per_tree, axis=0)
+    return importances / importances.sum()
+
+
+class CompactForest:
+    """A random forest reduced to flat arrays: int node links, int8 features,
+    float32 thresholds and quantized class distributions.
+
+    Mirrors the parts of RandomForestClassifier the app uses (predict_proba,
+    predict, apply, feature_importances_), so it can replace it in a saved
+    model file and is loaded by DropoutPredictor.load_model unchanged.
+    """
+
+    def __init__(self, trees, classes, feature_importances, n_features, leaf_bits=LEAF_BITS):
+        if leaf_bits not in (8, 16):
+            raise ValueError("leaf_bits must be 8 or 16")
+
+        sizes = [len(t[2]) for t in trees]
+        self.offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int64)
+        total = int(sum(sizes))
+        index_type = _smallest_int(total)
+
+        # children become global indices into the concatenated arrays; leaves keep -1
+        left, right = [], []
+        for (l, r, *_), offset in zip(trees, self.offsets):
+            left.append(np.where(l >= 0, l + offset, -1))
+            right.append(np.where(r >= 0, r + offset, -1))
+        self.left = np.concatenate(left).astype(index_type)
+        self.right = np.concatenate(right).astype(index_type)
+        self.feature = np.concatenate([t[2] for t in trees]).astype(_smallest_int(n_features))
+        self.threshold = _threshold_float32(np.concatenate([t[3] for t in trees]))
+
+        self.leaf_bits = leaf_bits
+        self.scale = 2 ** leaf_bits - 1
+        value = np.concatenate([t[4] for t in trees])
+        self.value = np.rint(value * self.scale).astype(np.uint8 if leaf_bits == 8 else np.uint16)
+
+        self.classes_ = np.asarray(classes)
+        self.feature_importances_ = np.asarray(feature_importances, dtype=np.float32)
+        self.n_features_in_ = n_features
+        self.n_estimators = len(trees)
+
+    @classmethod
+    def from_forest(cls, model, tree_indices=None, leaf_bits=LEAF_BITS):
+        trees = tree_arrays(model)
+        estimators = model.estimators_
+        if tree_indices is not None:
+            trees = [trees[i] for i in tree_indices]
+            estimators = [estimators[i] for i in tree_indices]
+        return cls(trees, model.classes_, forest_importances(estimators, model.n_features_in_),
+                   model.n_features_in_, leaf_bits)
+
+    def _values(self):
+        value = self.value.astype(np.float64)
+        return value / np.maximum(value.sum(axis=1, keepdims=True), 1)
+
+    def tree_arrays(self):
+        """Same per-tree arrays as explain.tree_arrays, for explanations"""
+        value = self._values()
+        bounds = list(self.offsets) + [len(self.feature)]
+        trees = []
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            left = self.left[start:end].astype(np.intp)
+            right = self.right[start:end].astype(np.intp)
+            trees.append((
+                np.where(left >= 0, left - start, -1),
+                np.where(right >= 0, right - start, -1),
+                self.feature[start:end].astype(np.intp),
+                self.threshold[start:end].astype(np.float64),
+                value[start:end]
+            ))
+        return trees
+
+    def _leaves(self, X):
+        """(n_rows, n_trees) global index of the leaf each row reaches"""
+        X = np.asarray(X, dtype=np.float32)
+        node = np.broadcast_to(self.offsets, (X.shape[0], self.n_estimators)).copy()
+        rows = np.arange(X.shape[0])[:, None]
+
+        # every (row, tree) pair moves down one level per step, all at once
+        while True:
+            feature = self.feature[node]
+            internal = feature >= 0
+            if not internal.any():
+                return node
+            go_left = X[rows, np.where(internal, feature, 0)] <= self.threshold[node]
+            child = np.where(go_left, self.left[node], self.right[node])
+            node = np.where(internal, child, node)
+
+    def apply(self, X):
+        return self._leaves(X) - self.offsets
+
+    def predict_proba(self, X):
+        leaves = self._leaves(X)
+        value = self.value[leaves].astype(np.float64)
+        value /= np.maximum(value.sum(axis=2, keepdims=True), 1)
+        return value.mean(axis=1)
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (
+            self.offsets, self.left, self.right, self.feature, self.threshold,
+            self.value, self.feature_importances_
+        ))
+
+
+# -------------------------------------------------
+# TREE SELECTION
+# -------------------------------------------------
+def select_trees(model, X_val, y_val, max_accuracy_loss=MAX_ACCURACY_LOSS, min_trees=MIN_TREES):
+    """Smallest greedy subset of trees within `max_accuracy_loss` of the full
+    forest's accuracy on (X_val, y_val).
+
+    Trees are added one at a time, each time the one that most improves the
+    subset's accuracy (ties: lowest log loss), until the target is reached
+    with at least `min_trees` trees.
+    """
+    X_val = np.asarray(X_val, dtype=np.float32)
+    y_val = np.asarray(y_val)
+    # (n_trees, n_rows, n_classes), computed once
+    per_tree = np.stack([t.predict_proba(X_val) for t in model.estimators_])
+    target = np.mean(per_tree.mean(axis=0).argmax(axis=1) == y_val) - max_accuracy_loss
+
+    rows = np.arange(len(y_val))
+    chosen, total = [], np.zeros_like(per_tree[0])
+    remaining = list(range(len(per_tree)))
+
+    while remaining:
+        candidates = (total[None] + per_tree[remaining]) / (len(chosen) + 1)
+        accuracy = (candidates.argmax(axis=2) == y_val).mean(axis=1)
+        log_loss = -np.log(np.maximum(candidates[:, rows, y_val], 1e-9)).mean(axis=1)
+        best = np.lexsort((log_loss, -accuracy))[0]
+
+        tree = remaining.pop(best)
+        chosen.append(tree)
+        total += per_tree[tree]
+        if accuracy[best] >= target and len(chosen) >= min_trees:
+            break
+
+    return sorted(chosen), float(accuracy[best]), float(target + max_accuracy_loss)
@@ -1,7 +1,11 @@
-import pandas as pd
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
 import numpy as np
-import random
-from datetime import datetime, timedelta
+import pandas as pd
 
 # Indian names for realistic dataset
 FIRST_NAMES = [
@@ -32,109 +36,228 @@ DISTRICTS = ["Tiruchirappalli", "Madurai", "Salem", "Coimbatore", "Chennai", "Vi
 
 REGIONS = ["Rural", "Urban", "Semi-Urban"]
 
-def generate_student_data(num_students=600):
+FAMILY_INCOMES = ["Below 5000", "5000-10000", "10000-20000", "Above 20000"]
+PARENTS_EDUCATION = ["Illiterate", "Primary", "Secondary", "Higher Secondary", "Graduate"]
+
+# Distance choices (km) by region; Semi-Urban draws from the full list
+ALL_DISTANCES = np.array([0.5, 1, 2, 3, 4, 5, 6, 7, 8, 10, 12, 15, 20], dtype=float)
+RURAL_DISTANCES = np.array([5, 7, 10, 12, 15, 20], dtype=float)
+URBAN_DISTANCES = np.array([0.5, 1, 2, 3, 4], dtype=float)
+
+DEFAULT_CHUNK_SIZE = 100_000
+
+
+def _choice(rng, options, size):
+    """Pick from a list of strings without building an object array per call"""
+    return np.asarray(options, dtype=object)[rng.integers(0, len(options), size)]
+
+
+def _coin(rng, size):
+    return rng.integers(0, 2, size).astype(bool)
+
+
+def _generate_chunk(start, size, seed, now=None):
+    """Generate `size` students with ids starting after `start`.
+
+    `seed` can be an int or a `np.random.SeedSequence`; each chunk owns its
+    own Generator so chunks are reproducible and safe to build in parallel.
+    """
+    rng = np.random.default_rng(seed)
+    now = np.datetime64(now or datetime.now(), "us")
+
+    ids = pd.Series(np.arange(start + 1, start + size + 1)).astype(str).str.zfill(4)
+    names = pd.Series(_choice(rng, FIRST_NAMES, size)) + " " + _choice(rng, LAST_NAMES, size)
+
+    grade = rng.integers(6, 13, size)
+    age = grade + rng.integers(5, 8, size)
+    region_idx = rng.integers(0, len(REGIONS), size)
+
+    # Create correlated risk factors
+    base_risk = rng.random(size)
+    high = base_risk > 0.7
+    medium = (base_risk > 0.4) & ~high
+
+    # Attendance (60-100%) and academic performance (0-100) by risk band
+    attendance_rate = np.select(
+        [high, medium],
+        [rng.uniform(60, 75, size), rng.uniform(75, 85, size)],
+        rng.uniform(85, 100, size),
+    )
+    avg_marks = np.select(
+        [high, medium],
+        [rng.uniform(30, 50, size), rng.uniform(50, 70, size)],
+        rng.uniform(70, 95, size),
+    )
+
+    # Distance from school (km)
+    rural = region_idx == REGIONS.index("Rural")
+    urban = region_idx == REGIONS.index("Urban")
+    distance = np.select(
+        [rural, urban],
+        [
+            RURAL_DISTANCES[rng.integers(0, len(RURAL_DISTANCES), size)],
+            URBAN_DISTANCES[rng.integers(0, len(URBAN_DISTANCES), size)],
+        ],
+        ALL_DISTANCES[rng.integers(0, len(ALL_DISTANCES), size)],
+    )
+
+    # Health factors
+    health_absences = np.where(
+        base_risk > 0.5, rng.integers(0, 16, size), rng.integers(0, 6, size)
+    )
+
+    # Cultural factors
+    has_sibling_dropout = (base_risk > 0.6) & _coin(rng, size)
+    child_labor = high & _coin(rng, size)
+    early_marriage_pressure = high & _coin(rng, size)
+
+    # Monsoon/seasonal impact
+    monsoon_absences = np.where(rural, rng.integers(0, 11, size), rng.integers(0, 4, size))
+
+    # Previous year performance and trend detection
+    prev_year_marks = np.clip(avg_marks + rng.uniform(-10, 10, size), 25, 100)
+    marks_trend = np.select(
+        [prev_year_marks > avg_marks + 5, avg_marks > prev_year_marks + 5],
+        ["Declining", "Improving"],
+        "Stable",
+    )
+
+    created_at = now - rng.integers(0, 366, size).astype("timedelta64[D]")
+
+    return pd.DataFrame({
+        "student_id": "STU" + ids,
+        "name": names,
+        "age": age,
+        "grade": grade,
+        "school": _choice(rng, SCHOOLS, size),
+        "district": _choice(rng, DISTRICTS, size),
+        "region": np.asarray(REGIONS, dtype=object)[region_idx],
+        "attendance_rate": np.round(attendance_rate, 2),
+        "avg_marks": np.round(avg_marks, 2),
+        "prev_year_marks": np.round(prev_year_marks, 2),
+        "marks_trend": marks_trend,
+        "distance_km": distance,
+        "family_income": _choice(rng, FAMILY_INCOMES, size),
+        "parents_education": _choice(rng, PARENTS_EDUCATION, size),
+        "family_size": rng.integers(3, 9, size),
+        "health_absences": health_absences,
+        "monsoon_absences": monsoon_absences,
+        "has_sibling_dropout": has_sibling_dropout,
+        "child_labor": child_labor,
+        "early_marriage_pressure": early_marriage_pressure,
+        "has_transport": _coin(rng, size),
+        "has_scholarship": _coin(rng, size),
+        "mid_day_meal": _coin(rng, size),
+        "created_at": np.datetime_as_string(created_at, unit="us"),
+    })
+
+
+def _chunk_plan(num_students, chunk_size, seed):
+    """Split the job into (start, size, seed) tuples with independent streams"""
+    starts = range(0, num_students, chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(starts))
+    return [
+        (start, min(chunk_size, num_students - start), chunk_seed)
+        for start, chunk_seed in zip(starts, seeds)
+    ]
+
+
+def iter_student_chunks(num_students, chunk_size=DEFAULT_CHUNK_SIZE, seed=None, workers=1):
+    """Yield DataFrames of at most `chunk_size` students, in id order.
+
+    With `workers > 1` chunks are built in a process pool; memory stays bounded
+    to roughly `workers` chunks in flight.
+    """
+    plan = _chunk_plan(num_students, chunk_size, seed)
+    now = datetime.now()
+
+    if workers <= 1:
+        for start, size, chunk_seed in plan:
+            yield _generate_chunk(start, size, chunk_seed, now)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = []
+        for start, size, chunk_seed in plan:
+            pending.append(pool.submit(_generate_chunk, start, size, chunk_seed, now))
+            if len(pending) >= workers * 2:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
+
+
+def generate_student_data(num_students=600, seed=None):
     """Generate synthetic Indian education dataset"""
-    students = []
-    
-    for i in range(num_students):
-        student_id = f"STU{str(i+1).zfill(4)}"
-        name = f"{random.choice(FIRST_NAMES)} {random.choice(LAST_NAMES)}"
-        grade = random.randint(6, 12)
-        age = grade + random.randint(5, 7)
-        school = random.choice(SCHOOLS)
-        district = random.choice(DISTRICTS)
-        region = random.choice(REGIONS)
-        
-        # Socio-economic factors
-        family_income = random.choice(["Below 5000", "5000-10000", "10000-20000", "Above 20000"])
-        parents_education = random.choice(["Illiterate", "Primary", "Secondary", "Higher Secondary", "Graduate"])
-        family_size = random.randint(3, 8)
-        
-        # Create correlated risk factors
-        base_risk = random.random()
-        
-        # Attendance (60-100%)
-        if base_risk > 0.7:  # High risk
-            attendance_rate = random.uniform(60, 75)
-        elif base_risk > 0.4:  # Medium risk
-            attendance_rate = random.uniform(75, 85)
-        else:  # Low risk
-            attendance_rate = random.uniform(85, 100)
-        
-        # Academic performance (0-100)
-        if base_risk > 0.7:
-            avg_marks = random.uniform(30, 50)
-        elif base_risk > 0.4:
-            avg_marks = random.uniform(50, 70)
-        else:
-            avg_marks = random.uniform(70, 95)
-        
-        # Distance from school (km)
-        distance = random.choice([0.5, 1, 2, 3, 4, 5, 6, 7, 8, 10, 12, 15, 20])
-        if region == "Rural":
-            distance = random.choice([5, 7, 10, 12, 15, 20])
-        elif region == "Urban":
-            distance = random.choice([0.5, 1, 2, 3, 4])
-        
-        # Health factors
-        health_absences = random.randint(0, 15) if base_risk > 0.5 else random.randint(0, 5)
-        
-        # Cultural factors
-        has_sibling_dropout = random.choice([True, False]) if base_risk > 0.6 else False
-        child_labor = random.choice([True, False]) if base_risk > 0.7 else False
-        early_marriage_pressure = random.choice([True, False]) if base_risk > 0.7 else False
-        
-        # Infrastructure
-        has_transport = random.choice([True, False])
-        has_scholarship = random.choice([True, False])
-        mid_day_meal = random.choice([True, False])
-        
-        # Monsoon/seasonal impact
-        monsoon_absences = random.randint(0, 10) if region == "Rural" else random.randint(0, 3)
-        
-        # Previous year performance
-        prev_year_marks = avg_marks + random.uniform(-10, 10)
-        prev_year_marks = max(25, min(100, prev_year_marks))
-        
-        # Trend detection
-        marks_trend = "Declining" if prev_year_marks > avg_marks + 5 else "Improving" if avg_marks > prev_year_marks + 5 else "Stable"
-        
-        student = {
-            "student_id": student_id,
-            "name": name,
-            "age": age,
-            "grade": grade,
-            "school": school,
-            "district": district,
-            "region": region,
-            "attendance_rate": round(attendance_rate, 2),
-            "avg_marks": round(avg_marks, 2),
-            "prev_year_marks": round(prev_year_marks, 2),
-            "marks_trend": marks_trend,
-            "distance_km": distance,
-            "family_income": family_income,
-            "parents_education": parents_education,
-            "family_size": family_size,
-            "health_absences": health_absences,
-            "monsoon_absences": monsoon_absences,
-            "has_sibling_dropout": has_sibling_dropout,
-            "child_labor": child_labor,
-            "early_marriage_pressure": early_marriage_pressure,
-            "has_transport": has_transport,
-            "has_scholarship": has_scholarship,
-            "mid_day_meal": mid_day_meal,
-            "created_at": (datetime.now() - timedelta(days=random.randint(0, 365))).isoformat()
-        }
-        
-        students.append(student)
-    
-    return pd.DataFrame(students)
+    return _generate_chunk(0, num_students, seed)
+
+
+def write_student_data(path, num_students, chunk_size=DEFAULT_CHUNK_SIZE, seed=None, workers=1):
+    """Stream generated students to a CSV or Parquet file chunk by chunk"""
+    path = str(path)
+    chunks = iter_student_chunks(num_students, chunk_size, seed, workers)
+    written = 0
+
+    if path.endswith(".parquet"):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        writer = None
+        try:
+            for chunk in chunks:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+                written += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+        return written
+
+    with open(path, "w", newline="") as f:
+        for i, chunk in enumerate(chunks):
+            chunk.to_csv(f, index=False, header=(i == 0))
+            written += len(chunk)
+    return written
+
+
+def benchmark(scales, chunk_size=DEFAULT_CHUNK_SIZE, workers=1, out_dir=None):
+    """Print rows/second for in-memory generation and (optionally) file output"""
+    for n in scales:
+        t0 = time.perf_counter()
+        for _ in iter_student_chunks(n, chunk_size, seed=42, workers=workers):
+            pass
+        elapsed = time.perf_counter() - t0
+        print(f"{n:>10,} rows  generate  {elapsed:8.2f}s  {n / elapsed:>12,.0f} rows/s")
+
+        if out_dir:
+            for ext in ("csv", "parquet"):
+                out = os.path.join(out_dir, f"bench_{n}.{ext}")
+                t0 = time.perf_counter()
+                write_student_data(out, n, chunk_size, seed=42, workers=workers)
+                elapsed = time.perf_counter() - t0
+                print(f"{n:>10,} rows  {ext:<8}  {elapsed:8.2f}s  {n / elapsed:>12,.0f} rows/s")
+                os.remove(out)
+
 
 if __name__ == "__main__":
-    # Generate and save dataset
-    df = generate_student_data(600)
-    df.to_csv('/app/backend/students_dataset.csv', index=False)
-    print(f"Generated {len(df)} student records")
-    print(df.head())
-    print("\nDataset Info:")
-    print(df.info())
+    parser = argparse.ArgumentParser(description="Generate synthetic student data")
+    parser.add_argument("--rows", type=int, default=600)
+    parser.add_argument("--out", default="/app/backend/students_dataset.csv",
+                        help="Output path; .parquet writes Parquet, anything else CSV")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--benchmark", type=int, nargs="*", metavar="ROWS",
+                        help="Report rows/second at the given scales instead of writing --out")
+    parser.add_argument("--benchmark-dir", default=None,
+                        help="Also time CSV/Parquet output into this directory")
+    args = parser.parse_args()
+
+    if args.benchmark is not None:
+        benchmark(args.benchmark or [10_000, 100_000, 1_000_000],
+                  args.chunk_size, args.workers, args.benchmark_dir)
+    else:
+        # Generate and save dataset
+        total = write_student_data(args.out, args.rows, args.chunk_size, args.seed, args.workers)
+        print(f"Generated {total} student records -> {args.out}")
@@ -0,0 +1,408 @@
+import hashlib
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+from firebase_admin import firestore
+
+# Features with at most this many distinct training values get one bin each
+MAX_DISCRETE_VALUES = 12
+QUANTILE_BINS = 10
+# Live counts decay so they track roughly the last HALF_LIFE observations
+HALF_LIFE = 10_000
+# Districts tracked separately; the rest share one bucket
+MAX_GROUPS = 64
+OTHER_GROUP = "Other"
+UNKNOWN_GROUP = "Unknown"
+
+# A worker's sketches are dropped once decayed below this share of their weight
+MIN_WEIGHT = 1e-3
+
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+EPSILON = 1e-4
+
+
+# -------------------------------------------------
+# REFERENCE (fitted at train time, saved with the model)
+# -------------------------------------------------
+class DriftReference:
+    """Bin edges and training histograms for each model feature"""
+
+    def __init__(self, feature_names, edges, counts):
+        self.feature_names = list(feature_names)
+        self.edges = [np.asarray(e, dtype=np.float64) for e in edges]
+        self.counts = [np.asarray(c, dtype=np.float64) for c in counts]
+
+    @classmethod
+    def fit(cls, X, feature_names):
+        X = np.asarray(X, dtype=np.float64)
+        edges, counts = [], []
+        for j in range(X.shape[1]):
+            column = X[:, j]
+            values = np.unique(column[~np.isnan(column)])
+            if len(values) <= MAX_DISCRETE_VALUES:
+                # one bin per value: cut halfway between neighbours
+                cut = (values[:-1] + values[1:]) / 2
+            else:
+                cut = np.unique(np.quantile(column, np.linspace(0, 1, QUANTILE_BINS + 1)[1:-1]))
+            edges.append(cut)
+            counts.append(np.bincount(np.searchsorted(cut, column, side="right"),
+                                      minlength=len(cut) + 1))
+        return cls(feature_names, edges, counts)
+
+    def bin(self, X):
+        """(n_rows, n_features) bin index of each value"""
+        X = np.asarray(X, dtype=np.float64)
+        return np.column_stack([
+            np.searchsorted(cut, X[:, j], side="right") for j, cut in enumerate(self.edges)
+        ])
+
+    def fingerprint(self):
+        digest = hashlib.sha1()
+        for cut in self.edges:
+            digest.update(cut.tobytes())
+        return digest.hexdigest()[:16]
+
+    def to_dict(self):
+        return {
+            "feature_names": self.feature_names,
+            "edges": [e.tolist() for e in self.edges],
+            "counts": [c.tolist() for c in self.counts],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["feature_names"], data["edges"], data["counts"])
+
+
+# -------------------------------------------------
+# SCORES
+# -------------------------------------------------
+def psi(expected, actual):
+    """Population stability index between two histograms"""
+    e = np.maximum(expected / max(expected.sum(), EPSILON), EPSILON)
+    a = np.maximum(actual / max(actual.sum(), EPSILON), EPSILON)
+    return float(np.sum((a - e) * np.log(a / e)))
+
+
+def ks(expected, actual):
+    """Kolmogorov-Smirnov statistic on binned CDFs (a lower bound of the exact one)"""
+    e = np.cumsum(expected) / max(expected.sum(), EPSILON)
+    a = np.cumsum(actual) / max(actual.sum(), EPSILON)
+    return float(np.max(np.abs(e - a)))
+
+
+def _status(value):
+    if value >= PSI_SIGNIFICANT:
+        return "significant"
+    if value >= PSI_MODERATE:
+        return "moderate"
+    return "stable"
+
+
+# -------------------------------------------------
+# LIVE MONITOR
+# -------------------------------------------------
+class DriftMonitor:
+    """Decayed live histograms per feature, overall and per district.
+
+    Memory is fixed at features x bins x (MAX_GROUPS + 1) counters: every
+    observation is binned and added, nothing is kept per student and the
+    collections are never rescanned. `position` is the number of
+    observations (by anyone sharing the sketches) the counts are decayed to.
+    """
+
+    def __init__(self, reference=None, half_life=HALF_LIFE):
+        self.decay = 0.5 ** (1 / half_life)
+        self._lock = threading.Lock()
+        self.reset(reference)
+
+    def reset(self, reference):
+        with self._lock:
+            self.reference = reference
+            self.groups = {}
+            self.observations = 0
+            self.position = 0
+            self.updated_at = None
+
+    def _empty(self):
+        return [np.zeros_like(c) for c in self.reference.counts]
+
+    def _group(self, district):
+        district = district or UNKNOWN_GROUP
+        if district in self.groups or len(self.groups) < MAX_GROUPS:
+            return district
+        return OTHER_GROUP
+
+    def observe(self, X, districts=None, position=None):
+        """Add preprocessed feature rows (and their districts) to the sketches.
+
+        `position` is the shared observation count including these rows;
+        everything observed since our last call, here or elsewhere, decays
+        the counts we hold.
+        """
+        if self.reference is None or len(X) == 0:
+            return
+
+        bins = self.reference.bin(X)
+        n = len(bins)
+        districts = districts if districts is not None else [None] * n
+        position = self.position + n if position is None else max(position, self.position + n)
+        factor = self.decay ** (position - self.position)
+
+        with self._lock:
+            for counts in self.groups.values():
+                for c in counts:
+                    c *= factor
+
+            keys = np.array([self._group(d) for d in districts], dtype=object)
+            for key in ("__all__", *set(keys)):
+                rows = bins if key == "__all__" else bins[keys == key]
+                counts = self.groups.setdefault(key, self._empty())
+                for j, c in enumerate(counts):
+                    c += np.bincount(rows[:, j], minlength=len(c))
+
+            self.observations += n
+            self.position = position
+            self.updated_at = datetime.now(timezone.utc).isoformat()
+
+    def _scores(self, counts):
+        return [
+            {
+                "feature": name,
+                "psi": round(psi(ref, live), 4),
+                "ks": round(ks(ref, live), 4),
+                "status": _status(psi(ref, live))
+            }
+            for name, ref, live in zip(self.reference.feature_names, self.reference.counts, counts)
+        ]
+
+    def report(self, district=None):
+        if self.reference is None:
+            return None
+
+        with self._lock:
+            groups = {k: [c.copy() for c in v] for k, v in self.groups.items()}
+
+        overall = groups.get("__all__")
+        report = {
+            "observations": self.observations,
+            "updated_at": self.updated_at,
+            "features": self._scores(overall) if overall is not None else [],
+            "districts": {}
+        }
+        for key, counts in groups.items():
+            if key == "__all__" or (district and key != district):
+                continue
+            report["districts"][key] = {
+                "weight": round(float(counts[0].sum()), 2),
+                "features": self._scores(counts)
+            }
+        return report
+
+    # persisted as one small document so restarts keep the live window;
+    # counts are maps of feature -> list since Firestore has no nested arrays
+    def to_dict(self):
+        with self._lock:
+            return {
+                "reference": self.reference.fingerprint() if self.reference else None,
+                "observations": self.observations,
+                "position": self.position,
+                "updated_at": self.updated_at,
+                "groups": {
+                    key: dict(zip(self.reference.feature_names, (c.tolist() for c in counts)))
+                    for key, counts in self.groups.items()
+                }
+            }
+
+    def _matches(self, data):
+        # state from a different reference (e.g. before a retrain) is dropped
+        return self.reference is not None and bool(data) \
+            and data.get("reference") == self.reference.fingerprint()
+
+    def _groups_of(self, data):
+        return {
+            key: [np.asarray(counts[name], dtype=np.float64) for name in self.reference.feature_names]
+            for key, counts in data.get("groups", {}).items()
+        }
+
+    def load_dict(self, data):
+        if not self._matches(data):
+            return
+        groups = self._groups_of(data)
+        with self._lock:
+            self.groups = groups
+            self.observations = data.get("observations", 0)
+            self.position = data.get("position", self.observations)
+            self.updated_at = data.get("updated_at")
+
+    def merge_dicts(self, states, position):
+        """Sum the to_dict() states of several monitors, each decayed from its
+        own position to `position`, into this one"""
+        groups, updated = {}, []
+        for data in states:
+            if not self._matches(data):
+                continue
+            weight = self.decay ** max(position - data.get("position", 0), 0)
+            for key, counts in self._groups_of(data).items():
+                if key not in groups and key != "__all__" and len(groups) > MAX_GROUPS:
+                    key = OTHER_GROUP
+                merged = groups.setdefault(key, self._empty())
+                for m, c in zip(merged, counts):
+                    m += c * weight
+            if data.get("updated_at"):
+                updated.append(data["updated_at"])
+
+        with self._lock:
+            self.groups = groups
+            self.observations = position
+            self.position = position
+            self.updated_at = max(updated, default=None)
+
+
+# -------------------------------------------------
+# SHARED STATE
+# -------------------------------------------------
+# Every process (server workers, the pipeline CLI) keeps its own sketches in
+# drift_workers/{reference}.{worker} and those of the current reference are
+# summed on read, so nobody overwrites anyone else's counts.
+# drift/live-{reference} holds the observation counter all of them
+# increment, which is what lets each worker's counts decay by everything
+# observed since it last wrote.
+WORKERS = "drift_workers"
+# Sketches not written for this long (stopped workers, old references) are deleted
+WORKER_TTL = timedelta(days=7)
+PRUNE_SECONDS = 3600
+# Students whose last observed feature row each process remembers
+MAX_TRACKED_STUDENTS = 200_000
+
+
+def row_hashes(X):
+    """uint64 hash of each feature row"""
+    frame = pd.DataFrame(np.asarray(X, dtype=np.float64))
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy()
+
+
+class SharedDrift:
+    """A DriftMonitor whose counts are shared through the database.
+
+    A student is observed again only when their features changed since this
+    process last observed them; that memory is per process and bounded, so a
+    student scored by two workers counts once on each.
+    """
+
+    def __init__(self, db, monitor, worker=None):
+        self.db = db
+        self.monitor = monitor
+        self.worker = worker or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self._observed = OrderedDict()
+        self._pruned = 0.0
+        self.attach()
+
+    @property
+    def reference(self):
+        return self.monitor.reference
+
+    def _counter(self):
+        return self.db.collection("drift").document(f"live-{self.reference.fingerprint()}")
+
+    def _position(self):
+        doc = self._counter().get()
+        return int((doc.to_dict() or {}).get("observations", 0)) if doc.exists else 0
+
+    def _document(self):
+        return self.db.collection(WORKERS).document(f"{self.reference.fingerprint()}.{self.worker}")
+
+    def _states(self):
+        query = self.db.collection(WORKERS).where("reference", "==", self.reference.fingerprint())
+        return [doc.to_dict() for doc in query.stream()]
+
+    def _weight(self, state, position):
+        return self.monitor.decay ** max(position - state.get("position", 0), 0)
+
+    def attach(self):
+        """Start from the shared position; other workers' counts stay theirs"""
+        if self.reference is not None:
+            self.monitor.position = self._position()
+
+    def reset(self, reference):
+        """New reference (after a retrain): sketches of the old one are retired"""
+        if self.reference is not None:
+            self._document().delete()
+        self.monitor.reset(reference)
+        self._observed.clear()
+        self.attach()
+        if reference is not None:
+            self._publish()
+
+    def _prune(self, now):
+        # every writer does this now and then; deleting twice is harmless
+        if time.monotonic() - self._pruned < PRUNE_SECONDS:
+            return
+        self._pruned = time.monotonic()
+        cutoff = (now - WORKER_TTL).isoformat()
+        for doc in self.db.collection(WORKERS).where("published_at", "<", cutoff).stream():
+            doc.reference.delete()
+
+    def _publish(self):
+        now = datetime.now(timezone.utc)
+        self._document().set({**self.monitor.to_dict(), "published_at": now.isoformat()})
+        self._prune(now)
+
+    def _fresh(self, students, X):
+        """Rows whose student is new to this process or changed since observed"""
+        fresh = np.zeros(len(students), dtype=bool)
+        for i, (student, h) in enumerate(zip(students, row_hashes(X))):
+            student_id = student.get("student_id")
+            if student_id is None:
+                fresh[i] = True
+                continue
+            fresh[i] = self._observed.get(student_id) != h
+            self._observed[student_id] = h
+            self._observed.move_to_end(student_id)
+
+        while len(self._observed) > MAX_TRACKED_STUDENTS:
+            self._observed.popitem(last=False)
+        return fresh
+
+    def observe(self, students, X):
+        """Observe the students (rows of X) whose features are new or changed
+        since they were last observed; returns how many were"""
+        if self.reference is None or not len(students):
+            return 0
+
+        fresh = self._fresh(students, X)
+        if not fresh.any():
+            return 0
+
+        n = int(fresh.sum())
+        counter = self._counter()
+        counter.set({"observations": firestore.Increment(n)}, merge=True)
+        position = int(counter.get().to_dict()["observations"])
+
+        self.monitor.observe(
+            np.asarray(X)[fresh], [s.get("district") for s, f in zip(students, fresh) if f], position
+        )
+        self._publish()
+        return n
+
+    def report(self, district=None):
+        """Drift of everything observed by any worker"""
+        if self.reference is None:
+            return None
+
+        states = self._states()
+        position = max([self._position()] + [s.get("position", 0) for s in states])
+
+        # workers long gone have decayed to nothing
+        merged = DriftMonitor(self.reference)
+        merged.decay = self.monitor.decay
+        merged.merge_dicts([s for s in states if self._weight(s, position) >= MIN_WEIGHT], position)
+        return merged.report(district)
@@ -0,0 +1,216 @@
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.calibration import calibration_curve
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, confusion_matrix
+from sklearn.model_selection import StratifiedKFold, cross_validate
+
+from ml_model import FOREST_PARAMS, SPLIT_SEED, split_holdout
+from responses import encode_json
+
+CV_FOLDS = 5
+PERMUTATION_REPEATS = 10
+CALIBRATION_BINS = 10
+# Parallel workers for cross-validation and permutation importance
+EVALUATION_JOBS = int(os.getenv("EVALUATION_JOBS", "-1"))
+
+VERSIONS = "model_versions"
+
+
+def _accuracy(estimator, X, y):
+    # plain callable so CompactForest (not a sklearn estimator) can be scored
+    return accuracy_score(y, estimator.predict(np.asarray(X, dtype=np.float32)))
+
+
+def _column_drops(model, X, y, column, baseline, n_repeats, seed):
+    # every repeat of one column scored in a single predict call
+    rng = np.random.RandomState(seed)
+    shuffled = np.tile(X, (n_repeats, 1))
+    for r in range(n_repeats):
+        shuffled[r * len(X):(r + 1) * len(X), column] = X[rng.permutation(len(X)), column]
+    hits = (model.predict(shuffled) == np.tile(y, n_repeats)).reshape(n_repeats, len(X))
+    return baseline - hits.mean(axis=1)
+
+
+def permutation_importance(model, X, y, n_repeats=PERMUTATION_REPEATS,
+                           random_state=SPLIT_SEED, n_jobs=EVALUATION_JOBS):
+    """(mean, std) accuracy drop per feature when that column is shuffled.
+
+    Same measure as sklearn.inspection.permutation_importance, which only
+    accepts fitted sklearn estimators; this needs nothing but `predict`,
+    so it also scores a CompactForest.
+    """
+    X = np.asarray(X, dtype=np.float32)
+    y = np.asarray(y)
+    baseline = _accuracy(model, X, y)
+    seeds = np.random.RandomState(random_state).randint(np.iinfo(np.int32).max, size=X.shape[1])
+
+    drops = np.array(Parallel(n_jobs=n_jobs, prefer="threads")(
+        delayed(_column_drops)(model, X, y, j, baseline, n_repeats, seed)
+        for j, seed in enumerate(seeds)
+    ))
+    return drops.mean(axis=1), drops.std(axis=1)
+
+
+# -------------------------------------------------
+# OFFLINE EVALUATION
+# -------------------------------------------------
+def evaluate(predictor, df, n_jobs=EVALUATION_JOBS):
+    """Expensive diagnostics for a trained predictor, computed once per model.
+
+    `df` is the data it was trained on: the held-out rows are recovered with
+    the same split as train_model.
+    """
+    started = time.perf_counter()
+    X, y = predictor.preprocess_data(df)
+    labels = [str(c) for c in predictor.label_encoders["dropout_risk"].classes_]
+    classes = np.arange(len(labels))
+
+    _, test_rows, _, _ = split_holdout(np.arange(len(y)), y)
+    X_test, y_test = X.iloc[test_rows], y[test_rows]
+    proba = predictor.model.predict_proba(np.asarray(X_test, dtype=np.float32))
+    y_pred = proba.argmax(axis=1)
+
+    # a fresh forest with the training settings, refit on each fold
+    folds = StratifiedKFold(CV_FOLDS, shuffle=True, random_state=SPLIT_SEED)
+    cv = cross_validate(
+        RandomForestClassifier(**FOREST_PARAMS), X, y, cv=folds,
+        scoring=["accuracy", "f1_macro"], n_jobs=n_jobs
+    )
+
+    importance_mean, importance_std = permutation_importance(predictor.model, X_test, y_test, n_jobs=n_jobs)
+
+    calibration = []
+    for k in classes:
+        positive = y_test == k
+        if positive.all() or not positive.any():
+            continue
+        fraction, predicted = calibration_curve(
+            positive, proba[:, k], n_bins=CALIBRATION_BINS, strategy="quantile"
+        )
+        calibration.append({
+            "class": labels[k],
+            "mean_predicted": predicted.round(4).tolist(),
+            "fraction_positive": fraction.round(4).tolist(),
+            "brier": float(np.mean((proba[:, k] - positive) ** 2))
+        })
+
+    districts = {}
+    if "district" in df.columns:
+        test_districts = df["district"].iloc[test_rows].astype(object).fillna("Unknown").to_numpy()
+        for district in sorted(set(test_districts)):
+            rows = test_districts == district
+            districts[district] = {
+                "samples": int(rows.sum()),
+                "accuracy": float(np.mean(y_pred[rows] == y_test[rows])),
+                "confusion_matrix": confusion_matrix(y_test[rows], y_pred[rows], labels=classes).tolist()
+            }
+
+    return {
+        "evaluated_at": datetime.now(timezone.utc).isoformat(),
+        "seconds": round(time.perf_counter() - started, 2),
+        "labels": labels,
+        "holdout_samples": len(test_rows),
+        "cross_validation": {
+            "folds": CV_FOLDS,
+            **{
+                metric: {
+                    "mean": float(cv[f"test_{metric}"].mean()),
+                    "std": float(cv[f"test_{metric}"].std()),
+                    "folds": cv[f"test_{metric}"].round(4).tolist()
+                }
+                for metric in ("accuracy", "f1_macro")
+            }
+        },
+        "permutation_importance": sorted(
+            (
+                {
+                    "feature": name,
+                    "importance": float(mean),
+                    "std": float(std)
+                }
+                for name, mean, std in zip(
+                    predictor.feature_names, importance_mean, importance_std
+                )
+            ),
+            key=lambda x: x["importance"],
+            reverse=True
+        ),
+        "calibration": calibration,
+        "districts": districts
+    }
+
+
+# -------------------------------------------------
+# PERSISTENCE (one document per model version)
+# -------------------------------------------------
+# Reports are stored as JSON text: Firestore can't hold the nested arrays of
+# confusion matrices, and every worker decodes the same document.
+def save_model_version(db, metrics):
+    """Record a newly trained model and make it the current one"""
+    version = metrics["version"]
+    db.collection(VERSIONS).document(version).set({
+        "version": version,
+        "trained_at": metrics["trained_at"],
+        "metrics": encode_json(metrics).decode(),
+        "evaluation_status": "pending"
+    })
+    db.collection("meta").document("model").set({"version": version})
+
+
+def save_evaluation(db, version, evaluation=None, error=None):
+    db.collection(VERSIONS).document(version).set({
+        "evaluation": encode_json(evaluation).decode() if evaluation else None,
+        "evaluation_status": "completed" if error is None else "failed",
+        "evaluation_error": error
+    }, merge=True)
+
+
+def current_version(db):
+    doc = db.collection("meta").document("model").get()
+    return doc.to_dict().get("version") if doc.exists else None
+
+
+def load_model_metrics(db, version=None):
+    """Training metrics plus the offline evaluation of `version` (default:
+    the current model), or None if it was never recorded"""
+    version = version or current_version(db)
+    if not version:
+        return None
+
+    doc = db.collection(VERSIONS).document(version).get()
+    if not doc.exists:
+        return None
+
+    data = doc.to_dict()
+    return {
+        **json.loads(data["metrics"]),
+        "evaluation_status": data.get("evaluation_status"),
+        "evaluation": json.loads(data["evaluation"]) if data.get("evaluation") else None
+    }
+
+
+if __name__ == "__main__":
+    # Offline run for the saved model: python evaluation.py
+    from dotenv import load_dotenv
+    from ml_model import DropoutPredictor
+    from storage import get_database, ROOT_DIR
+    from training_cache import TrainingSnapshot
+
+    load_dotenv(ROOT_DIR / ".env")
+    db = get_database()
+
+    predictor = DropoutPredictor()
+    if not predictor.load_model(str(ROOT_DIR / "dropout_model.pkl")) or not predictor.version:
+        raise SystemExit("No versioned model found, train one first")
+
+    report = evaluate(predictor, TrainingSnapshot(db).dataframe())
+    if current_version(db) != predictor.version and predictor.metrics:
+        save_model_version(db, predictor.metrics)
+    save_evaluation(db, predictor.version, report)
+    print(json.dumps({k: report[k] for k in ("seconds", "cross_validation")}, indent=2))
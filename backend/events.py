@@ -0,0 +1,231 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timedelta, timezone
+
+from responses import encode_json
+
+# Per-connection buffer; a client that falls this far behind is told to resync
+QUEUE_SIZE = 256
+# Recent events kept for clients reconnecting with Last-Event-ID
+REPLAY_SIZE = 512
+HEARTBEAT_SECONDS = 15
+
+# Shared event log: each worker writes what it publishes and tails the others'
+EVENTS = "events"
+EVENT_POLL_SECONDS = float(os.getenv("EVENT_POLL_SECONDS", "1"))
+# Each poll re-reads this far back, for writes that commit after later ones
+# (and for clock skew between workers)
+EVENT_LAG_SECONDS = 5
+# Logged events older than this are deleted
+EVENT_RETENTION_SECONDS = 300
+# Bigger payloads (whole-roster batch predictions) reach other workers as a resync
+MAX_SHARED_EVENT_BYTES = 256 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+class EventBroker:
+    """Fan-out of compact change events to Server-Sent Events subscribers.
+
+    Every dashboard connection is a bounded asyncio.Queue on the event loop,
+    so one worker can hold many idle connections cheaply. `publish` is safe to
+    call from the loop or from worker threads.
+
+    With a `db`, published events are also written to the `events`
+    collection and `relay` tails the events other workers wrote there, so a
+    dashboard hears about every write whichever worker its stream is on.
+    Event ids carry this worker's instance: a reconnect that lands on
+    another worker can't be replayed and gets a resync.
+    """
+
+    def __init__(self, db=None, queue_size=QUEUE_SIZE, replay_size=REPLAY_SIZE):
+        self.db = db
+        self.queue_size = queue_size
+        self.instance = uuid.uuid4().hex[:8]
+        self._subscribers = set()
+        self._recent = deque(maxlen=replay_size)
+        self._last_id = 0
+        self._loop = None
+        self._listeners = []
+        # written to the shared log by the relay, off the publishing thread
+        self._outbox = deque(maxlen=replay_size)
+        self._seen = {}
+        self._cursor = datetime.now(timezone.utc)
+        self._pruned = 0.0
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def _missed_since(self, last_event_id):
+        """Frames after `last_event_id` ("instance-n"), or None if they can't
+        all be replayed"""
+        instance, _, number = last_event_id.rpartition("-")
+        if instance != self.instance or not number.isdigit():
+            return None  # another worker's ids, or from before a restart
+        last_event_id = int(number)
+        if last_event_id == self._last_id:
+            return []
+        if last_event_id > self._last_id:
+            return None
+        if not self._recent or self._recent[0][0] > last_event_id + 1:
+            return None  # older than the replay buffer
+        return [frame for event_id, frame in self._recent if event_id > last_event_id]
+
+    def subscribe(self, last_event_id=None):
+        self._loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=self.queue_size)
+
+        if last_event_id is not None:
+            missed = self._missed_since(last_event_id)
+            if missed is None or len(missed) > self.queue_size:
+                queue.put_nowait(self._frame("resync", {}))
+            else:
+                for frame in missed:
+                    queue.put_nowait(frame)
+
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        self._subscribers.discard(queue)
+
+    def _frame(self, event_type, data, event_id=None):
+        head = f"id: {self.instance}-{event_id}\n" if event_id is not None else ""
+        return (
+            f"{head}event: {event_type}\ndata: ".encode()
+            + encode_json(data)
+            + b"\n\n"
+        )
+
+    def _dispatch(self, event_type, data):
+        self._last_id += 1
+        frame = self._frame(event_type, data, self._last_id)
+        self._recent.append((self._last_id, frame))
+
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                # slow client: drop its backlog and ask it to refetch once
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(self._frame("resync", {}))
+
+    def add_listener(self, fn):
+        """In-process consumer: `fn(event_type, data)` runs inside publish, so
+        it must be quick and must not do I/O"""
+        self._listeners.append(fn)
+
+    def publish(self, event_type, data):
+        for listener in self._listeners:
+            # the write behind the event already happened: a broken listener
+            # must neither fail the request nor keep subscribers from hearing it
+            try:
+                listener(event_type, data)
+            except Exception:
+                logger.exception("Event listener %r failed on %s", listener, event_type)
+
+        if self.db is not None:
+            self._outbox.append((event_type, data))
+
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        if self._loop is None or running is self._loop:
+            self._dispatch(event_type, data)
+        else:
+            self._loop.call_soon_threadsafe(self._dispatch, event_type, data)
+
+    # -------------------------------------------------
+    # SHARED LOG
+    # -------------------------------------------------
+    def _flush(self):
+        while self._outbox:
+            event_type, data = self._outbox.popleft()
+            if len(encode_json(data)) > MAX_SHARED_EVENT_BYTES:
+                event_type, data = "resync", {}
+
+            published_at = datetime.now(timezone.utc).isoformat()
+            doc_id = f"{published_at}-{self.instance}-{uuid.uuid4().hex[:6]}"
+            self.db.collection(EVENTS).document(doc_id).set({
+                "type": event_type,
+                "data": data,
+                "origin": self.instance,
+                "published_at": published_at
+            })
+
+    def _prune(self, now):
+        if time.monotonic() - self._pruned < EVENT_RETENTION_SECONDS / 5:
+            return
+        self._pruned = time.monotonic()
+        cutoff = (now - timedelta(seconds=EVENT_RETENTION_SECONDS)).isoformat()
+        for doc in self.db.collection(EVENTS).where("published_at", "<", cutoff).stream():
+            doc.reference.delete()
+
+    def sync(self):
+        """Write this worker's pending events and return the other workers'
+        events logged since the last call (blocking I/O: run on a thread)"""
+        self._flush()
+        now = datetime.now(timezone.utc)
+        self._prune(now)
+
+        if not self._subscribers:
+            # nobody to deliver to; start from here once someone connects
+            self._cursor = now
+            return []
+
+        since = (self._cursor - timedelta(seconds=EVENT_LAG_SECONDS)).isoformat()
+        docs = self.db.collection(EVENTS).where("published_at", ">", since).order_by("published_at").stream()
+
+        events = []
+        for doc in docs:
+            data = doc.to_dict()
+            if doc.id in self._seen:
+                continue
+            self._seen[doc.id] = data["published_at"]
+            if data["origin"] != self.instance:
+                events.append((data["type"], data["data"]))
+
+        self._cursor = now
+        self._seen = {k: v for k, v in self._seen.items() if v > since}
+        return events
+
+    async def poll(self):
+        self._loop = asyncio.get_running_loop()
+        # other workers' writes go to subscribers only: in-process listeners
+        # follow this worker's own writes
+        for event_type, data in await asyncio.to_thread(self.sync):
+            self._dispatch(event_type, data)
+
+    async def relay(self, interval=EVENT_POLL_SECONDS):
+        """Background task keeping this worker's subscribers in step with
+        writes made on any worker"""
+        while True:
+            try:
+                await self.poll()
+            except Exception as e:
+                print("❌ Event relay error:", e)
+            await asyncio.sleep(interval)
+
+    async def stream(self, request, last_event_id=None):
+        """Async iterator of SSE frames for one client"""
+        queue = self.subscribe(last_event_id)
+        try:
+            yield b"retry: 3000\n\n"
+            while True:
+                try:
+                    frame = await asyncio.wait_for(queue.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    frame = b": ping\n\n"
+                yield frame
+        finally:
+            self.unsubscribe(queue)
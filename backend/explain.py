@@ -0,0 +1,94 @@
+import numpy as np
+
+
+# -------------------------------------------------
+# TREE ARRAYS
+# -------------------------------------------------
+def tree_arrays(model):
+    """Per-tree (left, right, feature, threshold, value) arrays of a forest.
+
+    `value` holds the class distribution of every node (rows sum to 1), which
+    is what both prediction and path contributions need.
+    """
+    if hasattr(model, "tree_arrays"):
+        # compression.CompactForest keeps them already flattened
+        return model.tree_arrays()
+
+    trees = []
+    for estimator in model.estimators_:
+        t = estimator.tree_
+        value = t.value[:, 0, :].astype(np.float64)
+        value /= value.sum(axis=1, keepdims=True)
+        trees.append((
+            t.children_left, t.children_right, t.feature, t.threshold, value
+        ))
+    return trees
+
+
+# -------------------------------------------------
+# PATH CONTRIBUTIONS (Saabas)
+# -------------------------------------------------
+def node_contribution_table(tree, n_features):
+    """(n_nodes, n_features, n_classes) sum of split contributions on the path
+    from the root to every node.
+
+    Each split moves a sample from a node to a child and credits the change in
+    class distribution to the split feature; built one depth level at a time.
+    """
+    left, right, feature, _, value = tree
+    table = np.zeros((len(feature), n_features, value.shape[1]))
+
+    frontier = np.array([0])
+    while frontier.size:
+        parents = frontier[feature[frontier] >= 0]   # leaves have feature == -2
+        if not parents.size:
+            break
+        for children in (left[parents], right[parents]):
+            table[children] = table[parents]
+            table[children, feature[parents]] += value[children] - value[parents]
+        frontier = np.concatenate([left[parents], right[parents]])
+
+    return table
+
+
+def apply_tree(tree, X):
+    """Leaf index reached by every row of X"""
+    left, right, feature, threshold, _ = tree
+    node = np.zeros(X.shape[0], dtype=np.intp)
+    rows = np.arange(X.shape[0])
+
+    while rows.size:
+        current = node[rows]
+        internal = feature[current] >= 0
+        rows, current = rows[internal], current[internal]
+        if not rows.size:
+            break
+        go_left = X[rows, feature[current]] <= threshold[current]
+        node[rows] = np.where(go_left, left[current], right[current])
+
+    return node
+
+
+def path_contributions(trees, X, n_features, tables=None, leaves=None):
+    """Decompose forest probabilities into per-feature contributions.
+
+    Returns (bias, contributions) with shapes (n_classes,) and
+    (n_rows, n_features, n_classes) such that
+    bias + contributions.sum(axis=1) equals predict_proba(X). `tables` are
+    the node_contribution_table of each tree, worth caching per model;
+    `leaves` (n_rows, n_trees) can come from sklearn's forest.apply(X).
+    """
+    X = np.asarray(X, dtype=np.float32)
+    if tables is None:
+        tables = [node_contribution_table(tree, n_features) for tree in trees]
+
+    n_classes = trees[0][4].shape[1]
+    bias = np.zeros(n_classes)
+    contributions = np.zeros((X.shape[0], n_features, n_classes))
+
+    for i, (tree, table) in enumerate(zip(trees, tables)):
+        bias += tree[4][0]
+        leaf = leaves[:, i] if leaves is not None else apply_tree(tree, X)
+        contributions += table[leaf]
+
+    return bias / len(trees), contributions / len(trees)
@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+
+# Model inputs read as-is from the student record
+BASE_FEATURES = [
+    "age", "attendance_percentage", "average_marks",
+    "absences_per_month", "distance_to_school_km",
+    "family_income_level", "parents_education_level",
+    "health_issues", "child_labor", "has_sibling_dropout"
+]
+
+TREND_SCORES = {"Declining": -1.0, "Stable": 0.0, "Improving": 1.0}
+_FLAGS = {True: 1.0, False: 0.0, "True": 1.0, "False": 0.0, "true": 1.0, "false": 0.0, "Yes": 1.0, "No": 0.0}
+
+
+def _number(df, column):
+    return pd.to_numeric(df[column], errors="coerce").astype(np.float64)
+
+
+def _flag(df, column):
+    # booleans arrive as bool, 0/1 or "True"/"Yes" depending on the source
+    values = df[column]
+    if pd.api.types.is_bool_dtype(values) or pd.api.types.is_numeric_dtype(values):
+        return values.astype(np.float64)
+    return values.map(_FLAGS).astype(np.float64)
+
+
+def _seasonal(df):
+    return _number(df, "monsoon_absences") + _number(df, "health_absences")
+
+
+# -------------------------------------------------
+# DERIVED FEATURES
+# -------------------------------------------------
+# (name, inputs, vectorized function of a DataFrame holding the inputs,
+#  value for rows where an input is missing)
+DERIVED_FEATURES = [
+    ("marks_change", ("average_marks", "prev_year_marks"),
+     lambda df: _number(df, "average_marks") - _number(df, "prev_year_marks"), 0.0),
+    ("marks_trend_score", ("marks_trend",),
+     lambda df: df["marks_trend"].map(TREND_SCORES).astype(np.float64), 0.0),
+    ("seasonal_absences", ("monsoon_absences", "health_absences"),
+     _seasonal, 0.0),
+    ("health_absence_share", ("monsoon_absences", "health_absences"),
+     lambda df: _number(df, "health_absences") / _seasonal(df).clip(lower=1), 0.0),
+    ("unassisted_distance_km", ("distance_to_school_km", "has_transport"),
+     lambda df: _number(df, "distance_to_school_km") * (1 - _flag(df, "has_transport")), 0.0),
+    ("support_count", ("has_transport", "has_scholarship", "mid_day_meal"),
+     lambda df: _flag(df, "has_transport") + _flag(df, "has_scholarship") + _flag(df, "mid_day_meal"), 0.0),
+]
+DERIVED_NAMES = [name for name, _, _, _ in DERIVED_FEATURES]
+_SPECS = {name: (inputs, fn, default) for name, inputs, fn, default in DERIVED_FEATURES}
+
+
+def inputs_of(names):
+    """Raw columns the given derived features read, in a stable order"""
+    seen = []
+    for name in names:
+        seen += [c for c in _SPECS[name][0] if c not in seen]
+    return seen
+
+
+def available(df, names=None):
+    """Derived features (default: all) whose inputs `df` has as non-empty columns"""
+    unknown = set(names or []) - set(DERIVED_NAMES)
+    if unknown:
+        raise ValueError(f"Unknown derived features: {', '.join(sorted(unknown))}")
+
+    present = {c for c in df.columns if df[c].notna().any()}
+    return [
+        name for name in DERIVED_NAMES
+        if (names is None or name in names) and set(_SPECS[name][0]) <= present
+    ]
+
+
+def derive(df, names):
+    """(len(df), len(names)) float64 array of derived features, one vectorized
+    pass per feature; missing inputs give that feature's default"""
+    out = np.empty((len(df), len(names)), dtype=np.float64)
+    if not len(df):
+        return out
+
+    missing = [c for c in inputs_of(names) if c not in df.columns]
+    if missing:
+        df = df.assign(**{c: None for c in missing})
+
+    for j, name in enumerate(names):
+        inputs, fn, default = _SPECS[name]
+        values = np.asarray(fn(df[list(inputs)]), dtype=np.float64)
+        out[:, j] = np.where(np.isfinite(values), values, default)
+    return out
+
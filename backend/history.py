@@ -0,0 +1,91 @@
+from storage import DESCENDING, count_documents
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+RISK_LEVELS = ["High", "Medium", "Low"]
+# sms_status values that mean the alert never reached the phone
+FAILED_SMS = ["failed", "undelivered", "canceled"]
+
+# next_before is "<created_at>|<document id>"
+_CURSOR_SEP = "|"
+
+
+def _filtered(db, collection, student_id=None, since=None, until=None):
+    query = db.collection(collection)
+    if student_id:
+        query = query.where("student_id", "==", student_id)
+    if since:
+        query = query.where("created_at", ">=", since)
+    if until:
+        query = query.where("created_at", "<", until)
+    return query
+
+
+def _items(query):
+    items = []
+    for doc in query.stream():
+        data = doc.to_dict()
+        data["id"] = doc.id   # needed for React key
+        items.append(data)
+    return items
+
+
+def _newest_first(item):
+    return item["created_at"], item["id"]
+
+
+def query_history(db, collection, student_id=None, since=None, until=None,
+                  before=None, limit=DEFAULT_PAGE_SIZE):
+    """One page of `collection`, newest first.
+
+    Served by the (student_id, created_at) / (created_at) indexes declared in
+    storage.INDEXES. `before` is the `next_before` cursor of the previous page;
+    `since` / `until` bound created_at (ISO strings, inclusive / exclusive).
+
+    Pages are ordered by (created_at, id), so rows sharing the timestamp of
+    a page boundary are neither skipped nor repeated: the cursor carries the
+    id, and the run of equal timestamps at either edge is read whole.
+    """
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    query = _filtered(db, collection, student_id, since, until)
+
+    rows, older = [], query
+    if before:
+        # plain timestamps (older clients) act as an id-less cursor
+        created_at, _, doc_id = before.partition(_CURSOR_SEP)
+        if doc_id:
+            ties = _items(query.where("created_at", "==", created_at))
+            rows = sorted((t for t in ties if t["id"] < doc_id), key=_newest_first, reverse=True)
+        older = query.where("created_at", "<", created_at)
+
+    if len(rows) <= limit:
+        # one extra row tells us whether another page exists
+        fetched = _items(older.order_by("created_at", direction=DESCENDING).limit(limit + 1 - len(rows)))
+        if len(rows) + len(fetched) > limit:
+            # the page may end inside a run of equal timestamps: take the whole run
+            edge = (rows + fetched)[limit - 1]["created_at"]
+            if not rows or edge != rows[-1]["created_at"]:
+                fetched = [f for f in fetched if f["created_at"] != edge]
+                fetched += _items(query.where("created_at", "==", edge))
+        rows += sorted(fetched, key=_newest_first, reverse=True)
+
+    items = rows[:limit]
+    next_before = _CURSOR_SEP.join(_newest_first(items[-1])) if len(rows) > limit else None
+    return items, next_before
+
+
+def count_history(db, collection, student_id=None, since=None, until=None):
+    """Totals for the whole filtered history (not just one page), counted
+    by the database; alerts also get per-risk and delivered counts"""
+    query = _filtered(db, collection, student_id, since, until)
+    counts = {"total": count_documents(query)}
+
+    if collection == "alerts":
+        counts["by_risk"] = {
+            level: count_documents(query.where("risk_level", "==", level))
+            for level in RISK_LEVELS
+        }
+        counts["delivered"] = counts["total"] - count_documents(
+            query.where("sms_status", "in", FAILED_SMS)
+        )
+    return counts
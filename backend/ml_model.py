@@ -1,43 +1,105 @@
 import pandas as pd
 import numpy as np
 import os
+import pickle
+import time
 import joblib
-from typing import Dict
+from datetime import datetime, timezone
+from typing import Dict, List
 
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import LabelEncoder
 from sklearn.metrics import accuracy_score, confusion_matrix, classification_report
 
+from explain import tree_arrays, node_contribution_table, path_contributions
+from drift import DriftReference
+from compression import CompactForest, select_trees, MAX_ACCURACY_LOSS, LEAF_BITS
+from data_generator import DISTRICTS, REGIONS, SCHOOLS
+from features import BASE_FEATURES, available, derive
+
+# Shared by training and offline evaluation (evaluation.py), so both see
+# the same forest settings and the same held-out rows
+FOREST_PARAMS = {
+    "n_estimators": 150,
+    "max_depth": 10,
+    "random_state": 42,
+    "class_weight": "balanced"
+}
+HOLDOUT_FRACTION = 0.2
+SPLIT_SEED = 42
+
+
+def split_holdout(X, y):
+    """Train / held-out split; the rows depend only on len(y), y and the seed"""
+    return train_test_split(X, y, test_size=HOLDOUT_FRACTION, random_state=SPLIT_SEED, stratify=y)
+
 
 class DropoutPredictor:
     def __init__(self):
         self.model = None
         self.label_encoders = {}
         self.feature_names = []
+        # derived features (features.py) this model was trained with
+        self.derived_features = []
+        self.drift_reference = None
+        self._trees = None
+        # held-out split of the last train_model call, for compress()
+        self.holdout = None
+        # set by train_model, saved with the model
+        self.version = None
+        self.metrics = None
 
     # -------------------------------------------------
     # SYNTHETIC DATA
     # -------------------------------------------------
-    def generate_synthetic_data(self, n_samples: int = 300) -> pd.DataFrame:
-        np.random.seed(42)
+    def generate_synthetic_data(self, n_samples: int = 300, seed: int = 42) -> pd.DataFrame:
+        # Local generator: never touch numpy's global random state
+        rng = np.random.default_rng(seed)
 
         df = pd.DataFrame({
             "student_id": [f"STU{i:04d}" for i in range(n_samples)],
-            "age": np.random.randint(12, 18, n_samples),
-            "attendance_percentage": np.random.uniform(50, 100, n_samples),
-            "average_marks": np.random.uniform(30, 95, n_samples),
-            "absences_per_month": np.random.randint(0, 15, n_samples),
-            "distance_to_school_km": np.random.uniform(0.5, 15, n_samples),
-            "family_income_level": np.random.choice(["Low", "Medium", "High"], n_samples),
-            "parents_education_level": np.random.choice(
+            "age": rng.integers(12, 18, n_samples),
+            "attendance_percentage": rng.uniform(50, 100, n_samples),
+            "average_marks": rng.uniform(30, 95, n_samples),
+            "absences_per_month": rng.integers(0, 15, n_samples),
+            "distance_to_school_km": rng.uniform(0.5, 15, n_samples),
+            "family_income_level": rng.choice(["Low", "Medium", "High"], n_samples),
+            "parents_education_level": rng.choice(
                 ["No Education", "Primary", "Secondary", "Higher"], n_samples
             ),
-            "health_issues": np.random.choice(["Yes", "No"], n_samples),
-            "child_labor": np.random.choice([0, 1], n_samples),
-            "has_sibling_dropout": np.random.choice([0, 1], n_samples)
+            "health_issues": rng.choice(["Yes", "No"], n_samples),
+            "child_labor": rng.integers(0, 2, n_samples),
+            "has_sibling_dropout": rng.integers(0, 2, n_samples)
         })
 
+        # Where the student studies (SCHOOLS and DISTRICTS share an order);
+        # drawn last so the columns above are unchanged for a given seed
+        school_idx = rng.integers(0, len(SCHOOLS), n_samples)
+        df["school"] = np.asarray(SCHOOLS, dtype=object)[school_idx]
+        df["district"] = np.asarray(DISTRICTS, dtype=object)[school_idx]
+        df["region"] = rng.choice(REGIONS, n_samples)
+
+        # Richer signals read by the derived features, drawn after the
+        # columns above and, like the real dataset, not part of the label
+        df["prev_year_marks"] = np.clip(
+            df["average_marks"] + rng.uniform(-10, 10, n_samples), 25, 100
+        ).round(2)
+        df["marks_trend"] = np.select(
+            [df["prev_year_marks"] > df["average_marks"] + 5, df["average_marks"] > df["prev_year_marks"] + 5],
+            ["Declining", "Improving"],
+            "Stable"
+        )
+        df["monsoon_absences"] = np.where(
+            df["region"] == "Rural", rng.integers(0, 11, n_samples), rng.integers(0, 4, n_samples)
+        )
+        df["health_absences"] = np.where(
+            df["health_issues"] == "Yes", rng.integers(0, 16, n_samples), rng.integers(0, 6, n_samples)
+        )
+        df["has_transport"] = rng.random(n_samples) < np.where(df["distance_to_school_km"] > 10, 0.3, 0.6)
+        df["has_scholarship"] = rng.random(n_samples) < np.where(df["family_income_level"] == "Low", 0.6, 0.3)
+        df["mid_day_meal"] = rng.random(n_samples) < 0.5
+
         risk_score = (
             (df["attendance_percentage"] < 75) * 25 +
             (df["average_marks"] < 40) * 25 +
@@ -71,14 +133,15 @@ class DropoutPredictor:
             else:
                 df[col] = self.label_encoders[col].transform(df[col])
 
-        self.feature_names = [
-            "age", "attendance_percentage", "average_marks",
-            "absences_per_month", "distance_to_school_km",
-            "family_income_level", "parents_education_level",
-            "health_issues", "child_labor", "has_sibling_dropout"
-        ]
+        self.feature_names = BASE_FEATURES + self.derived_features
 
-        X = df[self.feature_names]
+        X = df[BASE_FEATURES]
+        if self.derived_features:
+            # one vectorized pass per feature, cheaper than caching them per student
+            values = derive(df, self.derived_features)
+            X = pd.concat(
+                [X, pd.DataFrame(values, index=X.index, columns=self.derived_features)], axis=1
+            )
 
         # ✅ ONLY during training
         if training:
@@ -96,21 +159,39 @@ class DropoutPredictor:
     # -------------------------------------------------
     # TRAIN MODEL
     # -------------------------------------------------
-    def train_model(self, df: pd.DataFrame) -> Dict:
+    def train_model(self, df: pd.DataFrame, derived_features=False) -> Dict:
+        """`derived_features` (features.py) is opt-in: True adds every one the
+        data has the inputs for, a list only those"""
+        if derived_features:
+            self.derived_features = available(df, None if derived_features is True else derived_features)
+        else:
+            self.derived_features = []
         X, y = self.preprocess_data(df)
 
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, random_state=42, stratify=y
-        )
+        X_train, X_test, y_train, y_test = split_holdout(X, y)
 
-        self.model = RandomForestClassifier(
-            n_estimators=150,
-            max_depth=10,
-            random_state=42,
-            class_weight="balanced"
-        )
+        self.model = RandomForestClassifier(**FOREST_PARAMS)
 
         self.model.fit(X_train, y_train)
+        self._trees = None
+        self.holdout = (X_test, y_test)
+        self.version = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S-%f")
+
+        # histograms of the training features, for drift monitoring
+        self.drift_reference = DriftReference.fit(X_train, self.feature_names)
+
+        self.metrics = {
+            "version": self.version,
+            "trained_at": datetime.now(timezone.utc).isoformat(),
+            "samples": len(y),
+            **self._holdout_metrics()
+        }
+        return self.metrics
+
+    def _holdout_metrics(self) -> Dict:
+        """Accuracy, confusion matrix, report and importances of self.model
+        on the held-out split"""
+        X_test, y_test = self.holdout
         y_pred = self.model.predict(X_test)
 
         # 🔥 FEATURE IMPORTANCE
@@ -144,6 +225,54 @@ class DropoutPredictor:
             "feature_importance": feature_importance
         }
 
+    # -------------------------------------------------
+    # COMPRESS
+    # -------------------------------------------------
+    def compress(self, max_accuracy_loss: float = MAX_ACCURACY_LOSS, leaf_bits: int = LEAF_BITS) -> Dict:
+        """Swap the trained forest for a CompactForest of the fewest trees that
+        stay within `max_accuracy_loss` on the held-out split.
+
+        Returns size, load time, latency and accuracy before and after;
+        self.metrics is recomputed for the compact model that is kept.
+        """
+        if self.holdout is None:
+            raise ValueError("compress() needs the held-out split of train_model()")
+
+        X_test, y_test = self.holdout
+        trees, _, _ = select_trees(self.model, X_test, y_test, max_accuracy_loss)
+        compact = CompactForest.from_forest(self.model, trees, leaf_bits)
+
+        # latency on a fixed-size batch, the held-out rows repeated
+        X_bench = np.resize(np.asarray(X_test, dtype=np.float32), (1000, X_test.shape[1]))
+
+        def profile(model):
+            blob = pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)
+            t0 = time.perf_counter()
+            pickle.loads(blob)
+            t1 = time.perf_counter()
+            model.predict_proba(X_bench)
+            t2 = time.perf_counter()
+            return {
+                "trees": model.n_estimators,
+                "size_bytes": len(blob),
+                "load_ms": round((t1 - t0) * 1000, 2),
+                "predict_1000_ms": round((t2 - t1) * 1000, 2),
+                "accuracy": float(accuracy_score(y_test, model.predict(np.asarray(X_test, dtype=np.float32))))
+            }
+
+        report = {
+            "max_accuracy_loss": max_accuracy_loss,
+            "leaf_bits": leaf_bits,
+            "before": profile(self.model),
+            "after": profile(compact)
+        }
+
+        self.model = compact
+        self._trees = None
+        if self.metrics is not None:
+            self.metrics.update(self._holdout_metrics())
+        return report
+
     # -------------------------------------------------
     # PREDICT
     # -------------------------------------------------
@@ -162,6 +291,73 @@ class DropoutPredictor:
             "confidence": float(prob[idx])
         }
 
+    def predict_batch(self, students: List[Dict], explain: bool = True) -> List[Dict]:
+        """Score many students with one DataFrame and one predict_proba call.
+
+        With `explain`, each result also carries per-feature contributions to
+        the predicted class (see explain_batch).
+        """
+        if not students:
+            return []
+
+        X, _ = self.preprocess_data(pd.DataFrame(students), training=False)
+        prob = self.model.predict_proba(X)
+        idx = prob.argmax(axis=1)
+        risks = self.label_encoders["dropout_risk"].inverse_transform(idx)
+        confidence = prob[np.arange(len(idx)), idx]
+
+        results = [
+            {"predicted_risk": str(risk), "confidence": float(conf)}
+            for risk, conf in zip(risks, confidence)
+        ]
+
+        if explain:
+            bias, contributions = self.explain_batch(X)
+            # keep only the predicted class: 10 floats per student
+            picked = contributions[np.arange(len(idx)), :, idx]
+            for result, row, cls in zip(results, picked, idx):
+                result["base_value"] = float(bias[cls])
+                result["feature_contributions"] = dict(
+                    zip(self.feature_names, row.round(6).tolist())
+                )
+
+        return results
+
+    # -------------------------------------------------
+    # EXPLAIN
+    # -------------------------------------------------
+    def explain_batch(self, X):
+        """Saabas path contributions for already preprocessed rows.
+
+        Returns (bias, contributions) shaped (n_classes,) and
+        (n_rows, n_features, n_classes), classes in label encoder order.
+        """
+        n_features = len(self.feature_names)
+        if self._trees is None:
+            trees = tree_arrays(self.model)
+            self._trees = (trees, [node_contribution_table(t, n_features) for t in trees])
+
+        trees, tables = self._trees
+        # sklearn finds the leaves in C; the table gather does the rest
+        leaves = self.model.apply(X) if hasattr(self.model, "apply") else None
+        return path_contributions(trees, np.asarray(X), n_features, tables, leaves)
+
+    def explain_single(self, student: Dict) -> Dict:
+        X, _ = self.preprocess_data(pd.DataFrame([student]), training=False)
+        bias, contributions = self.explain_batch(X)
+
+        prob = bias + contributions[0].sum(axis=0)
+        idx = int(prob.argmax())
+
+        return {
+            "predicted_risk": self.label_encoders["dropout_risk"].inverse_transform([idx])[0],
+            "confidence": float(prob[idx]),
+            "base_value": float(bias[idx]),
+            "feature_contributions": dict(
+                zip(self.feature_names, contributions[0, :, idx].round(6).tolist())
+            )
+        }
+
     # -------------------------------------------------
     # SAVE / LOAD
     # -------------------------------------------------
@@ -169,7 +365,13 @@ class DropoutPredictor:
         joblib.dump({
             "model": self.model,
             "label_encoders": self.label_encoders,
-            "feature_names": self.feature_names
+            "feature_names": self.feature_names,
+            "derived_features": self.derived_features,
+            "drift_reference": (
+                self.drift_reference.to_dict() if self.drift_reference else None
+            ),
+            "version": self.version,
+            "metrics": self.metrics
         }, path)
 
     def load_model(self, path="dropout_model.pkl"):
@@ -179,4 +381,12 @@ class DropoutPredictor:
         self.model = data["model"]
         self.label_encoders = data["label_encoders"]
         self.feature_names = data["feature_names"]
+        # models saved before derived features use the base ones only
+        self.derived_features = data.get("derived_features", [])
+        # models saved before drift monitoring have no reference
+        reference = data.get("drift_reference")
+        self.drift_reference = DriftReference.from_dict(reference) if reference else None
+        self.version = data.get("version")
+        self.metrics = data.get("metrics")
+        self._trees = None
         return True
@@ -0,0 +1,214 @@
+import json
+import multiprocessing
+import os
+import re
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from threading import Lock
+
+from ml_model import DropoutPredictor
+
+ROOT_DIR = Path(__file__).parent
+SHARD_DIR = ROOT_DIR / "models" / "shards"
+
+# Shards with fewer training rows are served by the global model
+MIN_SHARD_SIZE = 100
+# Shard models kept in memory at once
+MAX_LOADED_SHARDS = 8
+SHARD_KEYS = ("district", "region")
+GLOBAL_SHARD = "global"
+
+
+def _slug(value):
+    return re.sub(r"[^A-Za-z0-9]+", "-", str(value)).strip("-").lower() or "blank"
+
+
+# -------------------------------------------------
+# TRAINING
+# -------------------------------------------------
+def _train_shard(value, df, path):
+    """Runs in a worker process: fit one shard model and save it"""
+    predictor = DropoutPredictor()
+    try:
+        metrics = predictor.train_model(df)
+    except ValueError as e:
+        # e.g. a risk class with a single student can't be stratified
+        return value, {"status": "skipped", "samples": len(df), "reason": str(e)}
+
+    predictor.save_model(str(path))
+    return value, {
+        "status": "trained",
+        "samples": len(df),
+        "file": path.name,
+        "version": predictor.version,
+        "accuracy": metrics["accuracy"]
+    }
+
+
+def train_shards(df, by="district", min_size=MIN_SHARD_SIZE, shard_dir=SHARD_DIR, workers=None):
+    """Train one model per `by` value in parallel processes.
+
+    Writes the shard files plus a manifest.json describing them; values with
+    fewer than `min_size` rows are left to the global model.
+    """
+    if by not in SHARD_KEYS:
+        raise ValueError(f"Shards can be keyed by {', '.join(SHARD_KEYS)}")
+    if by not in df.columns:
+        raise ValueError(f"Training data has no '{by}' column")
+
+    shard_dir = Path(shard_dir)
+    shard_dir.mkdir(parents=True, exist_ok=True)
+
+    shards = {}
+    jobs = []
+    for value, group in df.groupby(by):
+        if len(group) < min_size:
+            shards[value] = {"status": "fallback", "samples": len(group)}
+        else:
+            jobs.append((value, group, shard_dir / f"{by}-{_slug(value)}.pkl"))
+
+    if jobs:
+        # spawn: don't fork a server process holding threads and sockets
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            for value, info in pool.map(_train_shard, *zip(*jobs)):
+                shards[value] = info
+
+    manifest = {
+        "by": by,
+        "min_size": min_size,
+        "trained_at": datetime.now(timezone.utc).isoformat(),
+        "shards": shards
+    }
+    # renamed into place: other workers re-read it as soon as it changes
+    path = shard_dir / "manifest.json"
+    tmp = path.with_name(f"manifest.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(manifest, indent=2))
+    tmp.replace(path)
+    return manifest
+
+
+# -------------------------------------------------
+# REGISTRY
+# -------------------------------------------------
+class ShardedModelRegistry:
+    """Routes students to their district/region model, else the global one.
+
+    Shard models are loaded on first use and kept in an LRU of at most
+    `max_loaded` entries; batch scoring runs every shard's group at once on a
+    thread pool (sklearn's tree traversal releases the GIL). The manifest is
+    re-read whenever its file changes, so shards trained by another worker
+    are picked up on the next batch.
+    """
+
+    def __init__(self, global_predictor, shard_dir=SHARD_DIR, max_loaded=MAX_LOADED_SHARDS):
+        self.global_predictor = global_predictor
+        self.shard_dir = Path(shard_dir)
+        self.max_loaded = max_loaded
+        self._loaded = OrderedDict()
+        self._lock = Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_loaded, thread_name_prefix="shard")
+        self._mtime = None
+        self.reload()
+
+    def _manifest_mtime(self):
+        try:
+            return (self.shard_dir / "manifest.json").stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def reload(self):
+        """Re-read the manifest, e.g. after train_shards; drops loaded models"""
+        path = self.shard_dir / "manifest.json"
+        mtime = self._manifest_mtime()
+        self.manifest = json.loads(path.read_text()) if mtime is not None else None
+        self._mtime = mtime
+        with self._lock:
+            self._loaded.clear()
+
+    def refresh(self):
+        """Reload if the manifest changed on disk (e.g. trained by another worker)"""
+        if self._manifest_mtime() != self._mtime:
+            self.reload()
+
+    @property
+    def by(self):
+        return self.manifest["by"] if self.manifest else None
+
+    def shard_for(self, student):
+        """Shard value serving this student, or GLOBAL_SHARD"""
+        if not self.manifest:
+            return GLOBAL_SHARD
+        value = student.get(self.by)
+        info = self.manifest["shards"].get(value)
+        if info and info.get("status") == "trained":
+            return value
+        return GLOBAL_SHARD
+
+    def version_for(self, student):
+        """Version of the model that scores this student"""
+        value = self.shard_for(student)
+        if value == GLOBAL_SHARD:
+            return self.global_predictor.version
+        return self.manifest["shards"][value].get("version")
+
+    def get(self, value):
+        if value == GLOBAL_SHARD:
+            return self.global_predictor
+
+        with self._lock:
+            if value in self._loaded:
+                self._loaded.move_to_end(value)
+                return self._loaded[value]
+
+        predictor = DropoutPredictor()
+        predictor.load_model(str(self.shard_dir / self.manifest["shards"][value]["file"]))
+
+        with self._lock:
+            self._loaded[value] = predictor
+            self._loaded.move_to_end(value)
+            while len(self._loaded) > self.max_loaded:
+                self._loaded.popitem(last=False)
+        return predictor
+
+    def loaded(self):
+        with self._lock:
+            return list(self._loaded)
+
+    def _score_group(self, value, students, explain):
+        try:
+            results = self.get(value).predict_batch(students, explain)
+        except (KeyError, ValueError):
+            # a category this shard never saw: let the global model answer
+            if value == GLOBAL_SHARD:
+                raise
+            value = GLOBAL_SHARD
+            results = self.global_predictor.predict_batch(students, explain)
+        version = self.get(value).version
+        for result in results:
+            result["model_shard"] = value
+            result["model_version"] = version
+        return results
+
+    def predict_batch(self, students, explain=True):
+        """Same as DropoutPredictor.predict_batch, routed per shard; each
+        result also names the shard and the model version that scored it"""
+        self.refresh()
+        groups = {}
+        for i, student in enumerate(students):
+            groups.setdefault(self.shard_for(student), []).append(i)
+
+        futures = {
+            value: self._pool.submit(
+                self._score_group, value, [students[i] for i in rows], explain
+            )
+            for value, rows in groups.items()
+        }
+
+        results = [None] * len(students)
+        for value, future in futures.items():
+            for i, result in zip(groups[value], future.result()):
+                results[i] = result
+        return results
@@ -0,0 +1,583 @@
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from responses import encode_json
+from sms_service import send_sms
+
+RUNS = "pipeline_runs"
+LEASES = "pipeline_leases"
+# A scheduled run's lease lapses this long after its last completed stage,
+# so a run whose worker died is picked up again
+LEASE_SECONDS = int(os.getenv("PIPELINE_LEASE_SECONDS", "1800"))
+SOURCE_SUFFIXES = (".csv", ".parquet")
+# Students written / scored per storage round of work
+WRITE_CHUNK = 500
+# A student gets at most one high-risk SMS per cooldown
+ALERT_COOLDOWN_DAYS = 7
+ALERT_MESSAGE = (
+    "Dear parent, {name} has been identified as at high risk of dropping out "
+    "of school. Please contact the school counsellor this week."
+)
+
+# Fields of server.StudentData that a bulk source must provide
+REQUIRED_FIELDS = [
+    "student_id", "age", "attendance_percentage", "average_marks",
+    "absences_per_month", "distance_to_school_km", "family_income_level",
+    "parents_education_level", "health_issues"
+]
+OPTIONAL_FIELDS = [
+    "phone_number", "child_labor", "has_sibling_dropout", "school", "district", "region",
+    # inputs of the derived features (features.py)
+    "prev_year_marks", "marks_trend", "monsoon_absences", "health_absences",
+    "has_transport", "has_scholarship", "mid_day_meal"
+]
+
+
+class RunNotFound(ValueError):
+    pass
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def source_path(source, import_dir=None):
+    """`source` resolved to a CSV / Parquet file; with `import_dir`, only
+    files inside it are accepted (relative names are taken from there)"""
+    path = Path(source)
+    if import_dir is not None:
+        root = Path(import_dir).resolve()
+        path = (root / path).resolve()
+        if not path.is_relative_to(root):
+            raise ValueError(f"Sources must be files in the import directory {root}")
+    if path.suffix not in SOURCE_SUFFIXES:
+        raise ValueError(f"Sources must be {' or '.join(SOURCE_SUFFIXES)} files")
+    if not path.is_file():
+        raise ValueError(f"No such source file: {source}")
+    return path
+
+
+def _row_hash(record):
+    fields = {k: record.get(k) for k in REQUIRED_FIELDS + OPTIONAL_FIELDS}
+    return hashlib.sha1(encode_json(fields)).hexdigest()[:16]
+
+
+def _chunks(items, size=WRITE_CHUNK):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+# -------------------------------------------------
+# STAGES
+# -------------------------------------------------
+# Each stage takes the pipeline and the run parameters and returns a small
+# JSON summary. Stages are idempotent, so re-running one after a failure
+# only redoes the work that did not land.
+
+def ingest_stage(pipeline, params):
+    """Upsert students from a CSV / Parquet file or a synthetic sample.
+
+    Rows whose content hash matches the stored student are skipped, so an
+    unchanged nightly export writes (and later re-scores) nothing.
+    """
+    if params.get("source"):
+        path = source_path(params["source"], pipeline.import_dir)
+        df = pd.read_parquet(path) if path.suffix == ".parquet" else pd.read_csv(path)
+    elif params.get("synthetic"):
+        df = pipeline.predictor.generate_synthetic_data(
+            int(params["synthetic"]), seed=int(params.get("seed", 42))
+        ).drop(columns="dropout_risk")
+        rng = np.random.default_rng(int(params.get("seed", 42)))
+        df["phone_number"] = [f"9{n:09d}" for n in rng.integers(0, 10**9, len(df))]
+    else:
+        return {"source": None, "rows": 0, "written": 0}
+
+    missing = [c for c in REQUIRED_FIELDS if c not in df.columns]
+    if missing:
+        raise ValueError(f"Source is missing columns: {', '.join(missing)}")
+
+    df = df[[c for c in REQUIRED_FIELDS + OPTIONAL_FIELDS if c in df.columns]]
+    df = df.astype(object).where(df.notna(), None)
+    df["student_id"] = df["student_id"].astype(str)
+
+    existing = {
+        doc.id: doc.to_dict().get("row_hash")
+        for doc in pipeline.db.collection("students").stream()
+    }
+
+    now = _now().isoformat()
+    written = 0
+    for chunk in _chunks(df.to_dict("records")):
+        for record in chunk:
+            record["row_hash"] = _row_hash(record)
+            if existing.get(record["student_id"]) == record["row_hash"]:
+                continue
+            record["updated_at"] = now
+            if record["student_id"] not in existing:
+                record["created_at"] = now
+            pipeline.db.collection("students").document(record["student_id"]).set(record, merge=True)
+            written += 1
+
+    if written:
+        pipeline.changed()
+
+    return {
+        "source": str(path if params.get("source") else f"synthetic:{params['synthetic']}"),
+        "rows": len(df),
+        "written": written,
+        "unchanged": len(df) - written
+    }
+
+
+def score_stage(pipeline, params):
+    """Re-score students that are new, changed since their last prediction
+    or were scored by another version of the model that serves them"""
+    db, version = pipeline.db, pipeline.predictor.version
+    if pipeline.registry is not None:
+        pipeline.registry.refresh()
+    students = [doc.to_dict() for doc in db.collection("students").stream()]
+    scored_at = {
+        doc.id: (data.get("predicted_at") or "", data.get("model_version"))
+        for doc in db.collection("predictions").stream()
+        for data in [doc.to_dict()]
+    }
+
+    def stale(student):
+        predicted_at, model_version = scored_at.get(student["student_id"], ("", None))
+        changed_at = student.get("updated_at") or student.get("created_at") or ""
+        return not predicted_at or model_version != pipeline.version_for(student) \
+            or changed_at > predicted_at
+
+    pending = [s for s in students if stale(s)]
+    risks = {}
+    history = []
+
+    # predictions are written per chunk: a failure keeps what was already
+    # scored, and the retry sees those students as fresh. The history gets
+    # the whole stage as one batch (one file per day, one rollup refresh),
+    # including the chunks written before a failure
+    try:
+        for chunk in _chunks(pending):
+            results = pipeline.score(chunk)
+            predicted_at = _now().isoformat()
+            for student, result in zip(chunk, results):
+                record = {
+                    **student,
+                    # shard results name the shard model's version
+                    "model_version": version,
+                    **result,
+                    "predicted_at": predicted_at,
+                    "pipeline_run": pipeline.run_id
+                }
+                db.collection("predictions").document(student["student_id"]).set(record)
+                history.append(record)
+                risks[result["predicted_risk"]] = risks.get(result["predicted_risk"], 0) + 1
+    finally:
+        if pipeline.history is not None and history:
+            pipeline.history.append(history)
+
+    if pending:
+        pipeline.changed()
+
+    return {
+        "students": len(students),
+        "scored": len(pending),
+        "fresh": len(students) - len(pending),
+        "risk_distribution": risks,
+        "model_version": version
+    }
+
+
+def drift_stage(pipeline, params):
+    """Fold this run's scored students into the drift sketches and report
+    the features that moved"""
+    monitor = pipeline.drift_monitor
+    if monitor is None or monitor.reference is None:
+        return {"status": "no_reference"}
+
+    scored = [
+        doc.to_dict()
+        for doc in pipeline.db.collection("predictions").where("pipeline_run", "==", pipeline.run_id).stream()
+    ]
+    observed = 0
+    if scored:
+        # students this process already observed with the same features
+        # (a re-run, a re-score by a new model version) are skipped
+        X, _ = pipeline.predictor.preprocess_data(pd.DataFrame(scored), training=False)
+        observed = monitor.observe(scored, X)
+
+    report = monitor.report()
+    drifted = [f for f in report["features"] if f["status"] != "stable"]
+    return {
+        "scored": len(scored),
+        "observed": observed,
+        "observations": report["observations"],
+        "drifted_features": drifted,
+        "status": "significant" if any(f["status"] == "significant" for f in drifted)
+        else "moderate" if drifted else "stable"
+    }
+
+
+def alerts_stage(pipeline, params):
+    """SMS every high-risk student with a phone number who has not been
+    alerted within the cooldown; each alert is tagged with the run"""
+    db = pipeline.db
+    cooldown = int(params.get("cooldown_days", ALERT_COOLDOWN_DAYS))
+    limit = params.get("max_alerts")
+
+    since = (_now() - timedelta(days=cooldown)).isoformat()
+    # also covers alerts sent by an earlier attempt of this same run
+    recent = {
+        doc.to_dict().get("student_id")
+        for doc in db.collection("alerts").where("created_at", ">=", since).stream()
+    }
+    high = [
+        doc.to_dict()
+        for doc in db.collection("predictions").where("predicted_risk", "==", "High").stream()
+    ]
+
+    counts = {"high_risk": len(high), "sent": 0, "cooldown": 0, "no_phone": 0, "failed": 0}
+    for student in high:
+        if limit is not None and counts["sent"] >= int(limit):
+            break
+        if student["student_id"] in recent:
+            counts["cooldown"] += 1
+            continue
+        if not student.get("phone_number"):
+            counts["no_phone"] += 1
+            continue
+
+        message = ALERT_MESSAGE.format(name=student.get("name") or student["student_id"])
+        try:
+            sms = send_sms(student["phone_number"], message)
+        except Exception as e:
+            print("❌ Campaign SMS error:", e)
+            counts["failed"] += 1
+            continue
+
+        db.collection("alerts").add({
+            "student_id": student["student_id"],
+            "risk_level": "High",
+            "phone_number": student["phone_number"],
+            "message": message,
+            "created_at": _now().isoformat(),
+            "sms_status": sms["status"],
+            "sms_sid": sms["sid"],
+            "campaign": pipeline.run_id
+        })
+        counts["sent"] += 1
+
+    return counts
+
+
+# name, function, stages it depends on; run in this order
+STAGES = [
+    ("ingest", ingest_stage, ()),
+    ("score", score_stage, ("ingest",)),
+    ("drift", drift_stage, ("score",)),
+    ("alerts", alerts_stage, ("score",)),
+]
+STAGE_NAMES = [name for name, _, _ in STAGES]
+
+
+# -------------------------------------------------
+# RUNNER
+# -------------------------------------------------
+class Pipeline:
+    """Runs STAGES in order and checkpoints each one in pipeline_runs/{run_id}.
+
+    A stage whose dependencies did not complete is skipped; resuming a run
+    re-runs only the stages that are not completed yet. `registry` (a
+    ShardedModelRegistry) scores per shard when given, `drift_monitor` (a
+    drift.SharedDrift) receives the scored students, `revision` is bumped
+    after writes, `history` (a RiskHistory) records every score and
+    `on_event(type, data)` receives progress. With `import_dir`, file
+    sources outside that directory are refused.
+    """
+
+    def __init__(self, db, predictor, registry=None, drift_monitor=None,
+                 revision=None, on_event=None, history=None, import_dir=None):
+        self.db = db
+        self.predictor = predictor
+        self.registry = registry
+        self.drift_monitor = drift_monitor
+        self.revision = revision
+        self.history = history
+        self.on_event = on_event or (lambda event_type, data: None)
+        self.import_dir = import_dir
+        self.run_id = None
+        self.lease = None
+        self.holder = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+    def score(self, students):
+        scorer = self.registry or self.predictor
+        return scorer.predict_batch(students)
+
+    def version_for(self, student):
+        if self.registry is not None:
+            return self.registry.version_for(student)
+        return self.predictor.version
+
+    def changed(self):
+        if self.revision is not None:
+            self.revision.bump()
+
+    def _save(self, run):
+        self.db.collection(RUNS).document(run["run_id"]).set(run)
+
+    def get_run(self, run_id):
+        doc = self.db.collection(RUNS).document(run_id).get()
+        return doc.to_dict() if doc.exists else None
+
+    def latest_run(self):
+        docs = list(
+            self.db.collection(RUNS).order_by("started_at", direction="DESCENDING").limit(1).stream()
+        )
+        return docs[0].to_dict() if docs else None
+
+    def run(self, params=None, run_id=None, resume=False, trigger="manual", stages=None):
+        """Run (or with `resume`, continue) a pipeline run; returns its record"""
+        run = self.get_run(run_id) if run_id else None
+        if resume and run is None:
+            if run_id:
+                raise RunNotFound(f"No pipeline run {run_id}")
+            run = self.latest_run()
+        if run is not None and not resume:
+            raise ValueError(f"Run {run_id} already exists, pass resume to continue it")
+
+        if run is None:
+            if (params or {}).get("source"):
+                # refused up front rather than as a failed ingest stage
+                source_path(params["source"], self.import_dir)
+            run = {
+                # two triggers in the same second must not share checkpoints or the lease
+                "run_id": run_id or f"{_now():run-%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:6]}",
+                "trigger": trigger,
+                "params": params or {},
+                "stages": {},
+                "started_at": _now().isoformat()
+            }
+        if self.predictor.model is None:
+            raise ValueError("Model not trained")
+
+        self.run_id = run["run_id"]
+        run.update({"status": "running", "finished_at": None})
+        self._save(run)
+        self.on_event("pipeline", {"run_id": self.run_id, "status": "running"})
+
+        selected = set(stages or STAGE_NAMES)
+        for name, fn, requires in STAGES:
+            if run["stages"].get(name, {}).get("status") == "completed" or name not in selected:
+                continue
+            if any(run["stages"].get(r, {}).get("status") != "completed" for r in requires):
+                run["stages"][name] = {"status": "skipped", "reason": f"needs {', '.join(requires)}"}
+                continue
+
+            self.renew_lease()
+            started = time.perf_counter()
+            self.on_event("pipeline", {"run_id": self.run_id, "stage": name, "status": "running"})
+            try:
+                summary = fn(self, run["params"])
+                state = {"status": "completed", "summary": summary}
+            except Exception as e:
+                print(f"❌ Pipeline stage {name} failed:", e)
+                state = {"status": "failed", "error": str(e)}
+
+            state.update({
+                "seconds": round(time.perf_counter() - started, 3),
+                "finished_at": _now().isoformat()
+            })
+            run["stages"][name] = state
+            # checkpoint: a resumed run starts after the last completed stage
+            self._save(run)
+            self.on_event("pipeline", {"run_id": self.run_id, "stage": name, "status": state["status"]})
+
+        done = all(run["stages"].get(n, {}).get("status") == "completed" for n in selected)
+        run.update({"status": "completed" if done else "failed", "finished_at": _now().isoformat()})
+        self._save(run)
+        self.on_event("pipeline", {"run_id": self.run_id, "status": run["status"]})
+        return run
+
+    # -------------------------------------------------
+    # LEASES
+    # -------------------------------------------------
+    # pipeline_leases/{name}.{n}: created atomically, so exactly one caller
+    # gets each generation n. An expired lease is taken over by creating
+    # generation n + 1; generations are never deleted, only expired, so two
+    # callers can't both end up holding one.
+    def acquire_lease(self, name, seconds=LEASE_SECONDS):
+        """Exclusive claim on `name`; False while someone else holds it"""
+        from google.api_core.exceptions import Conflict
+
+        leases = self.db.collection(LEASES)
+        generation = 0
+        while True:
+            now = _now()
+            ref = leases.document(f"{name}.{generation}")
+            try:
+                ref.create({
+                    "holder": self.holder,
+                    "expires_at": (now + timedelta(seconds=seconds)).isoformat()
+                })
+                self.lease = (ref, generation, seconds)
+                return True
+            except Conflict:
+                pass
+
+            doc = ref.get()
+            if not doc.exists:
+                continue
+            if doc.to_dict()["expires_at"] > now.isoformat():
+                return False
+            generation += 1
+
+    def renew_lease(self):
+        """Push our lease back; fails if it lapsed and someone took over"""
+        if self.lease is None:
+            return
+        ref, generation, seconds = self.lease
+        name = ref.id.rsplit(".", 1)[0]
+        if self.db.collection(LEASES).document(f"{name}.{generation + 1}").get().exists:
+            raise RuntimeError(f"Lease on {name} expired and was taken over")
+        ref.set({"expires_at": (_now() + timedelta(seconds=seconds)).isoformat()}, merge=True)
+
+    def release_lease(self):
+        if self.lease is not None:
+            self.lease[0].set({"expires_at": _now().isoformat()}, merge=True)
+            self.lease = None
+
+
+# -------------------------------------------------
+# SCHEDULE
+# -------------------------------------------------
+def seconds_until(daily_at, now=None):
+    """Seconds from `now` to the next HH:MM (UTC)"""
+    now = now or _now()
+    hour, minute = (int(x) for x in daily_at.split(":"))
+    target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if target <= now:
+        target += timedelta(days=1)
+    return (target - now).total_seconds()
+
+
+def scheduled_run_id(daily_at=None, now=None):
+    """One id per scheduled day, so several workers / restarts share it.
+    With `daily_at`, the day is that of the last HH:MM that passed, so
+    retries after midnight still continue the previous day's run."""
+    now = now or _now()
+    if daily_at:
+        now += timedelta(seconds=seconds_until(daily_at, now)) - timedelta(days=1)
+    return now.strftime("scheduled-%Y%m%d")
+
+
+def scheduled_pending(pipeline, daily_at=None):
+    """The current scheduled run exists and has not completed"""
+    run = pipeline.get_run(scheduled_run_id(daily_at))
+    return run is not None and run["status"] != "completed"
+
+
+def run_scheduled(pipeline, params, daily_at=None):
+    """Start the scheduled run, or resume it if it failed or its worker died.
+
+    The lease makes this safe to call from every worker at once: one runs,
+    the others get the run record as it stands (None if it isn't saved yet).
+    """
+    run_id = scheduled_run_id(daily_at)
+    existing = pipeline.get_run(run_id)
+    if existing and existing["status"] == "completed":
+        return existing
+    if not pipeline.acquire_lease(run_id):
+        return existing or pipeline.get_run(run_id)
+
+    try:
+        existing = pipeline.get_run(run_id)
+        if existing and existing["status"] == "completed":
+            return existing
+        return pipeline.run(params, run_id=run_id, resume=existing is not None, trigger="schedule")
+    finally:
+        pipeline.release_lease()
+
+
+def _print_run(run):
+    print(f"{run['run_id']}  {run['status']}  ({run['trigger']}, started {run['started_at']})")
+    for name in STAGE_NAMES:
+        state = run["stages"].get(name)
+        if state is None:
+            continue
+        detail = state.get("error") or state.get("reason") or json.dumps(state.get("summary"), default=str)
+        seconds = f"{state['seconds']:7.2f}s" if "seconds" in state else " " * 8
+        print(f"  {name:8} {state['status']:10} {seconds}  {detail}")
+
+
+if __name__ == "__main__":
+    # python pipeline.py run --synthetic 500        (STORAGE_BACKEND=local SMS_PROVIDER=fake offline)
+    # python pipeline.py run --resume               continue the latest failed run
+    # python pipeline.py status [RUN_ID]
+    # python pipeline.py schedule --at 02:00        run every day at 02:00 UTC
+    from dotenv import load_dotenv
+
+    from cache import DataRevision
+    from drift import DriftMonitor, SharedDrift
+    from ml_model import DropoutPredictor
+    from model_registry import ShardedModelRegistry
+    from risk_history import RiskHistory
+    from storage import ROOT_DIR, get_database
+
+    parser = argparse.ArgumentParser(description="Ingest -> score -> drift -> alert pipeline")
+    parser.add_argument("command", choices=["run", "status", "schedule"])
+    parser.add_argument("run_id", nargs="?")
+    parser.add_argument("--source", help="CSV or Parquet file of students to ingest")
+    parser.add_argument("--synthetic", type=int, help="ingest N synthetic students instead")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--stages", nargs="+", choices=STAGE_NAMES)
+    parser.add_argument("--max-alerts", type=int)
+    parser.add_argument("--cooldown-days", type=int, default=ALERT_COOLDOWN_DAYS)
+    parser.add_argument("--resume", action="store_true")
+    parser.add_argument("--at", default="02:00", help="daily time (UTC) for schedule")
+    args = parser.parse_args()
+
+    load_dotenv(ROOT_DIR / ".env")
+    db = get_database()
+    predictor = DropoutPredictor()
+    predictor.load_model(str(ROOT_DIR / "dropout_model.pkl"))
+
+    monitor = SharedDrift(db, DriftMonitor(predictor.drift_reference))
+
+    pipeline = Pipeline(
+        db, predictor, ShardedModelRegistry(predictor), monitor, DataRevision(db),
+        on_event=lambda event_type, data: print("·", data), history=RiskHistory()
+    )
+    params = {
+        "source": args.source,
+        "synthetic": args.synthetic,
+        "seed": args.seed,
+        "max_alerts": args.max_alerts,
+        "cooldown_days": args.cooldown_days
+    }
+
+    if args.command == "status":
+        run = pipeline.get_run(args.run_id) if args.run_id else pipeline.latest_run()
+        if run is None:
+            raise SystemExit("No pipeline runs yet")
+        _print_run(run)
+    elif args.command == "run":
+        _print_run(pipeline.run(params, args.run_id, args.resume, stages=args.stages))
+    else:
+        while True:
+            wait = seconds_until(args.at)
+            print(f"Next run in {wait / 3600:.1f} h")
+            time.sleep(wait)
+            run = run_scheduled(pipeline, params, args.at)
+            if run is not None:
+                _print_run(run)
@@ -0,0 +1,144 @@
+import gzip
+import json
+import math
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - stdlib fallback
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - gzip only
+    brotli = None
+
+# Payloads smaller than this are not worth compressing
+COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+
+# -------------------------------------------------
+# ENCODING
+# -------------------------------------------------
+def _default(obj):
+    """Types neither encoder handles natively (NumPy scalars, NaT/NA, dates)"""
+    if isinstance(obj, np.generic):
+        value = obj.item()
+        if isinstance(value, float) and not math.isfinite(value):
+            return None
+        return value
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if obj is pd.NaT or obj is pd.NA:
+        return None
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def _encode_orjson(content) -> bytes:
+    # orjson writes NaN/Infinity as null and NumPy values natively,
+    # so sanitization happens during the single encoding pass
+    return orjson.dumps(
+        content,
+        default=_default,
+        option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+    )
+
+
+def _sanitize(obj):
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {k: _sanitize(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_sanitize(v) for v in obj]
+    if isinstance(obj, np.generic):
+        return _default(obj)
+    return obj
+
+
+def _encode_stdlib(content) -> bytes:
+    # The C encoder can't hook float formatting, so NaN needs a walk first
+    return json.dumps(
+        _sanitize(content),
+        default=_default,
+        allow_nan=False,
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+encode_json = _encode_orjson if orjson is not None else _encode_stdlib
+
+
+# -------------------------------------------------
+# COMPRESSION
+# -------------------------------------------------
+def _accepted_encodings(request) -> set:
+    if request is None:
+        return set()
+    header = request.headers.get("accept-encoding", "")
+    accepted = set()
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0"):
+            continue
+        accepted.add(token.strip().lower())
+    return accepted
+
+
+def choose_encoding(request, size: int):
+    """Best content-encoding the client accepts for a body of `size` bytes"""
+    if size < COMPRESS_MIN_BYTES:
+        return None
+
+    accepted = _accepted_encodings(request)
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def compress_body(body: bytes, encoding) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL)
+    return body
+
+
+# -------------------------------------------------
+# RESPONSES
+# -------------------------------------------------
+def encoded_response(body: bytes, encoding=None, request=None, status_code=200, headers=None) -> Response:
+    """Wrap an already encoded (and possibly compressed) JSON body"""
+    headers = dict(headers or {})
+    if request is not None:
+        headers["Vary"] = "Accept-Encoding"
+    if encoding:
+        headers["Content-Encoding"] = encoding
+
+    return Response(
+        content=body,
+        status_code=status_code,
+        headers=headers,
+        media_type="application/json",
+    )
+
+
+def json_response(content, request=None, status_code=200, headers=None) -> Response:
+    """Encode `content` once (NaN -> null, NumPy -> Python) and compress it
+    when the request advertises gzip/br support."""
+    body = encode_json(content)
+    encoding = choose_encoding(request, len(body))
+    return encoded_response(
+        compress_body(body, encoding), encoding, request, status_code, headers
+    )
@@ -0,0 +1,247 @@
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+try:
+    import fcntl
+except ImportError:  # Windows: rollup writers are only serialized within a process
+    fcntl = None
+
+ROOT_DIR = Path(__file__).parent
+HISTORY_DIR = ROOT_DIR / "history"
+
+RISK_LEVELS = ["High", "Medium", "Low"]
+PERIODS = ("daily", "weekly")
+LEVELS = ("all", "district", "school")
+ALL_KEY = "All"
+
+SCHEMA = pa.schema([
+    ("student_id", pa.string()),
+    ("school", pa.dictionary(pa.int16(), pa.string())),
+    ("district", pa.dictionary(pa.int16(), pa.string())),
+    ("predicted_risk", pa.dictionary(pa.int8(), pa.string())),
+    ("confidence", pa.float32()),
+    ("predicted_at", pa.timestamp("us", tz="UTC")),
+    ("model_version", pa.string()),
+])
+
+
+def _week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+def _utc(value, name):
+    """ISO date / datetime query parameter as a UTC Timestamp"""
+    try:
+        ts = pd.Timestamp(value)
+    except (TypeError, ValueError):
+        ts = pd.NaT
+    if ts is pd.NaT:
+        raise ValueError(f"{name} must be an ISO date or datetime")
+    return ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+
+
+class RiskHistory:
+    """Append-only prediction history with daily / weekly rollups.
+
+    Every scoring batch becomes one new Parquet file under
+    predictions/date=YYYY-MM-DD/, sorted by student_id so single-student
+    reads can skip row groups. Rollups hold, per period and per school /
+    district / overall, the risk counts and mean confidence of each
+    student's latest prediction in that period; only the periods a batch
+    touched are recomputed, under a lock file shared by every process
+    writing here (server workers, the pipeline CLI). Trend endpoints read
+    the small rollup files, kept in memory until they change on disk.
+    """
+
+    def __init__(self, root=HISTORY_DIR):
+        self.root = Path(root)
+        self.raw_dir = self.root / "predictions"
+        self.rollup_dir = self.root / "rollups"
+        self._lock = threading.Lock()
+        self._rollups = {}
+
+    # -------------------------------------------------
+    # APPEND
+    # -------------------------------------------------
+    def append(self, records):
+        """Store scored records (as written to `predictions`); returns the days touched"""
+        if not records:
+            return []
+
+        df = pd.DataFrame({
+            "student_id": [str(r["student_id"]) for r in records],
+            "school": [r.get("school") for r in records],
+            "district": [r.get("district") for r in records],
+            "predicted_risk": [r["predicted_risk"] for r in records],
+            "confidence": [r["confidence"] for r in records],
+            "predicted_at": pd.to_datetime([r["predicted_at"] for r in records], utc=True, format="ISO8601"),
+            "model_version": [r.get("model_version") for r in records],
+        }).sort_values("student_id")
+
+        days = sorted(set(df["predicted_at"].dt.date))
+        for day in days:
+            part = df[df["predicted_at"].dt.date == day]
+            folder = self.raw_dir / f"date={day.isoformat()}"
+            folder.mkdir(parents=True, exist_ok=True)
+            path = folder / f"part-{datetime.now(timezone.utc):%H%M%S%f}-{uuid.uuid4().hex[:8]}.parquet"
+            # renamed once complete: another writer's refresh may be listing the folder
+            tmp = path.with_suffix(".tmp")
+            pq.write_table(pa.Table.from_pandas(part, schema=SCHEMA, preserve_index=False), tmp)
+            tmp.replace(path)
+
+        self.refresh_rollups(days)
+        return days
+
+    # -------------------------------------------------
+    # RAW READS
+    # -------------------------------------------------
+    def _dataset(self, days=None):
+        if days is not None:
+            folders = [self.raw_dir / f"date={d.isoformat()}" for d in days]
+            files = [str(f) for folder in folders if folder.exists() for f in sorted(folder.glob("*.parquet"))]
+        else:
+            files = [str(f) for f in sorted(self.raw_dir.glob("date=*/*.parquet"))]
+        return ds.dataset(files, schema=SCHEMA, format="parquet") if files else None
+
+    def _read_days(self, days):
+        dataset = self._dataset(days)
+        return dataset.to_table().to_pandas() if dataset is not None else pd.DataFrame(columns=SCHEMA.names)
+
+    def student_history(self, student_id, since=None, until=None):
+        """Every stored prediction of one student, oldest first"""
+        condition = ds.field("student_id") == student_id
+        if since:
+            condition &= ds.field("predicted_at") >= _utc(since, "since")
+        if until:
+            condition &= ds.field("predicted_at") < _utc(until, "until")
+
+        dataset = self._dataset()
+        if dataset is None:
+            return []
+
+        df = dataset.to_table(
+            filter=condition, columns=["predicted_at", "predicted_risk", "confidence", "model_version"]
+        ).to_pandas().sort_values("predicted_at")
+        df["predicted_at"] = df["predicted_at"].map(lambda t: t.isoformat())
+        df["predicted_risk"] = df["predicted_risk"].astype(str)
+        df["confidence"] = df["confidence"].astype(float).round(4)
+        return df.to_dict("records")
+
+    # -------------------------------------------------
+    # ROLLUPS
+    # -------------------------------------------------
+    def _aggregate(self, df, period):
+        df = df.copy()
+        day = df["predicted_at"].dt.tz_convert("UTC").dt.date
+        df["period"] = day.map(_week_start) if period == "weekly" else day
+        # one vote per student per period: their latest prediction
+        latest = df.sort_values("predicted_at").drop_duplicates(["period", "student_id"], keep="last")
+        latest = latest.astype({"predicted_risk": str})
+
+        frames = []
+        for level in LEVELS:
+            keys = ALL_KEY if level == "all" else latest[level].astype(object).fillna("Unknown")
+            grouped = latest.assign(level=level, key=keys).groupby(["period", "level", "key"])
+            counts = grouped["predicted_risk"].value_counts().unstack(fill_value=0)
+            frame = counts.reindex(columns=RISK_LEVELS, fill_value=0).astype("int32")
+            frame["total"] = grouped.size().astype("int32")
+            frame["mean_confidence"] = grouped["confidence"].mean().astype("float32")
+            frames.append(frame.reset_index())
+        return pd.concat(frames, ignore_index=True)
+
+    @contextmanager
+    def _exclusive(self):
+        # raw files are read and rollups rewritten inside the lock, so a
+        # batch appended meanwhile is picked up by its own refresh afterwards
+        with self._lock:
+            self.rollup_dir.mkdir(parents=True, exist_ok=True)
+            with open(self.rollup_dir / ".lock", "a") as handle:
+                if fcntl is not None:
+                    fcntl.flock(handle, fcntl.LOCK_EX)
+                yield
+
+    def refresh_rollups(self, days):
+        """Recompute the daily and weekly rows covering `days` from raw history"""
+        with self._exclusive():
+            self._refresh(days)
+
+    def _refresh(self, days):
+        days = sorted(set(days))
+        if not days:
+            return
+
+        for period in PERIODS:
+            if period == "weekly":
+                periods = sorted({_week_start(d) for d in days})
+                read = [w + timedelta(days=i) for w in periods for i in range(7)]
+            else:
+                periods, read = days, days
+
+            fresh = self._aggregate(self._read_days(read), period)
+            current = self._load_rollup(period)
+            if not current.empty:
+                current = current[~current["period"].isin(periods)]
+            merged = pd.concat([current, fresh], ignore_index=True).sort_values(["level", "key", "period"])
+
+            # write-then-rename: readers outside the lock see the old or the new file
+            path = self.rollup_dir / f"{period}.parquet"
+            tmp = path.with_name(f"{period}.{uuid.uuid4().hex[:8]}.tmp")
+            pq.write_table(pa.Table.from_pandas(merged, preserve_index=False), tmp)
+            tmp.replace(path)
+
+    def rebuild(self):
+        """Recompute every rollup from the full raw history"""
+        with self._exclusive():
+            days = [date.fromisoformat(p.name[len("date="):]) for p in self.raw_dir.glob("date=*")]
+            for period in PERIODS:
+                (self.rollup_dir / f"{period}.parquet").unlink(missing_ok=True)
+            self._refresh(days)
+
+    def _load_rollup(self, period):
+        path = self.rollup_dir / f"{period}.parquet"
+        if not path.exists():
+            return pd.DataFrame()
+
+        mtime = path.stat().st_mtime_ns
+        cached = self._rollups.get(period)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, pq.read_table(path).to_pandas())
+            self._rollups[period] = cached
+        return cached[1]
+
+    def trend(self, period="daily", level="all", key=None, since=None, until=None):
+        """Rollup rows for one school / district (or all of them), oldest first"""
+        if period not in PERIODS:
+            raise ValueError(f"period must be one of {', '.join(PERIODS)}")
+        if level not in LEVELS:
+            raise ValueError(f"level must be one of {', '.join(LEVELS)}")
+
+        df = self._load_rollup(period)
+        if df.empty:
+            return []
+
+        rows = df["level"] == level
+        if key is not None:
+            rows &= df["key"] == key
+        if since:
+            rows &= df["period"] >= date.fromisoformat(since[:10])
+        if until:
+            rows &= df["period"] < date.fromisoformat(until[:10])
+
+        out = df[rows].copy()
+        out["period"] = out["period"].map(lambda d: d.isoformat())
+        out["mean_confidence"] = out["mean_confidence"].astype(float).round(4)
+        return out.to_dict("records")
+
+
+if __name__ == "__main__":
+    # python risk_history.py   recompute all rollups from the raw history
+    RiskHistory().rebuild()
@@ -0,0 +1,306 @@
+import sys
+import threading
+
+import numpy as np
+
+# Columns kept per student: floats as float32 (NaN = missing), strings as
+# int16 codes into a per-column category list (-1 = missing)
+NUMERIC = (
+    "age",
+    "attendance_percentage",
+    "average_marks",
+    "absences_per_month",
+    "distance_to_school_km",
+    "confidence",
+)
+CATEGORICAL = (
+    "school",
+    "district",
+    "region",
+    "family_income_level",
+    "parents_education_level",
+    "health_issues",
+    "predicted_risk",
+)
+GROUP_BY = ("school", "district", "region")
+RISK_LEVELS = ("High", "Medium", "Low")
+INITIAL_CAPACITY = 1024
+# What a reload swaps in
+_STATE = ("size", "_ids", "_rows", "_numeric", "_codes", "_categories", "_lookup")
+
+_MISSING = object()
+
+
+class Roster:
+    """Process-local columnar copy of students and their latest prediction.
+
+    Stats, filters and group-bys run as NumPy operations over these arrays
+    instead of building a dict and a DataFrame per student per request.
+    It is loaded once from the database, patched in place by the write
+    events this worker publishes, and reloaded when the shared data
+    revision moves in a way those events don't explain (another worker, a
+    pipeline run).
+    """
+
+    def __init__(self, capacity=INITIAL_CAPACITY):
+        self.synced_revision = None
+        # revision bumps behind the events applied since synced_revision
+        self.local_bumps = 0
+        self._lock = threading.RLock()
+        self._reset(capacity)
+
+    def _reset(self, capacity):
+        self.size = 0
+        self._ids = []
+        self._rows = {}
+        self._numeric = {c: np.full(capacity, np.nan, dtype=np.float32) for c in NUMERIC}
+        self._codes = {c: np.full(capacity, -1, dtype=np.int16) for c in CATEGORICAL}
+        self._categories = {c: [] for c in CATEGORICAL}
+        self._lookup = {c: {} for c in CATEGORICAL}
+
+    @property
+    def capacity(self):
+        return len(self._numeric[NUMERIC[0]])
+
+    def _grow(self, needed):
+        capacity = self.capacity
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for columns, fill in ((self._numeric, np.nan), (self._codes, -1)):
+            for name, old in columns.items():
+                new = np.full(capacity, fill, dtype=old.dtype)
+                new[:self.size] = old[:self.size]
+                columns[name] = new
+
+    def _code(self, column, value):
+        if value is None or value == "":
+            return -1
+        value = str(value)
+        lookup = self._lookup[column]
+        code = lookup.get(value)
+        if code is None:
+            code = lookup[value] = len(self._categories[column])
+            self._categories[column].append(value)
+        return code
+
+    # -------------------------------------------------
+    # WRITES
+    # -------------------------------------------------
+    def upsert(self, records):
+        """Add or patch students; only the columns present in a record change"""
+        if not records:
+            return
+
+        with self._lock:
+            rows = np.empty(len(records), dtype=np.int64)
+            for i, record in enumerate(records):
+                sid = str(record["student_id"])
+                row = self._rows.get(sid)
+                if row is None:
+                    row = self._rows[sid] = len(self._ids)
+                    self._ids.append(sid)
+                rows[i] = row
+            self._grow(len(self._ids))
+            self.size = len(self._ids)
+
+            for column in NUMERIC + CATEGORICAL:
+                values = [r.get(column, _MISSING) for r in records]
+                present = np.fromiter((v is not _MISSING for v in values), dtype=bool, count=len(values))
+                if not present.any():
+                    continue
+                values = [v for v, p in zip(values, present) if p]
+
+                if column in self._numeric:
+                    self._numeric[column][rows[present]] = np.array(
+                        [np.nan if v is None else v for v in values], dtype=np.float32
+                    )
+                else:
+                    self._codes[column][rows[present]] = [self._code(column, v) for v in values]
+
+    def load(self, db, revision=None):
+        """Rebuild from the students and predictions collections"""
+        students = [doc.to_dict() for doc in db.collection("students").stream()]
+        predictions = [doc.to_dict() for doc in db.collection("predictions").stream()]
+        # predictions of students that no longer exist stay out
+        known = {s.get("student_id") for s in students}
+
+        fresh = Roster(capacity=max(INITIAL_CAPACITY, len(students)))
+        fresh.upsert([s for s in students if s.get("student_id")])
+        fresh.upsert([
+            {k: p.get(k) for k in ("student_id", "predicted_risk", "confidence")}
+            for p in predictions if p.get("student_id") in known
+        ])
+
+        with self._lock:
+            for name in _STATE:
+                setattr(self, name, getattr(fresh, name))
+            self.synced_revision = revision
+            self.local_bumps = 0
+
+    def stale(self, revision):
+        """Whether `revision` (the shared one) holds writes this roster lacks.
+
+        Each applied event stands for one bump of our own; a revision past
+        synced_revision + those bumps means someone else wrote too. One
+        that hasn't caught up with our bumps yet is not stale: the patches
+        are already here.
+        """
+        with self._lock:
+            if self.synced_revision is None:
+                return True
+            expected = self.synced_revision + self.local_bumps
+            if revision == expected:
+                self.synced_revision, self.local_bumps = revision, 0
+            return revision < self.synced_revision or revision > expected
+
+    def mark_stale(self):
+        self.synced_revision = None
+
+    def apply(self, event_type, data):
+        """Change-feed listener (EventBroker.add_listener); no I/O, it runs
+        inside publish"""
+        if event_type == "resync":
+            self.mark_stale()
+        if event_type not in ("student_added", "predictions_updated"):
+            return
+
+        try:
+            self.upsert([data] if event_type == "student_added" else data["predictions"])
+        except Exception:
+            # half-applied: the next read reloads instead
+            self.mark_stale()
+            raise
+
+        with self._lock:
+            self.local_bumps += 1
+
+    # -------------------------------------------------
+    # QUERIES
+    # -------------------------------------------------
+    def _mask(self, risk=None, **filters):
+        mask = np.ones(self.size, dtype=bool)
+        for column, value in {**filters, "predicted_risk": risk}.items():
+            if value is None:
+                continue
+            code = self._lookup[column].get(str(value))
+            if code is None:
+                return np.zeros(self.size, dtype=bool)
+            mask &= self._codes[column][:self.size] == code
+        return mask
+
+    def _risk_counts(self, rows):
+        codes = self._codes["predicted_risk"][:self.size][rows]
+        counts = np.bincount(codes[codes >= 0], minlength=len(self._categories["predicted_risk"]))
+        by_label = dict(zip(self._categories["predicted_risk"], counts.tolist()))
+        return {level: by_label.get(level, 0) for level in RISK_LEVELS}
+
+    def _mean(self, column, rows):
+        values = self._numeric[column][:self.size][rows]
+        values = values[~np.isnan(values)]
+        return float(values.mean(dtype=np.float64)) if len(values) else 0
+
+    def stats(self, district=None, school=None, region=None):
+        """Same shape as the /stats payload; scored students only once any are"""
+        with self._lock:
+            rows = self._mask(district=district, school=school, region=region)
+            scored = rows & (self._codes["predicted_risk"][:self.size] >= 0)
+            has_predictions = bool(scored.any())
+            if has_predictions:
+                rows = scored
+
+            return {
+                "total_students": int(rows.sum()),
+                "risk_distribution": self._risk_counts(rows),
+                "average_attendance": self._mean("attendance_percentage", rows),
+                "average_marks": self._mean("average_marks", rows),
+                "has_predictions": has_predictions
+            }
+
+    def group_by(self, by, district=None, school=None, region=None):
+        """Counts and means per school / district / region, largest first"""
+        if by not in GROUP_BY:
+            raise ValueError(f"by must be one of {', '.join(GROUP_BY)}")
+
+        with self._lock:
+            rows = self._mask(district=district, school=school, region=region)
+            keys = self._codes[by][:self.size][rows]
+            # missing values (-1) get their own bucket at the end
+            n_groups = len(self._categories[by]) + 1
+            keys = np.where(keys < 0, n_groups - 1, keys)
+
+            total = np.bincount(keys, minlength=n_groups)
+            risk = self._codes["predicted_risk"][:self.size][rows]
+            risk_counts = {
+                level: np.bincount(keys[risk == code], minlength=n_groups)
+                for level, code in ((lv, self._lookup["predicted_risk"].get(lv)) for lv in RISK_LEVELS)
+                if code is not None
+            }
+
+            means = {}
+            for column in ("attendance_percentage", "average_marks", "confidence"):
+                values = self._numeric[column][:self.size][rows]
+                known = ~np.isnan(values)
+                sums = np.bincount(keys[known], weights=values[known], minlength=n_groups)
+                counts = np.bincount(keys[known], minlength=n_groups)
+                means[column] = np.divide(sums, counts, out=np.zeros(n_groups), where=counts > 0)
+
+            labels = self._categories[by] + ["Unknown"]
+            groups = []
+            for g in np.flatnonzero(total):
+                groups.append({
+                    by: labels[g],
+                    "total_students": int(total[g]),
+                    "risk_distribution": {
+                        level: int(risk_counts[level][g]) if level in risk_counts else 0
+                        for level in RISK_LEVELS
+                    },
+                    "average_attendance": round(float(means["attendance_percentage"][g]), 2),
+                    "average_marks": round(float(means["average_marks"][g]), 2),
+                    "average_confidence": round(float(means["confidence"][g]), 4)
+                })
+
+        return sorted(groups, key=lambda g: g["total_students"], reverse=True)
+
+    def select(self, district=None, school=None, region=None, risk=None,
+               max_attendance=None, max_marks=None, sort=None, limit=100, offset=0):
+        """Matching students as compact rows; `sort` is a numeric column, '-' for descending"""
+        with self._lock:
+            rows = self._mask(risk=risk, district=district, school=school, region=region)
+            for column, bound in (("attendance_percentage", max_attendance), ("average_marks", max_marks)):
+                if bound is not None:
+                    rows &= self._numeric[column][:self.size] <= bound
+            matches = np.flatnonzero(rows)
+
+            if sort:
+                column = sort.lstrip("-")
+                if column not in NUMERIC:
+                    raise ValueError(f"sort must be one of {', '.join(NUMERIC)}")
+                values = self._numeric[column][matches]
+                if sort.startswith("-"):
+                    values = -values
+                # NaN sorts last either way
+                matches = matches[np.argsort(values, kind="stable")]
+
+            page = matches[offset:offset + limit]
+            students = []
+            for row in page.tolist():
+                student = {"student_id": self._ids[row]}
+                for column in NUMERIC:
+                    value = self._numeric[column][row]
+                    student[column] = None if np.isnan(value) else round(float(value), 4)
+                for column in CATEGORICAL:
+                    code = self._codes[column][row]
+                    student[column] = self._categories[column][code] if code >= 0 else None
+                students.append(student)
+
+        return {"total": len(matches), "students": students}
+
+    def memory_bytes(self):
+        """Arrays, category lists and the id index"""
+        with self._lock:
+            arrays = sum(a.nbytes for a in self._numeric.values()) + sum(a.nbytes for a in self._codes.values())
+            index = sys.getsizeof(self._rows) + sys.getsizeof(self._ids) + sum(sys.getsizeof(s) for s in self._ids)
+            categories = sum(sys.getsizeof(v) for values in self._categories.values() for v in values)
+            return {"students": self.size, "arrays": arrays, "index": index, "categories": categories}
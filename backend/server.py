@@ -1,35 +1,38 @@
-from fastapi import FastAPI, APIRouter, HTTPException
-from fastapi.responses import Response
+from fastapi import FastAPI, APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from starlette.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 from pathlib import Path
 from pydantic import BaseModel
-from typing import Optional
+from typing import Any, Dict, List, Optional
 from datetime import datetime, timezone
 from sms_service import send_sms
+from responses import json_response
+from cache import DataRevision, ResponseCache
+from events import EventBroker
+from drift import DriftMonitor, SharedDrift
+from admission import ConcurrencyLimiter, JobQueue, SingleFlight
 import pandas as pd
-import json
+import asyncio
 import os
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 
-# Firebase
-import firebase_admin
-from firebase_admin import credentials, firestore
-
+from storage import get_database, AsyncDatabase
+from history import query_history, count_history, DEFAULT_PAGE_SIZE
 from ml_model import DropoutPredictor
-import math
-
-def clean_nan(value):
-    if isinstance(value, float) and math.isnan(value):
-        return 0.0
-    return value
-
-def clean_dict(obj):
-    if isinstance(obj, dict):
-        return {k: clean_dict(v) for k, v in obj.items()}
-    if isinstance(obj, list):
-        return [clean_dict(v) for v in obj]
-    return clean_nan(obj)
+from compression import MAX_ACCURACY_LOSS
+from evaluation import evaluate, save_model_version, save_evaluation, load_model_metrics
+from model_registry import ShardedModelRegistry, train_shards, MIN_SHARD_SIZE
+from training_cache import TrainingSnapshot
+from risk_history import RiskHistory
+from simulation import simulate
+from features import derive
+from roster import Roster
+from pipeline import (
+    Pipeline, RunNotFound, STAGE_NAMES, ALERT_COOLDOWN_DAYS,
+    run_scheduled, scheduled_pending, seconds_until
+)
 
 # -------------------------------------------------
 # INIT
@@ -37,13 +40,31 @@ def clean_dict(obj):
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / ".env")
 
-firebase_json = os.getenv("FIREBASE_SERVICE_ACCOUNT")
-if not firebase_json:
-    raise RuntimeError("FIREBASE_SERVICE_ACCOUNT env variable not set")
+# Firestore, or the local SQLite store when STORAGE_BACKEND=local
+db = get_database()
+# Shared thread pool over the same client, for reads that can run together
+adb = AsyncDatabase(db)
 
-cred = credentials.Certificate(json.loads(firebase_json))
-firebase_admin.initialize_app(cred)
-db = firestore.client()
+# Revision of students / predictions / model, drives ETags and the response cache
+data_revision = DataRevision(db, adb=adb)
+response_cache = ResponseCache(data_revision)
+
+# Live change feed for dashboards (/api/events), relayed between workers through storage
+event_broker = EventBroker(db)
+
+# Columnar copy of students + latest predictions for stats, filters and group-bys,
+# patched by this worker's write events and reloaded when the revision moves otherwise
+roster = Roster()
+event_broker.add_listener(roster.apply)
+roster_loads = SingleFlight()
+
+# Identical concurrent history reads share one query
+history_reads = SingleFlight()
+# Whole-collection reads running at once; bursts beyond the queue get 429
+heavy_reads = ConcurrencyLimiter("read")
+# Train / batch predict jobs run one at a time, in order; the lease extends
+# that to the other workers
+model_jobs = JobQueue(adb=adb)
 
 app = FastAPI()
 api_router = APIRouter(prefix="/api")
@@ -52,7 +73,40 @@ MODEL_PATH = ROOT_DIR / "dropout_model.pkl"
 predictor = DropoutPredictor()
 predictor.load_model(str(MODEL_PATH))
 
-MODEL_METRICS = None
+# Per-district / per-region models, falling back to `predictor`
+model_registry = ShardedModelRegistry(predictor)
+
+# Offline evaluation of each new model, one at a time in the background
+evaluation_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="evaluation")
+
+# Local Parquet copy of training_students, synced incrementally before training
+training_snapshot = TrainingSnapshot(db)
+
+# Live feature histograms vs. the training reference saved with the model;
+# each worker keeps its own counts in storage and /drift sums them
+drift_monitor = SharedDrift(db, DriftMonitor(predictor.drift_reference))
+
+# How many interventions the student detail page shows up front
+DETAIL_INTERVENTIONS = 20
+
+# Append-only Parquet history of every prediction, with daily / weekly rollups
+risk_history = RiskHistory()
+
+PIPELINE_DAILY_AT = os.getenv("PIPELINE_DAILY_AT")
+# nightly export picked up by scheduled runs (CSV or Parquet)
+PIPELINE_SOURCE = os.getenv("PIPELINE_SOURCE")
+# the only directory /pipeline/run may read source files from
+PIPELINE_IMPORT_DIR = os.getenv("PIPELINE_IMPORT_DIR") or (
+    Path(PIPELINE_SOURCE).parent if PIPELINE_SOURCE else ROOT_DIR / "imports"
+)
+# how soon a scheduled run that failed (or whose worker died) is retried
+PIPELINE_RETRY_SECONDS = int(os.getenv("PIPELINE_RETRY_SECONDS", "900"))
+
+# Ingest -> score -> drift -> alert runs (on demand, or daily at PIPELINE_DAILY_AT UTC)
+pipeline = Pipeline(
+    db, predictor, model_registry, drift_monitor, data_revision,
+    on_event=event_broker.publish, history=risk_history, import_dir=PIPELINE_IMPORT_DIR
+)
 
 # -------------------------------------------------
 # SCHEMA
@@ -70,6 +124,17 @@ class StudentData(BaseModel):
     health_issues: str
     child_labor: int = 0
     has_sibling_dropout: int = 0
+    school: Optional[str] = None
+    district: Optional[str] = None
+    region: Optional[str] = None
+    # read by the derived features when the model was trained with them
+    prev_year_marks: Optional[float] = None
+    marks_trend: Optional[str] = None
+    monsoon_absences: Optional[int] = None
+    health_absences: Optional[int] = None
+    has_transport: Optional[bool] = None
+    has_scholarship: Optional[bool] = None
+    mid_day_meal: Optional[bool] = None
 
 # -------------------------------------------------
 # DATASET GENERATION
@@ -80,7 +145,8 @@ async def generate_dataset(n_samples: int = 150):
 
     for _, row in df.iterrows():
         record = row.to_dict()
-        record["created_at"] = datetime.now(timezone.utc).isoformat()
+        # updated_at lets the training snapshot pick up rewritten students
+        record["created_at"] = record["updated_at"] = datetime.now(timezone.utc).isoformat()
 
         # SAVE ONLY FOR TRAINING
         db.collection("training_students").document(
@@ -96,68 +162,216 @@ async def generate_dataset(n_samples: int = 150):
 # TRAIN MODEL
 # -------------------------------------------------
 @api_router.post("/model/train")
-async def train_model():
-    global MODEL_METRICS
-
-    docs = db.collection("training_students").stream()
-    students = [doc.to_dict() for doc in docs]
+async def train_model(
+    full_sync: bool = False,
+    compress: bool = False,
+    max_accuracy_loss: float = MAX_ACCURACY_LOSS,
+    derived_features: bool = False
+):
+    async with model_jobs.run("train"):
+        event_broker.publish("training", {"status": "loading_data"})
+        # only documents added since the last sync are downloaded
+        df = await adb.run(training_snapshot.dataframe, full_sync)
+
+        if df.empty:
+            event_broker.publish("training", {"status": "failed", "reason": "No training data found"})
+            raise HTTPException(400, "No training data found")
+
+        event_broker.publish("training", {"status": "fitting", "samples": len(df)})
+        # NaN / NumPy values are sanitized when the response is encoded
+        candidate = await adb.run(_fit_and_save, df, compress, max_accuracy_loss, derived_features)
+        # swap the new model in only once it is complete
+        predictor.load_model(str(MODEL_PATH))
+        metrics = candidate.metrics
+
+    # shared by every worker: /model/metrics reads it back from storage
+    await adb.run(save_model_version, db, metrics)
+    evaluation_pool.submit(_evaluate_and_store, candidate, df)
+
+    await adb.run(data_revision.bump)
+    await adb.run(drift_monitor.reset, predictor.drift_reference)
+    event_broker.publish("training", {"status": "completed", "metrics": metrics})
+
+    return json_response({
+        "message": "Model trained successfully",
+        "metrics": metrics
+    })
+
+def _fit_and_save(df, compress=False, max_accuracy_loss=MAX_ACCURACY_LOSS, derived_features=False):
+    """Runs on a worker thread; the live predictor keeps serving meanwhile"""
+    candidate = DropoutPredictor()
+    # derived features (prev-year deltas, trend, seasonal absences, support) are opt-in
+    metrics = candidate.train_model(df, derived_features)
+    if compress:
+        # fewer trees, float32 thresholds, quantized leaves (see compression.py)
+        metrics["compression"] = candidate.compress(max_accuracy_loss)
+    candidate.save_model(str(MODEL_PATH))
+    return candidate
+
+def _evaluate_and_store(candidate, df):
+    """Runs on evaluation_pool: cross-validation, permutation importance,
+    calibration and per-district confusion matrices for one model version"""
+    try:
+        save_evaluation(db, candidate.version, evaluate(candidate, df))
+        status = "completed"
+    except Exception as e:
+        print("❌ Model evaluation error:", e)
+        save_evaluation(db, candidate.version, error=str(e))
+        status = "failed"
 
-    if not students:
-        raise HTTPException(400, "No training data found")
+    data_revision.bump()
+    event_broker.publish("model_evaluated", {"version": candidate.version, "status": status})
+    return status
 
-    df = pd.DataFrame(students)
+# -------------------------------------------------
+# SHARDED MODELS (PER DISTRICT / REGION)
+# -------------------------------------------------
+@api_router.post("/model/train/shards")
+async def train_model_shards(by: str = "district", min_size: int = MIN_SHARD_SIZE,
+                             full_sync: bool = False):
+    async with model_jobs.run("train_shards"):
+        df = await adb.run(training_snapshot.dataframe, full_sync)
+
+        if df.empty:
+            raise HTTPException(400, "No training data found")
+
+        try:
+            # shards train in separate processes; keep the event loop free
+            manifest = await adb.run(train_shards, df, by, min_size)
+        except ValueError as e:
+            raise HTTPException(400, str(e))
+
+        model_registry.reload()
+    await adb.run(data_revision.bump)
+
+    return json_response({
+        "message": "Shard models trained",
+        **manifest
+    })
+
+@api_router.get("/model/shards")
+async def get_model_shards():
+    model_registry.refresh()
+    if model_registry.manifest is None:
+        raise HTTPException(404, "No shard models trained yet")
+
+    return json_response({
+        **model_registry.manifest,
+        "loaded": model_registry.loaded()
+    })
 
-    raw_metrics = predictor.train_model(df)
+# -------------------------------------------------
+# ALERT / INTERVENTION HISTORY (newest first, paginated)
+# -------------------------------------------------
+@api_router.get("/alerts")
+async def get_alerts(
+    request: Request,
+    student_id: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    before: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE
+):
+    (alerts, next_before), counts = await asyncio.gather(
+        _history_page("alerts", student_id, since, until, before, limit),
+        _history_counts("alerts", student_id, since, until)
+    )
 
-    # 🔥 CLEAN EVERYTHING (deep clean)
-    MODEL_METRICS = clean_dict(raw_metrics)
+    # totals cover the whole filtered history, not just this page
+    return json_response({
+        **counts,
+        "alerts": alerts,
+        "next_before": next_before
+    }, request)
+
+@api_router.get("/interventions")
+async def get_interventions(
+    request: Request,
+    student_id: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    before: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE
+):
+    (interventions, next_before), counts = await asyncio.gather(
+        _history_page("interventions", student_id, since, until, before, limit),
+        _history_counts("interventions", student_id, since, until)
+    )
 
-    predictor.save_model(str(MODEL_PATH))
+    return json_response({
+        **counts,
+        "interventions": interventions,
+        "next_before": next_before
+    }, request)
 
-    return Response(
-        content=json.dumps({
-            "message": "Model trained successfully",
-            "metrics": MODEL_METRICS
-        }),
-        media_type="application/json"
-    )
+async def _history_page(collection, *args):
+    async def read():
+        async with heavy_reads.slot():
+            return await adb.run(query_history, db, collection, *args)
 
-@api_router.get("/alerts")
-async def get_alerts():
-    alerts_ref = db.collection("alerts").stream()
+    return await history_reads.do((collection, *args), read)
 
-    alerts = []
-    for doc in alerts_ref:
-        data = doc.to_dict()
-        data["id"] = doc.id   # needed for React key
-        alerts.append(data)
+async def _history_counts(collection, *args):
+    # count aggregations: the database counts, nothing is downloaded
+    return await history_reads.do(
+        ("count", collection, *args), lambda: adb.run(count_history, db, collection, *args)
+    )
 
-    return {
-        "total": len(alerts),
-        "alerts": alerts
-    }
+@api_router.get("/students/{student_id}/alerts")
+async def get_student_alerts(
+    student_id: str,
+    request: Request,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    before: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE
+):
+    return await get_alerts(request, student_id, since, until, before, limit)
+
+@api_router.get("/students/{student_id}/interventions")
+async def get_student_interventions(
+    student_id: str,
+    request: Request,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    before: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE
+):
+    return await get_interventions(request, student_id, since, until, before, limit)
 
 # -------------------------------------------------
 # GET MODEL METRICS
 # -------------------------------------------------
 @api_router.get("/model/metrics")
-async def get_model_metrics():
-    if MODEL_METRICS is None:
+async def get_model_metrics(request: Request, version: Optional[str] = None):
+    return await response_cache.respond(request, lambda: _metrics_payload(version))
+
+async def _metrics_payload(version):
+    # Precomputed per model version, so any worker serves them after a restart
+    metrics = await adb.run(load_model_metrics, db, version)
+
+    # models trained before versions were recorded carry their own metrics
+    if metrics is None and version is None:
+        metrics = predictor.metrics
+
+    if metrics is None:
         raise HTTPException(404, "Model has not been trained yet")
 
-    return Response(
-        content=json.dumps(clean_dict(MODEL_METRICS)),
-        media_type="application/json"
-    )
+    return metrics
 
 @api_router.get("/students")
-async def get_students():
-    predictions = {
-        doc.id: doc.to_dict()
-        for doc in db.collection("predictions").stream()
-    }
+async def get_students(request: Request):
+    return await response_cache.respond(request, _students_payload)
+
+async def _students_payload():
+    async with heavy_reads.slot():
+        prediction_docs, student_docs = await asyncio.gather(
+            adb.stream(db.collection("predictions")),
+            adb.stream(db.collection("students"))
+        )
+    predictions = {doc.id: doc.to_dict() for doc in prediction_docs}
 
-    students = [doc.to_dict() for doc in db.collection("students").stream()]
+    students = [doc.to_dict() for doc in student_docs]
     merged = []
 
     for s in students:
@@ -167,16 +381,10 @@ async def get_students():
         else:
             merged.append(s)
 
-    # 🔥 CLEAN NaN VALUES
-    cleaned_students = []
-    for s in merged:
-        cleaned_students.append({
-            k: clean_nan(v) for k, v in s.items()
-        })
-
+    # NaN values become null while encoding, no per-record copy needed
     return {
-        "total_students": len(cleaned_students),
-        "students": cleaned_students
+        "total_students": len(merged),
+        "students": merged
     }
 
 # -------------------------------------------------
@@ -194,6 +402,9 @@ async def add_student(student: StudentData):
         }
 
         db.collection("students").document(student_id).set(record)
+        await adb.run(data_revision.bump)
+        event_broker.publish("student_added", record)
+        await adb.run(_observe_drift, [record])
 
         return {
             "message": "Student added successfully",
@@ -205,85 +416,123 @@ async def add_student(student: StudentData):
         raise HTTPException(status_code=500, detail="Failed to add student")
 
 @api_router.get("/students/{student_id}")
-async def get_student_detail(student_id: str):
-    # Get student base data
-    student_doc = db.collection("students").document(student_id).get()
-    if not student_doc.exists:
+async def get_student_detail(student_id: str, request: Request):
+    student, interventions, next_before = await _load_student_detail(student_id)
+
+    if student is None:
         raise HTTPException(status_code=404, detail="Student not found")
 
-    student = student_doc.to_dict()
+    return json_response({
+        "student": student,
+        "interventions": interventions,
+        "interventions_next_before": next_before
+    }, request)
+
+
+async def _load_student_detail(student_id):
+    """Student + prediction (one batched get_all) and the latest
+    interventions, fetched concurrently: latency is the slowest read."""
+    (student_doc, pred_doc), (interventions, next_before) = await asyncio.gather(
+        adb.get_all([
+            db.collection("students").document(student_id),
+            db.collection("predictions").document(student_id)
+        ]),
+        # older pages via /students/{id}/interventions
+        adb.run(query_history, db, "interventions", student_id, limit=DETAIL_INTERVENTIONS)
+    )
+
+    if not student_doc.exists:
+        return None, [], None
 
-    # Get prediction (if exists)
-    pred_doc = db.collection("predictions").document(student_id).get()
+    student = student_doc.to_dict()
     if pred_doc.exists:
         student.update(pred_doc.to_dict())
 
-    # Get interventions
-    interventions = [
-        doc.to_dict()
-        for doc in db.collection("interventions")
-        .where("student_id", "==", student_id)
-        .stream()
-    ]
-
-    return {
-        "student": student,
-        "interventions": interventions
-    }
+    return student, interventions, next_before
 
 
-@api_router.get("/stats")
-async def get_stats():
-    # Prefer predictions if available
-    predictions = [doc.to_dict() for doc in db.collection("predictions").stream()]
-
-    if predictions:
-        df = pd.DataFrame(predictions)
-
-        risk_counts = df["predicted_risk"].value_counts().to_dict()
-
-        return Response(
-            content=json.dumps({
-                "total_students": len(df),
-                "risk_distribution": {
-                    "High": risk_counts.get("High", 0),
-                    "Medium": risk_counts.get("Medium", 0),
-                    "Low": risk_counts.get("Low", 0)
-                },
-                "average_attendance": float(df["attendance_percentage"].mean()),
-                "average_marks": float(df["average_marks"].mean()),
-                "has_predictions": True
-            }),
-            media_type="application/json"
-        )
+# -------------------------------------------------
+# STATS / FILTERS / GROUP-BYS (columnar roster)
+# -------------------------------------------------
+async def _current_roster():
+    revision = (await data_revision.current_async())[0]
+    if roster.stale(revision):
+        # concurrent requests share one reload
+        await roster_loads.do("load", lambda: _load_roster(revision))
+    return roster
+
+async def _load_roster(revision):
+    async with heavy_reads.slot():
+        await adb.run(roster.load, db, revision)
+
+async def _roster_query(query, *args):
+    current = await _current_roster()
+    try:
+        return query(current, *args)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
 
-    # Fallback → students only
-    students = [doc.to_dict() for doc in db.collection("students").stream()]
 
-    if not students:
-        return Response(
-            content=json.dumps({
-                "total_students": 0,
-                "risk_distribution": {"High": 0, "Medium": 0, "Low": 0},
-                "average_attendance": 0,
-                "average_marks": 0,
-                "has_predictions": False
-            }),
-            media_type="application/json"
-        )
+@api_router.get("/stats")
+async def get_stats(
+    request: Request,
+    district: Optional[str] = None,
+    school: Optional[str] = None,
+    region: Optional[str] = None
+):
+    # scored students once any are, else all students
+    return await response_cache.respond(
+        request, lambda: _roster_query(Roster.stats, district, school, region)
+    )
 
-    df = pd.DataFrame(students)
-
-    return Response(
-        content=json.dumps({
-            "total_students": len(df),
-            "risk_distribution": {"High": 0, "Medium": 0, "Low": 0},
-            "average_attendance": float(df["attendance_percentage"].mean()),
-            "average_marks": float(df["average_marks"].mean()),
-            "has_predictions": False
-        }),
-        media_type="application/json"
+@api_router.get("/stats/groups")
+async def get_stats_groups(
+    request: Request,
+    by: str = "district",
+    district: Optional[str] = None,
+    school: Optional[str] = None,
+    region: Optional[str] = None
+):
+    async def build():
+        groups = await _roster_query(Roster.group_by, by, district, school, region)
+        return {"by": by, "groups": groups}
+    return await response_cache.respond(request, build)
+
+@api_router.get("/roster")
+async def get_roster(
+    request: Request,
+    district: Optional[str] = None,
+    school: Optional[str] = None,
+    region: Optional[str] = None,
+    risk: Optional[str] = None,
+    max_attendance: Optional[float] = None,
+    max_marks: Optional[float] = None,
+    sort: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0)
+):
+    return await response_cache.respond(request, lambda: _roster_query(
+        Roster.select, district, school, region, risk, max_attendance, max_marks, sort, limit, offset
+    ))
+
+def _summarize_stats(records, has_predictions):
+    df = pd.DataFrame(records)
+
+    risk_counts = (
+        df["predicted_risk"].value_counts().to_dict() if has_predictions else {}
     )
+
+    return {
+        "total_students": len(df),
+        "risk_distribution": {
+            "High": risk_counts.get("High", 0),
+            "Medium": risk_counts.get("Medium", 0),
+            "Low": risk_counts.get("Low", 0)
+        },
+        "average_attendance": float(df["attendance_percentage"].mean()),
+        "average_marks": float(df["average_marks"].mean()),
+        "has_predictions": has_predictions
+    }
 # -------------------------------------------------
 # SINGLE PREDICTION
 # -------------------------------------------------
@@ -294,11 +543,110 @@ async def predict(student: StudentData):
 
     result = predictor.predict_single(student.model_dump())
 
-    return Response(
-        content=json.dumps(result),
-        media_type="application/json"
+    return json_response(result)
+
+# -------------------------------------------------
+# PER-STUDENT EXPLANATION
+# -------------------------------------------------
+@api_router.get("/students/{student_id}/explanation")
+async def get_student_explanation(student_id: str, request: Request):
+    student_doc, pred_doc = await adb.get_all([
+        db.collection("students").document(student_id),
+        db.collection("predictions").document(student_id)
+    ])
+    if not student_doc.exists:
+        raise HTTPException(status_code=404, detail="Student not found")
+
+    student = student_doc.to_dict()
+    prediction = pred_doc.to_dict() if pred_doc.exists else {}
+
+    # Stored by /predict/batch; older predictions are explained on the fly
+    if "feature_contributions" not in prediction:
+        if predictor.model is None:
+            raise HTTPException(400, "Model not trained")
+        prediction = {**prediction, **predictor.explain_single(student)}
+
+    values = dict(student)
+    if predictor.derived_features:
+        derived = derive(pd.DataFrame([student]), predictor.derived_features)[0]
+        values.update(zip(predictor.derived_features, derived.round(4).tolist()))
+
+    contributions = sorted(
+        (
+            {
+                "feature": feature,
+                "value": values.get(feature),
+                "contribution": contribution
+            }
+            for feature, contribution in prediction["feature_contributions"].items()
+        ),
+        key=lambda c: abs(c["contribution"]),
+        reverse=True
     )
 
+    return json_response({
+        "student_id": student_id,
+        "predicted_risk": prediction["predicted_risk"],
+        "confidence": prediction["confidence"],
+        "base_value": prediction["base_value"],
+        "contributions": contributions
+    }, request)
+
+# -------------------------------------------------
+# WHAT-IF SIMULATION
+# -------------------------------------------------
+class SimulationRequest(BaseModel):
+    # the cohort: explicit ids, everyone in a district / school, or inline students
+    student_ids: Optional[List[str]] = None
+    district: Optional[str] = None
+    school: Optional[str] = None
+    students: Optional[List[StudentData]] = None
+    # feature -> {"set" | "add" | "scale": [values]}
+    grid: Dict[str, Dict[str, Any]]
+    detail: Optional[bool] = None
+
+
+async def _simulation_cohort(body):
+    if body.students:
+        return [s.model_dump() for s in body.students]
+
+    if body.student_ids:
+        docs = await adb.get_all(db.collection("students").document(i) for i in body.student_ids)
+        missing = [d.id for d in docs if not d.exists]
+        if missing:
+            raise HTTPException(404, f"Students not found: {', '.join(missing[:10])}")
+        return [d.to_dict() for d in docs]
+
+    if body.district or body.school:
+        query = db.collection("students")
+        if body.district:
+            query = query.where("district", "==", body.district)
+        if body.school:
+            query = query.where("school", "==", body.school)
+        return [d.to_dict() for d in await adb.stream(query)]
+
+    raise HTTPException(400, "Give student_ids, district / school, or students")
+
+
+@api_router.post("/simulate")
+async def simulate_scenarios(body: SimulationRequest, request: Request):
+    if predictor.model is None:
+        raise HTTPException(400, "Model not trained")
+
+    students = await _simulation_cohort(body)
+    if not students:
+        raise HTTPException(404, "No students in this cohort")
+
+    # one encoded matrix for every student x scenario, scored off the event loop
+    async with heavy_reads.slot():
+        try:
+            # scored by the same shard / global models as /predict/batch
+            result = await adb.run(simulate, model_registry, students, body.grid, body.detail)
+        except (KeyError, ValueError) as e:
+            raise HTTPException(400, str(e))
+
+    return json_response(result, request)
+
 # -------------------------------------------------
 # BATCH PREDICTION (GENERATE BUTTON)
 # -------------------------------------------------
@@ -307,26 +655,57 @@ async def predict_batch():
     if predictor.model is None:
         raise HTTPException(400, "Model not trained")
 
-    students = [doc.to_dict() for doc in db.collection("students").stream()]
+    async with model_jobs.run("predict_batch"):
+        students = [doc.to_dict() for doc in await adb.stream(db.collection("students"))]
 
-    if not students:
-        raise HTTPException(400, "No students found")
+        if not students:
+            raise HTTPException(400, "No students found")
 
-    for s in students:
-        result = predictor.predict_single(s)
+        records = await adb.run(_score_and_store, students)
+
+    await adb.run(data_revision.bump)
+    await adb.run(_observe_drift, students)
+
+    # Only the changed fields go out; clients patch their student list
+    event_broker.publish("predictions_updated", {
+        "predictions": [
+            {
+                "student_id": r["student_id"],
+                "predicted_risk": r["predicted_risk"],
+                "confidence": r["confidence"],
+                "predicted_at": r["predicted_at"]
+            }
+            for r in records
+        ]
+    })
+    event_broker.publish("stats", _summarize_stats(records, has_predictions=True))
+
+    return {
+        "message": "Predictions generated",
+        "total_predictions": len(students)
+    }
+
+def _score_and_store(students):
+    # One vectorized pass per shard, shards in parallel; each result
+    # carries its feature contributions and the shard that scored it
+    results = model_registry.predict_batch(students)
+    predicted_at = datetime.now(timezone.utc).isoformat()
 
+    records = []
+    for s, result in zip(students, results):
+        # result carries the version of the shard (or global) model that scored it
         record = {
             **s,
             **result,
-            "predicted_at": datetime.now(timezone.utc).isoformat()
+            "predicted_at": predicted_at
         }
 
         db.collection("predictions").document(s["student_id"]).set(record)
+        records.append(record)
 
-    return {
-        "message": "Predictions generated",
-        "total_predictions": len(students)
-    }
+    # predictions/{id} only keeps the latest score; the history keeps them all
+    risk_history.append(records)
+    return records
 
 class AlertData(BaseModel):
     student_id: str
@@ -349,6 +728,8 @@ async def send_alert(alert: dict):
     alert["sms_status"] = sms_result["status"]
     alert["sms_sid"] = sms_result["sid"]
 
+    # alerts and interventions don't bump the data revision: they are only
+    # served through uncached reads (history pages, student detail)
     db.collection("alerts").add(alert)
 
     return {
@@ -377,10 +758,188 @@ async def create_intervention(intervention: InterventionData):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# -------------------------------------------------
+# RISK TRENDS (from the prediction history rollups)
+# -------------------------------------------------
+@api_router.get("/trends/risk")
+async def get_risk_trend(
+    request: Request,
+    period: str = "daily",
+    level: str = "all",
+    key: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None
+):
+    def build():
+        # rollup rows held in memory: no raw history is scanned here
+        try:
+            points = risk_history.trend(period, level, key, since, until)
+        except ValueError as e:
+            raise HTTPException(400, str(e))
+        return {"period": period, "level": level, "key": key, "points": points}
+
+    return await response_cache.respond(request, build)
+
+@api_router.get("/students/{student_id}/risk-history")
+async def get_student_risk_history(
+    student_id: str,
+    request: Request,
+    since: Optional[str] = None,
+    until: Optional[str] = None
+):
+    try:
+        history = await adb.run(risk_history.student_history, student_id, since, until)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+    return json_response({
+        "student_id": student_id,
+        "total": len(history),
+        "history": history
+    }, request)
+
+# -------------------------------------------------
+# FEATURE DRIFT
+# -------------------------------------------------
+def _observe_drift(students):
+    """Fold added / scored students into the live drift sketches; students
+    this worker already observed with the same features are not counted again"""
+    if drift_monitor.reference is None:
+        return
+    try:
+        X, _ = predictor.preprocess_data(pd.DataFrame(students), training=False)
+    except (KeyError, ValueError):
+        # missing columns or categories the encoders never saw
+        return
+
+    drift_monitor.observe(students, X)
+
+@api_router.get("/drift")
+async def get_drift(request: Request, district: Optional[str] = None):
+    report = await adb.run(drift_monitor.report, district)
+    if report is None:
+        raise HTTPException(404, "No drift reference yet, retrain the model")
+
+    return json_response(report, request)
+
+# -------------------------------------------------
+# LIVE UPDATES (SERVER-SENT EVENTS)
+# -------------------------------------------------
+@api_router.get("/events")
+async def stream_events(request: Request):
+    return StreamingResponse(
+        event_broker.stream(request, request.headers.get("last-event-id")),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # stop nginx-style proxies from buffering the stream
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+# -------------------------------------------------
+# NIGHTLY PIPELINE (INGEST → SCORE → DRIFT → ALERTS)
+# -------------------------------------------------
+class PipelineRequest(BaseModel):
+    source: Optional[str] = None
+    synthetic: Optional[int] = None
+    seed: int = 42
+    max_alerts: Optional[int] = None
+    cooldown_days: int = ALERT_COOLDOWN_DAYS
+    stages: Optional[List[str]] = None
+    run_id: Optional[str] = None
+    resume: bool = False
+
+
+async def _run_pipeline(run, *args, **kwargs):
+    # shares the queue with training / batch predict: they all replace predictions
+    async with model_jobs.run("pipeline"):
+        result = await adb.run(run, *args, **kwargs)
+
+    if result and any(s.get("summary", {}).get("scored") for s in result["stages"].values()):
+        # many students changed at once: let dashboards refetch
+        event_broker.publish("resync", {})
+    return result
+
+
+@api_router.post("/pipeline/run")
+async def run_pipeline(body: PipelineRequest):
+    if body.stages and set(body.stages) - set(STAGE_NAMES):
+        raise HTTPException(400, f"Stages are {', '.join(STAGE_NAMES)}")
+
+    params = body.model_dump(include={"source", "synthetic", "seed", "max_alerts", "cooldown_days"})
+    try:
+        run = await _run_pipeline(
+            pipeline.run, params, body.run_id, body.resume, stages=body.stages
+        )
+    except RunNotFound as e:
+        raise HTTPException(404, str(e))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+    return json_response(run)
+
+@api_router.get("/pipeline/runs/latest")
+async def get_latest_pipeline_run():
+    run = await adb.run(pipeline.latest_run)
+    if run is None:
+        raise HTTPException(404, "No pipeline runs yet")
+    return json_response(run)
+
+@api_router.get("/pipeline/runs/{run_id}")
+async def get_pipeline_run(run_id: str):
+    run = await adb.run(pipeline.get_run, run_id)
+    if run is None:
+        raise HTTPException(404, "Pipeline run not found")
+    return json_response(run)
+
+
+async def _pipeline_schedule():
+    # every worker runs this loop; the lease in run_scheduled lets one run at
+    # a time, and a run left unfinished (failed, or its worker died) is
+    # retried until it completes, including right after a restart
+    pending = await adb.run(scheduled_pending, pipeline, PIPELINE_DAILY_AT)
+    delay = 0 if pending else seconds_until(PIPELINE_DAILY_AT)
+    while True:
+        await asyncio.sleep(delay)
+        run = None
+        try:
+            run = await _run_pipeline(
+                run_scheduled, pipeline, {"source": PIPELINE_SOURCE}, PIPELINE_DAILY_AT
+            )
+        except Exception as e:
+            print("❌ Scheduled pipeline error:", e)
+
+        delay = seconds_until(PIPELINE_DAILY_AT)
+        if run is None or run["status"] != "completed":
+            delay = min(delay, PIPELINE_RETRY_SECONDS)
+
+
+@app.on_event("startup")
+async def start_event_relay():
+    app.state.event_relay = asyncio.create_task(event_broker.relay())
+
+@app.on_event("startup")
+async def start_pipeline_schedule():
+    if PIPELINE_DAILY_AT:
+        # keep a reference so the task isn't garbage collected
+        app.state.pipeline_schedule = asyncio.create_task(_pipeline_schedule())
+
 @api_router.get("/training/count")
 async def training_count():
     count = len(list(db.collection("training_students").stream()))
     return {"count": count}
+
+@api_router.get("/training/snapshot")
+async def get_training_snapshot():
+    meta = training_snapshot.meta()
+    if meta is None:
+        raise HTTPException(404, "No training snapshot yet, train the model first")
+
+    return {
+        **meta,
+        "bytes": training_snapshot.path.stat().st_size
+    }
 # -------------------------------------------------
 # APP CONFIG
 # -------------------------------------------------
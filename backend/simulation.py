@@ -0,0 +1,244 @@
+import itertools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from features import derive, inputs_of
+from model_registry import GLOBAL_SHARD
+
+# Rows (students x scenarios) one request may score
+MAX_SIMULATION_ROWS = int(os.getenv("MAX_SIMULATION_ROWS", "1000000"))
+# Rows per predict_proba call; chunks run in parallel (tree traversal releases the GIL)
+CHUNK_ROWS = 50_000
+SIMULATION_THREADS = min(8, os.cpu_count() or 1)
+# Per-student results are only returned for cohorts up to this size
+MAX_DETAIL_STUDENTS = 200
+
+OPERATIONS = ("set", "add", "scale")
+# Valid ranges perturbed values are clipped to
+BOUNDS = {
+    "age": (5, 25),
+    "attendance_percentage": (0, 100),
+    "average_marks": (0, 100),
+    "absences_per_month": (0, 31),
+    "distance_to_school_km": (0, None),
+    "child_labor": (0, 1),
+    "has_sibling_dropout": (0, 1),
+    "prev_year_marks": (0, 100),
+    "monsoon_absences": (0, None),
+    "health_absences": (0, None),
+}
+# Raw inputs of derived features that only take "set" (labels / flags)
+SET_ONLY = {"marks_trend", "has_transport", "has_scholarship", "mid_day_meal"}
+
+_pool = ThreadPoolExecutor(max_workers=SIMULATION_THREADS, thread_name_prefix="simulation")
+
+
+# -------------------------------------------------
+# SCENARIOS
+# -------------------------------------------------
+def build_scenarios(grid):
+    """Cartesian product of a perturbation grid.
+
+    `grid` maps a feature to {operation: [values]}, e.g.
+    {"attendance_percentage": {"set": [85, 95]}, "absences_per_month": {"scale": [0.5]}}.
+    The unchanged baseline is always scenario 0.
+    """
+    axes = []
+    for feature, ops in grid.items():
+        options = []
+        for op, values in ops.items():
+            if op not in OPERATIONS:
+                raise ValueError(f"Unknown operation '{op}' for {feature}, use {', '.join(OPERATIONS)}")
+            options += [(feature, op, v) for v in (values if isinstance(values, list) else [values])]
+        axes.append(options)
+
+    scenarios = [()]
+    scenarios += [combo for combo in itertools.product(*axes) if combo]
+    return scenarios
+
+
+def _perturb(column, op, values, feature, encoder=None):
+    """(n_scenarios, n_students) values of one encoded feature column"""
+    if encoder is not None:
+        # categorical: only "set" makes sense, to a label the model knows
+        if op != "set":
+            raise ValueError(f"{feature} is categorical, only 'set' is supported")
+        codes = encoder.transform([str(v) for v in values]).astype(np.float64)
+        return np.broadcast_to(codes[:, None], (len(values), len(column)))
+
+    if feature in SET_ONLY:
+        if op != "set":
+            raise ValueError(f"{feature} is a label, only 'set' is supported")
+        return np.broadcast_to(np.asarray(values, dtype=object)[:, None], (len(values), len(column)))
+
+    values = np.asarray(values, dtype=np.float64)[:, None]
+    if op == "set":
+        out = np.broadcast_to(values, (len(values), len(column)))
+    elif op == "add":
+        out = column[None, :] + values
+    else:
+        out = column[None, :] * values
+
+    low, high = BOUNDS.get(feature, (None, None))
+    return np.clip(out, low, high) if low is not None or high is not None else out
+
+
+# -------------------------------------------------
+# SIMULATION
+# -------------------------------------------------
+def _predict_chunked(model, X, features):
+    # named columns, as the forest was fitted on a DataFrame
+    chunks = [
+        pd.DataFrame(X[i:i + CHUNK_ROWS], columns=features, copy=False)
+        for i in range(0, len(X), CHUNK_ROWS)
+    ]
+    return np.concatenate(list(_pool.map(model.predict_proba, chunks)))
+
+
+def _scenario_proba(predictor, students, scenarios, grid):
+    """(labels, (scenarios, students, classes) probabilities) for one model"""
+    n_students, n_scenarios = len(students), len(scenarios)
+    raw = pd.DataFrame(students)
+    X_base, _ = predictor.preprocess_data(raw, training=False)
+    base = np.asarray(X_base, dtype=np.float64)
+    features = predictor.feature_names
+    # raw inputs of the model's derived features can be perturbed too
+    extras = [c for c in inputs_of(predictor.derived_features) if c not in features]
+    unknown = set(grid) - set(features) - set(extras)
+    if unknown:
+        raise ValueError(f"Unknown features: {', '.join(sorted(unknown))}")
+
+    # (scenarios, students, features) view over one contiguous float32 matrix
+    X = np.empty((n_scenarios, n_students, len(features)), dtype=np.float32)
+    X[:] = base[None, :, :]
+    # one vectorized assignment per (feature, operation) across its scenarios
+    changes = {}
+    for s, combo in enumerate(scenarios):
+        for feature, op, value in combo:
+            changes.setdefault((feature, op), []).append((s, value))
+    raw_inputs = {}
+    for (feature, op), items in changes.items():
+        idx, values = zip(*items)
+        if feature in features:
+            j = features.index(feature)
+            X[list(idx), :, j] = _perturb(
+                base[:, j], op, list(values), feature, predictor.label_encoders.get(feature)
+            )
+            continue
+
+        column = raw[feature].to_numpy() if feature in raw.columns else np.full(n_students, None)
+        if feature not in raw_inputs:
+            raw_inputs[feature] = np.tile(column, (n_scenarios, 1)).astype(object)
+        if feature not in SET_ONLY:
+            column = pd.to_numeric(pd.Series(column), errors="coerce").to_numpy(dtype=np.float64)
+        raw_inputs[feature][list(idx)] = _perturb(column, op, list(values), feature)
+
+    # derived features reading a perturbed input are recomputed per scenario
+    derived = [
+        name for name in predictor.derived_features
+        if set(inputs_of([name])) & set(grid)
+    ]
+    if derived:
+        frame = {}
+        for column in inputs_of(derived):
+            if column in raw_inputs:
+                frame[column] = raw_inputs[column].ravel()
+            elif column in features:
+                frame[column] = X[:, :, features.index(column)].ravel()
+            elif column in raw.columns:
+                frame[column] = np.tile(raw[column].to_numpy(), n_scenarios)
+        cols = [features.index(name) for name in derived]
+        X[:, :, cols] = derive(pd.DataFrame(frame), derived).reshape(n_scenarios, n_students, -1)
+
+    proba = _predict_chunked(predictor.model, X.reshape(-1, len(features)), features)
+    labels = [str(c) for c in predictor.label_encoders["dropout_risk"].classes_]
+    return labels, proba.reshape(n_scenarios, n_students, -1)
+
+
+def _routed_proba(registry, students, scenarios, grid):
+    # each student is simulated with the shard model that scores them
+    registry.refresh()
+    groups = {}
+    for i, student in enumerate(students):
+        groups.setdefault(registry.shard_for(student), []).append(i)
+
+    parts = []
+    for value, rows in groups.items():
+        cohort = [students[i] for i in rows]
+        try:
+            parts.append((rows, *_scenario_proba(registry.get(value), cohort, scenarios, grid)))
+        except (KeyError, ValueError):
+            # as in predict_batch: what the shard can't encode, the global model answers
+            if value == GLOBAL_SHARD:
+                raise
+            parts.append((rows, *_scenario_proba(registry.global_predictor, cohort, scenarios, grid)))
+    return parts
+
+
+def simulate(model, students, grid, detail=None):
+    """Risk of every student under every scenario of `grid`, in one pass.
+
+    The cohort is encoded once; all variants are built by broadcasting the
+    perturbed columns into a (scenarios x students, features) matrix that
+    the forest scores in parallel chunks. `model` is a DropoutPredictor, or
+    a ShardedModelRegistry routing each student to their shard's model.
+    """
+    scenarios = build_scenarios(grid)
+    n_students, n_scenarios = len(students), len(scenarios)
+    if n_students * n_scenarios > MAX_SIMULATION_ROWS:
+        raise ValueError(
+            f"{n_students} students x {n_scenarios} scenarios exceeds {MAX_SIMULATION_ROWS:,} rows"
+        )
+
+    if hasattr(model, "shard_for"):
+        parts = _routed_proba(model, students, scenarios, grid)
+    else:
+        parts = [(list(range(n_students)), *_scenario_proba(model, students, scenarios, grid))]
+
+    # shard models may not know every class
+    labels = list(dict.fromkeys(label for _, part_labels, _ in parts for label in part_labels))
+    proba = np.zeros((n_scenarios, n_students, len(labels)))
+    for rows, part_labels, part in parts:
+        columns = [labels.index(label) for label in part_labels]
+        proba[np.ix_(range(n_scenarios), rows, columns)] = part
+
+    risk = proba.argmax(axis=2)
+    high = labels.index("High") if "High" in labels else None
+    baseline_high = proba[0, :, high] if high is not None else None
+
+    surface = []
+    for s, combo in enumerate(scenarios):
+        counts = np.bincount(risk[s], minlength=len(labels))
+        point = {
+            "scenario": s,
+            "changes": [{"feature": f, "op": op, "value": v} for f, op, v in combo],
+            "risk_distribution": dict(zip(labels, counts.tolist())),
+            "mean_probability": dict(zip(labels, proba[s].mean(axis=0).round(4).tolist()))
+        }
+        if high is not None:
+            point["mean_high_risk_change"] = round(float((proba[s, :, high] - baseline_high).mean()), 4)
+        surface.append(point)
+
+    result = {
+        "students": n_students,
+        "scenarios": n_scenarios,
+        "rows_scored": n_students * n_scenarios,
+        "surface": surface
+    }
+
+    if detail is None:
+        detail = n_students <= MAX_DETAIL_STUDENTS
+    if detail:
+        result["per_student"] = [
+            {
+                "student_id": student.get("student_id"),
+                "predicted_risk": [labels[k] for k in risk[:, i]],
+                "high_risk_probability": proba[:, i, high].round(4).tolist() if high is not None else None
+            }
+            for i, student in enumerate(students)
+        ]
+
+    return result
@@ -1,7 +1,37 @@
+import json
 import os
-from twilio.rest import Client
+import threading
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+# SMS_PROVIDER=fake records messages in a local outbox instead of sending them
+FAKE_OUTBOX = Path(os.getenv("SMS_OUTBOX", Path(__file__).parent / "sms_outbox.jsonl"))
+_outbox_lock = threading.Lock()
+
+
+def _send_fake(phone, message):
+    sid = "FAKE" + uuid.uuid4().hex[:28]
+    with _outbox_lock, open(FAKE_OUTBOX, "a", encoding="utf-8") as outbox:
+        outbox.write(json.dumps({
+            "sid": sid,
+            "to": phone,
+            "body": message,
+            "sent_at": datetime.now(timezone.utc).isoformat()
+        }) + "\n")
+
+    return {
+        "sid": sid,
+        "status": "delivered"
+    }
+
 
 def send_sms(phone, message):
+    if os.getenv("SMS_PROVIDER", "twilio").lower() == "fake":
+        return _send_fake(phone, message)
+
+    from twilio.rest import Client
+
     account_sid = os.getenv("TWILIO_ACCOUNT_SID")
     auth_token = os.getenv("TWILIO_AUTH_TOKEN")
     from_number = os.getenv("TWILIO_PHONE_NUMBER")
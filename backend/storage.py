@@ -0,0 +1,371 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from datetime import datetime, timezone
+from pathlib import Path
+
+from responses import encode_json
+
+ROOT_DIR = Path(__file__).parent
+
+# -------------------------------------------------
+# INDEXES
+# -------------------------------------------------
+# Composite indexes for the time-ordered history queries. The same
+# declaration backs firestore.indexes.json and the local SQLite store.
+INDEXES = {
+    "alerts": [
+        ("student_id", "created_at"), ("created_at",),
+        # per-risk / failed-delivery counts on the alerts page
+        ("risk_level", "created_at"), ("student_id", "risk_level", "created_at"),
+        ("sms_status", "created_at"), ("student_id", "sms_status", "created_at"),
+    ],
+    "interventions": [("student_id", "created_at"), ("created_at",)],
+}
+
+
+def firestore_index_config():
+    """INDEXES in the format `firebase deploy --only firestore:indexes` expects"""
+    return {
+        "indexes": [
+            {
+                "collectionGroup": collection,
+                "queryScope": "COLLECTION",
+                "fields": [
+                    {"fieldPath": f, "order": "DESCENDING" if f == "created_at" else "ASCENDING"}
+                    for f in fields
+                ],
+            }
+            for collection, field_sets in INDEXES.items()
+            for fields in field_sets
+            if len(fields) > 1  # single-field indexes are automatic in Firestore
+        ],
+        "fieldOverrides": [],
+    }
+
+
+# -------------------------------------------------
+# LOCAL STORE
+# -------------------------------------------------
+# A SQLite-backed subset of the Firestore client API used by this app, so the
+# backend runs offline (STORAGE_BACKEND=local) with the same handler code.
+
+DESCENDING = "DESCENDING"
+ASCENDING = "ASCENDING"
+
+_OPS = {"==": "=", "<": "<", "<=": "<=", ">": ">", ">=": ">=", "!=": "!="}
+
+
+def _field(name):
+    return f"json_extract(data, '$.{name}')"
+
+
+def _is_increment(value):
+    from firebase_admin import firestore
+    return isinstance(value, firestore.Increment)
+
+
+class LocalSnapshot:
+    def __init__(self, doc_id, data, reference=None):
+        self.id = doc_id
+        self._data = data
+        self.reference = reference
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+
+class LocalDocument:
+    def __init__(self, db, collection, doc_id):
+        self._db = db
+        self.collection = collection
+        self.id = doc_id
+
+    def get(self):
+        row = self._db.execute(
+            "SELECT data FROM documents WHERE collection = ? AND id = ?",
+            (self.collection, self.id),
+        ).fetchone()
+        return LocalSnapshot(self.id, json.loads(row[0]) if row else None, self)
+
+    def set(self, data, merge=False):
+        # read-modify-write in one transaction: concurrent Increments (from
+        # threads or other processes on the same file) all land
+        with self._db.transaction():
+            current = (self.get().to_dict() or {}) if merge else {}
+            for key, value in data.items():
+                if _is_increment(value):
+                    current[key] = (current.get(key) or 0) + value.value
+                else:
+                    current[key] = value
+            self._db.execute(
+                "INSERT OR REPLACE INTO documents (collection, id, data) VALUES (?, ?, ?)",
+                (self.collection, self.id, encode_json(current).decode()),
+            )
+
+    def create(self, data):
+        """Write only if the document does not exist yet (atomic, like Firestore)"""
+        from google.api_core.exceptions import AlreadyExists
+        try:
+            self._db.execute(
+                "INSERT INTO documents (collection, id, data) VALUES (?, ?, ?)",
+                (self.collection, self.id, encode_json(data).decode()),
+            )
+        except sqlite3.IntegrityError:
+            raise AlreadyExists(f"Document already exists: {self.collection}/{self.id}")
+
+    def update(self, data):
+        with self._db.transaction():
+            if not self.get().exists:
+                raise KeyError(f"No document to update: {self.collection}/{self.id}")
+            self.set(data, merge=True)
+
+    def delete(self):
+        self._db.execute(
+            "DELETE FROM documents WHERE collection = ? AND id = ?",
+            (self.collection, self.id),
+        )
+
+
+class LocalQuery:
+    def __init__(self, db, collection, filters=(), orders=(), limit=None):
+        self._db = db
+        self.collection = collection
+        self._filters = tuple(filters)
+        self._orders = tuple(orders)
+        self._limit = limit
+
+    def _copy(self, **changes):
+        state = {
+            "filters": self._filters,
+            "orders": self._orders,
+            "limit": self._limit,
+            **changes,
+        }
+        return LocalQuery(self._db, self.collection, **state)
+
+    def where(self, field, op, value):
+        if op != "in" and op not in _OPS:
+            raise ValueError(f"Unsupported operator: {op}")
+        return self._copy(filters=self._filters + ((field, op, value),))
+
+    def order_by(self, field, direction=ASCENDING):
+        return self._copy(orders=self._orders + ((field, direction),))
+
+    def limit(self, count):
+        return self._copy(limit=count)
+
+    def _where(self):
+        sql = " WHERE collection = ?"
+        params = [self.collection]
+
+        for field, op, value in self._filters:
+            if op == "in":
+                sql += f" AND {_field(field)} IN ({', '.join('?' * len(value))})"
+                params.extend(value)
+            else:
+                sql += f" AND {_field(field)} {_OPS[op]} ?"
+                params.append(value)
+        return sql, params
+
+    def count(self):
+        """Matching documents, counted in SQL (Firestore's count aggregation)"""
+        where, params = self._where()
+        return self._db.execute("SELECT COUNT(*) FROM documents" + where, params).fetchone()[0]
+
+    def stream(self):
+        where, params = self._where()
+        sql = "SELECT id, data FROM documents" + where
+
+        if self._orders:
+            sql += " ORDER BY " + ", ".join(
+                f"{_field(f)} {'DESC' if d == DESCENDING else 'ASC'}"
+                for f, d in self._orders
+            )
+        if self._limit is not None:
+            sql += " LIMIT ?"
+            params.append(self._limit)
+
+        rows = self._db.execute(sql, params).fetchall()
+        return iter([
+            LocalSnapshot(doc_id, json.loads(data), LocalDocument(self._db, self.collection, doc_id))
+            for doc_id, data in rows
+        ])
+
+
+class LocalCollection(LocalQuery):
+    def __init__(self, db, name):
+        super().__init__(db, name)
+
+    def document(self, doc_id=None):
+        return LocalDocument(self._db, self.collection, doc_id or uuid.uuid4().hex[:20])
+
+    def add(self, data):
+        ref = self.document()
+        ref.set(data)
+        return datetime.now(timezone.utc), ref
+
+
+class LocalDatabase:
+    """Firestore-compatible client over a single SQLite file"""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.RLock()
+        self.execute("PRAGMA journal_mode=WAL")
+        self.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            " collection TEXT NOT NULL, id TEXT NOT NULL, data TEXT NOT NULL,"
+            " PRIMARY KEY (collection, id))"
+        )
+        for collection, field_sets in INDEXES.items():
+            for fields in field_sets:
+                name = "idx_" + "_".join(("collection",) + fields)
+                columns = ", ".join(["collection"] + [_field(f) for f in fields])
+                self.execute(f"CREATE INDEX IF NOT EXISTS {name} ON documents ({columns})")
+
+    def execute(self, sql, params=()):
+        with self._lock:
+            return _Result(self._conn.execute(sql, params).fetchall())
+
+    @contextmanager
+    def transaction(self):
+        """Statements inside run atomically; BEGIN IMMEDIATE takes SQLite's
+        write lock up front, so other processes wait instead of interleaving"""
+        with self._lock:
+            if self._conn.in_transaction:
+                # nested (e.g. update -> set): the outer one covers it
+                yield
+                return
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def collection(self, name):
+        return LocalCollection(self, name)
+
+    def get_all(self, references):
+        """Fetch several documents in one statement (Firestore's get_all)"""
+        references = list(references)
+        if not references:
+            return
+        keys = ", ".join(["(?, ?)"] * len(references))
+        rows = self.execute(
+            f"SELECT collection, id, data FROM documents WHERE (collection, id) IN (VALUES {keys})",
+            [v for ref in references for v in (ref.collection, ref.id)],
+        ).fetchall()
+        found = {(collection, doc_id): json.loads(data) for collection, doc_id, data in rows}
+        for ref in references:
+            yield LocalSnapshot(ref.id, found.get((ref.collection, ref.id)), ref)
+
+
+def count_documents(query):
+    """Number of documents `query` matches, without downloading them"""
+    if isinstance(query, LocalQuery):
+        return query.count()
+    return int(query.count().get()[0][0].value)
+
+
+class _Result:
+    """Rows fetched while holding the lock, so cursors never cross threads"""
+
+    def __init__(self, rows):
+        self._rows = rows
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def fetchall(self):
+        return self._rows
+
+
+# -------------------------------------------------
+# ASYNC ACCESS
+# -------------------------------------------------
+STORAGE_THREADS = int(os.getenv("STORAGE_THREADS", "16"))
+
+
+def _collection_name(ref):
+    # Firestore refs expose .parent (a CollectionReference), local refs .collection
+    parent = getattr(ref, "parent", None)
+    return parent.id if parent is not None else ref.collection
+
+
+class AsyncDatabase:
+    """Runs the blocking client on a shared thread pool.
+
+    Both the Firestore client (one pooled gRPC channel) and the local store
+    are thread-safe, so independent reads can be awaited together with
+    asyncio.gather instead of blocking the event loop one after another.
+    """
+
+    def __init__(self, db, max_workers=STORAGE_THREADS):
+        self.db = db
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="storage")
+
+    async def run(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, partial(fn, *args, **kwargs))
+
+    async def get(self, ref):
+        return await self.run(ref.get)
+
+    async def get_all(self, refs):
+        """Snapshots for `refs` in the same order, fetched in one round trip"""
+        refs = list(refs)
+        snapshots = await self.run(lambda: list(self.db.get_all(refs)))
+        # Firestore may return them in any order
+        by_key = {(_collection_name(s.reference), s.id): s for s in snapshots}
+        return [by_key[(_collection_name(r), r.id)] for r in refs]
+
+    async def stream(self, query):
+        return await self.run(lambda: list(query.stream()))
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
+
+
+# -------------------------------------------------
+# CLIENT
+# -------------------------------------------------
+def get_database():
+    """Firestore by default; STORAGE_BACKEND=local uses a SQLite file instead"""
+    backend = os.getenv("STORAGE_BACKEND", "firestore").lower()
+
+    if backend == "local":
+        return LocalDatabase(os.getenv("LOCAL_DB_PATH", ROOT_DIR / "local_store.db"))
+
+    firebase_json = os.getenv("FIREBASE_SERVICE_ACCOUNT")
+    if not firebase_json:
+        raise RuntimeError("FIREBASE_SERVICE_ACCOUNT env variable not set")
+
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+
+    try:
+        firebase_admin.get_app()
+    except ValueError:
+        # first call in this process: no default app yet
+        cred = credentials.Certificate(json.loads(firebase_json))
+        firebase_admin.initialize_app(cred)
+    return firestore.client()
+
+
+if __name__ == "__main__":
+    # python storage.py > firestore.indexes.json
+    print(json.dumps(firestore_index_config(), indent=2))
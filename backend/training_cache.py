@@ -0,0 +1,196 @@
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+
+ROOT_DIR = Path(__file__).parent
+CACHE_DIR = ROOT_DIR / "cache"
+COLLECTION = "training_students"
+
+# A full re-read (which also drops deleted documents) at least this often
+RECONCILE_SECONDS = int(os.getenv("TRAINING_RECONCILE_SECONDS", str(24 * 3600)))
+# Text columns with at most this many distinct values are stored as categories
+MAX_CATEGORIES = 256
+# Compared and ordered by sync, so never dictionary-encoded
+PLAIN_COLUMNS = ("student_id", "created_at", "updated_at")
+
+
+def _compact(df):
+    """Smallest lossless dtypes: downcast numbers, dictionary-encode labels"""
+    df = df.copy()
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_bool_dtype(series):
+            continue
+        if pd.api.types.is_integer_dtype(series):
+            df[col] = pd.to_numeric(series, downcast="integer")
+        elif pd.api.types.is_float_dtype(series):
+            downcast = pd.to_numeric(series, downcast="float")
+            # float32 only when it round-trips the values exactly
+            if ((downcast.astype("float64") == series) | series.isna()).all():
+                df[col] = downcast
+        elif pd.api.types.is_string_dtype(series) and col not in PLAIN_COLUMNS \
+                and series.nunique(dropna=True) <= MAX_CATEGORIES:
+            df[col] = series.astype("category")
+    return df
+
+
+def _changed_at(doc):
+    # writers set updated_at on every write; older documents only have created_at
+    return doc.get("updated_at") or doc.get("created_at")
+
+
+class TrainingSnapshot:
+    """Arrow IPC copy of `training_students`, kept current incrementally.
+
+    Each sync only pulls documents created or updated at or after the
+    high-water mark of the previous one and upserts them by student_id;
+    every RECONCILE_SECONDS the whole collection is re-read so deleted
+    documents drop out. Training then maps the local file instead of
+    re-downloading and re-parsing every document: the file is uncompressed,
+    so numeric and string columns are used in place, not copied.
+    """
+
+    def __init__(self, db, cache_dir=CACHE_DIR, collection=COLLECTION,
+                 reconcile_seconds=RECONCILE_SECONDS):
+        self.db = db
+        self.collection = collection
+        self.reconcile_seconds = reconcile_seconds
+        self.path = Path(cache_dir) / f"{collection}.arrow"
+        self.meta_path = Path(cache_dir) / f"{collection}.json"
+        self._lock = threading.Lock()
+
+    # -------------------------------------------------
+    # STATE
+    # -------------------------------------------------
+    def meta(self):
+        if not self.meta_path.exists() or not self.path.exists():
+            return None
+        return json.loads(self.meta_path.read_text())
+
+    def load(self):
+        """The snapshot as a DataFrame backed by a memory map of the file.
+
+        Mapped columns are read-only; callers that modify the frame work
+        on a copy (as DropoutPredictor.preprocess_data does). A sync
+        replacing the file leaves frames already loaded intact.
+        """
+        if not self.path.exists():
+            return pd.DataFrame()
+        with pa.memory_map(str(self.path)) as source:
+            table = pa.ipc.open_file(source).read_all()
+        return table.to_pandas(split_blocks=True)
+
+    def clear(self):
+        for path in (self.path, self.meta_path):
+            path.unlink(missing_ok=True)
+
+    @staticmethod
+    def _replace(path, write):
+        # write-then-rename so a concurrent reader never sees half a file;
+        # the temp name is per writer, other workers may be syncing too
+        tmp = path.with_name(f"{path.name}.{os.getpid()}-{uuid.uuid4().hex[:8]}.tmp")
+        try:
+            write(tmp)
+            os.replace(tmp, path)
+        finally:
+            tmp.unlink(missing_ok=True)
+
+    def _write(self, df, meta):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        table = pa.Table.from_pandas(_compact(df), preserve_index=False)
+
+        def write_table(tmp):
+            with pa.OSFile(str(tmp), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+        self._replace(self.path, write_table)
+        self._replace(self.meta_path, lambda tmp: tmp.write_text(json.dumps(meta)))
+
+    # -------------------------------------------------
+    # SYNC
+    # -------------------------------------------------
+    def _pull(self, since=None):
+        collection = self.db.collection(self.collection)
+        if not since:
+            return [doc.to_dict() for doc in collection.stream()]
+
+        # >= so documents sharing the mark's timestamp are not missed; new
+        # documents match on created_at, edited ones on updated_at
+        docs = {}
+        for field in ("created_at", "updated_at"):
+            for doc in collection.where(field, ">=", since).stream():
+                docs[doc.id] = doc.to_dict()
+        return list(docs.values())
+
+    @staticmethod
+    def _changed_column(df):
+        if "updated_at" not in df:
+            return df["created_at"]
+        return df["updated_at"].where(df["updated_at"].notna(), df["created_at"])
+
+    def sync(self, full=False):
+        """Bring the snapshot up to date; returns a summary of what was read"""
+        with self._lock:
+            started = time.monotonic()
+            meta = self.meta()
+            now = datetime.now(timezone.utc)
+
+            reconcile = full or meta is None or (
+                now - datetime.fromisoformat(meta["reconciled_at"])
+            ).total_seconds() > self.reconcile_seconds
+
+            if reconcile:
+                docs = self._pull()
+                df = pd.DataFrame(docs)
+                reconciled_at = now.isoformat()
+            else:
+                docs = self._pull(meta["high_water"])
+                reconciled_at = meta["reconciled_at"]
+                df = self.load()
+                if not df.empty:
+                    # rows changed at exactly the mark were already applied last time
+                    known = set(df.loc[self._changed_column(df) == meta["high_water"], "student_id"])
+                    docs = [
+                        d for d in docs
+                        if _changed_at(d) != meta["high_water"] or d.get("student_id") not in known
+                    ]
+                if docs:
+                    changed = pd.DataFrame(docs)
+                    if not df.empty:
+                        df = df[~df["student_id"].isin(changed["student_id"])]
+                    # categories of the cached and new rows differ; concat as text
+                    df = pd.concat([
+                        df.astype({c: object for c in df.select_dtypes("category")}),
+                        changed
+                    ], ignore_index=True)
+
+            high_water = (
+                self._changed_column(df).max() if "created_at" in df and not df.empty
+                else meta and meta["high_water"]
+            )
+            if reconcile or docs:
+                self._write(df, {
+                    "high_water": high_water,
+                    "reconciled_at": reconciled_at,
+                    "rows": len(df),
+                })
+
+            return {
+                "mode": "full" if reconcile else "incremental",
+                "documents_read": len(docs),
+                "rows": len(df),
+                "high_water": high_water,
+                "seconds": round(time.monotonic() - started, 3),
+            }
+
+    def dataframe(self, full=False):
+        """Sync, then return the training data"""
+        self.sync(full)
+        return self.load()
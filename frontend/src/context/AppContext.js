@@ -1,4 +1,4 @@
-import React, { createContext, useContext, useState, useCallback } from 'react';
+import React, { createContext, useContext, useState, useCallback, useEffect, useRef } from 'react';
 import axios from 'axios';
 
 const AppContext = createContext();
@@ -10,6 +10,11 @@ export const AppProvider = ({ children }) => {
   const [modelMetrics, setModelMetrics] = useState(null);
   const [stats, setStats] = useState(null);
   const [loading, setLoading] = useState(false);
+  const [trainingStatus, setTrainingStatus] = useState(null);
+  // true while the /events stream is open: our own writes (from any worker)
+  // come back as events, so mutations patch state instead of refetching;
+  // null after the stream dropped, until it reopens
+  const liveRef = useRef(false);
 
   // ------------------------------------
   // FETCH STUDENTS
@@ -60,6 +65,82 @@ export const AppProvider = ({ children }) => {
     }
   }, []);
 
+  // ------------------------------------
+  // LIVE UPDATES (SERVER-SENT EVENTS)
+  // ------------------------------------
+  useEffect(() => {
+    if (typeof EventSource === 'undefined') return undefined;
+
+    const source = new EventSource(`${API}/events`);
+    const listen = (type, handler) =>
+      source.addEventListener(type, (e) => handler(JSON.parse(e.data)));
+
+    const refetch = () => {
+      axios.get(`${API}/students`).then((res) => setStudents(res.data.students || [])).catch(() => {});
+      axios.get(`${API}/stats`).then((res) => setStats(res.data)).catch(() => {});
+    };
+
+    source.onopen = () => {
+      // back after a drop: events may have been missed (the server sends
+      // a resync when it can't replay them, but not across a restart)
+      if (liveRef.current === null) refetch();
+      liveRef.current = true;
+    };
+    source.onerror = () => {
+      if (liveRef.current) liveRef.current = null;
+    };
+
+    listen('student_added', (student) => {
+      setStudents((prev) =>
+        prev.some((s) => s.student_id === student.student_id)
+          ? prev.map((s) => (s.student_id === student.student_id ? { ...s, ...student } : s))
+          : [...prev, student]
+      );
+      // once any student is scored, stats cover scored students only and
+      // a new (unscored) one doesn't change them
+      setStats((prev) => {
+        if (!prev || prev.has_predictions) return prev;
+        const n = prev.total_students;
+        const mean = (avg, value) => (value == null ? avg : (avg * n + value) / (n + 1));
+        return {
+          ...prev,
+          total_students: n + 1,
+          average_attendance: mean(prev.average_attendance, student.attendance_percentage),
+          average_marks: mean(prev.average_marks, student.average_marks)
+        };
+      });
+    });
+
+    listen('predictions_updated', ({ predictions }) => {
+      const byId = new Map(predictions.map((p) => [p.student_id, p]));
+      setStudents((prev) =>
+        prev.map((s) => (byId.has(s.student_id) ? { ...s, ...byId.get(s.student_id) } : s))
+      );
+    });
+
+    listen('stats', setStats);
+
+    listen('training', (status) => {
+      setTrainingStatus(status);
+      if (status.status === 'completed' && status.metrics) {
+        setModelMetrics(status.metrics);
+      }
+    });
+
+    // cross-validation / calibration for the new model finished in the background
+    listen('model_evaluated', () => {
+      axios.get(`${API}/model/metrics`).then((res) => setModelMetrics(res.data)).catch(() => {});
+    });
+
+    // we missed events (slow connection, server restart, bulk change): refetch once
+    listen('resync', refetch);
+
+    return () => {
+      liveRef.current = false;
+      source.close();
+    };
+  }, []);
+
   // ------------------------------------
   // GENERATE DATASET
   // ------------------------------------
@@ -87,7 +168,8 @@ export const AppProvider = ({ children }) => {
     try {
       setLoading(true);
       const response = await axios.post(`${API}/model/train`);
-      await fetchModelMetrics();
+      // otherwise the 'training' event brings the metrics
+      if (!liveRef.current) await fetchModelMetrics();
       return response.data;
     } catch (error) {
       console.error('Error training model:', error);
@@ -104,8 +186,11 @@ export const AppProvider = ({ children }) => {
     try {
       setLoading(true);
       const response = await axios.post(`${API}/predict/batch`);
-      await fetchStudents();
-      await fetchStats();
+      // otherwise 'predictions_updated' and 'stats' events patch local state
+      if (!liveRef.current) {
+        await fetchStudents();
+        await fetchStats();
+      }
       return response.data;
     } catch (error) {
       console.error('Error predicting batch:', error);
@@ -122,7 +207,10 @@ export const AppProvider = ({ children }) => {
     try {
       setLoading(true);
       const response = await axios.post(`${API}/students`, studentData);
-      await fetchStudents();
+      if (!liveRef.current) {
+        await fetchStudents();
+        await fetchStats();
+      }
       return response.data;
     } catch (error) {
       console.error('Error adding student:', error);
@@ -166,6 +254,7 @@ export const AppProvider = ({ children }) => {
     modelMetrics,
     stats,
     loading,
+    trainingStatus,
     fetchStudents,
     fetchStats,
     fetchModelMetrics,
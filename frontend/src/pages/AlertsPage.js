@@ -2,6 +2,7 @@ import React, { useEffect, useState } from 'react';
 import { motion } from 'framer-motion';
 import axios from 'axios';
 import { Card } from '@/components/ui/card';
+import { Button } from '@/components/ui/button';
 import { Bell, Loader2, CheckCircle } from 'lucide-react';
 import RiskBadge from '@/components/RiskBadge';
 
@@ -9,7 +10,10 @@ const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
 
 const AlertsPage = () => {
   const [alerts, setAlerts] = useState([]);
+  const [counts, setCounts] = useState({ total: 0, delivered: 0, by_risk: {} });
+  const [nextBefore, setNextBefore] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     fetchAlerts();
@@ -20,6 +24,8 @@ const AlertsPage = () => {
       setLoading(true);
       const response = await axios.get(`${API}/alerts`);
       setAlerts(response.data.alerts || []);
+      setCounts(response.data);
+      setNextBefore(response.data.next_before);
     } catch (error) {
       console.error('Error fetching alerts:', error);
     } finally {
@@ -27,6 +33,19 @@ const AlertsPage = () => {
     }
   };
 
+  const loadMoreAlerts = async () => {
+    try {
+      setLoadingMore(true);
+      const response = await axios.get(`${API}/alerts`, { params: { before: nextBefore } });
+      setAlerts((prev) => [...prev, ...(response.data.alerts || [])]);
+      setNextBefore(response.data.next_before);
+    } catch (error) {
+      console.error('Error fetching alerts:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   if (loading) {
     return (
       <div className="flex items-center justify-center h-96">
@@ -54,7 +73,7 @@ const AlertsPage = () => {
               <Bell className="text-blue-600" size={24} />
             </div>
             <div>
-              <div className="text-3xl font-bold text-foreground">{alerts.length}</div>
+              <div className="text-3xl font-bold text-foreground">{counts.total}</div>
               <div className="text-sm text-gray-600">Total Alerts Sent</div>
             </div>
           </div>
@@ -66,7 +85,7 @@ const AlertsPage = () => {
               <CheckCircle className="text-green-600" size={24} />
             </div>
             <div>
-              <div className="text-3xl font-bold text-foreground">{alerts.length}</div>
+              <div className="text-3xl font-bold text-foreground">{counts.delivered}</div>
               <div className="text-sm text-gray-600">Delivered</div>
             </div>
           </div>
@@ -79,7 +98,7 @@ const AlertsPage = () => {
             </div>
             <div>
               <div className="text-3xl font-bold text-foreground">
-                {alerts.filter(a => a.risk_level === 'High').length}
+                {counts.by_risk?.High ?? 0}
               </div>
               <div className="text-sm text-gray-600">High Risk Alerts</div>
             </div>
@@ -92,12 +111,12 @@ const AlertsPage = () => {
           Recent Alerts
         </h2>
         {alerts.length > 0 ? (
-          alerts.slice().reverse().map((alert, index) => (
+          alerts.map((alert, index) => (
             <motion.div
               key={alert.id}
               initial={{ opacity: 0, y: 20 }}
               animate={{ opacity: 1, y: 0 }}
-              transition={{ delay: index * 0.05 }}
+              transition={{ delay: Math.min(index, 10) * 0.05 }}
             >
               <Card className="p-6 border border-stone-200 shadow-sm hover:shadow-md transition-all duration-300" data-testid={`alert-${index}`}>
                 <div className="flex items-start justify-between mb-4">
@@ -135,6 +154,18 @@ const AlertsPage = () => {
             <p className="text-gray-600">Send alerts from individual student pages to notify teachers and NGOs</p>
           </Card>
         )}
+        {nextBefore && (
+          <div className="text-center">
+            <Button
+              variant="outline"
+              onClick={loadMoreAlerts}
+              disabled={loadingMore}
+              data-testid="load-more-alerts"
+            >
+              {loadingMore ? 'Loading...' : 'Load more'}
+            </Button>
+          </div>
+        )}
       </div>
 
       <motion.div
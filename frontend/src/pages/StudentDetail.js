@@ -19,6 +19,7 @@ const StudentDetail = () => {
   const { sendAlert, createIntervention } = useApp();
   const [student, setStudent] = useState(null);
   const [interventions, setInterventions] = useState([]);
+  const [interventionsNextBefore, setInterventionsNextBefore] = useState(null);
   const [loading, setLoading] = useState(true);
   const [showAlertForm, setShowAlertForm] = useState(false);
   const [showInterventionForm, setShowInterventionForm] = useState(false);
@@ -36,6 +37,7 @@ const StudentDetail = () => {
       const response = await axios.get(`${API}/students/${studentId}`);
       setStudent(response.data.student);
       setInterventions(response.data.interventions || []);
+      setInterventionsNextBefore(response.data.interventions_next_before);
       setPhoneNumber(response.data.student.phone_number || '');
     } catch (error) {
       toast.error('Failed to fetch student details');
@@ -44,6 +46,18 @@ const StudentDetail = () => {
     }
   };
 
+  const loadMoreInterventions = async () => {
+    try {
+      const response = await axios.get(`${API}/students/${studentId}/interventions`, {
+        params: { before: interventionsNextBefore }
+      });
+      setInterventions((prev) => [...prev, ...(response.data.interventions || [])]);
+      setInterventionsNextBefore(response.data.next_before);
+    } catch (error) {
+      toast.error('Failed to fetch interventions');
+    }
+  };
+
   const handleSendAlert = async () => {
     try {
 
@@ -177,6 +191,35 @@ const StudentDetail = () => {
               </div>
             </div>
           )}
+          {student.feature_contributions && (
+            <div className="mt-6 pt-6 border-t border-stone-200" data-testid="risk-explanation">
+              <h3 className="text-lg font-semibold text-foreground mb-3">
+                Why {student.predicted_risk} risk
+              </h3>
+              <p className="text-sm text-gray-600 mb-3">
+                How much each factor moved this student towards the predicted level
+              </p>
+              <div className="space-y-2">
+                {Object.entries(student.feature_contributions)
+                  .sort((a, b) => Math.abs(b[1]) - Math.abs(a[1]))
+                  .slice(0, 5)
+                  .map(([feature, contribution]) => (
+                    <div key={feature} className="flex items-center gap-3 text-sm">
+                      <span className="w-48 text-gray-600">{feature.replace(/_/g, ' ')}</span>
+                      <div className="flex-1 bg-stone-100 rounded-full h-2">
+                        <div
+                          className={`h-2 rounded-full ${contribution > 0 ? 'bg-primary' : 'bg-stone-400'}`}
+                          style={{ width: `${Math.min(Math.abs(contribution) * 200, 100)}%` }}
+                        />
+                      </div>
+                      <span className="w-16 text-right font-medium">
+                        {contribution > 0 ? '+' : ''}{(contribution * 100).toFixed(1)}%
+                      </span>
+                    </div>
+                  ))}
+              </div>
+            </div>
+          )}
         </Card>
       </motion.div>
 
@@ -303,7 +346,7 @@ const StudentDetail = () => {
             <div className="space-y-3">
               {interventions.map((intervention, index) => (
                 <div
-                  key={index}
+                  key={intervention.id || index}
                   className="p-4 bg-gray-50 rounded-lg border border-stone-200"
                   data-testid={`intervention-${index}`}
                 >
@@ -316,6 +359,16 @@ const StudentDetail = () => {
                   {intervention.notes && <p className="text-sm text-gray-600">{intervention.notes}</p>}
                 </div>
               ))}
+              {interventionsNextBefore && (
+                <Button
+                  variant="outline"
+                  className="w-full"
+                  onClick={loadMoreInterventions}
+                  data-testid="load-more-interventions"
+                >
+                  Load more
+                </Button>
+              )}
             </div>
           ) : (
             <p className="text-gray-600 text-center py-8">No interventions recorded yet</p>
@@ -0,0 +1,33 @@
+import importlib
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+# backend modules import each other by bare name (python server.py / uvicorn server:app)
+sys.path.insert(0, str(BACKEND_DIR))
+os.environ.setdefault("STORAGE_BACKEND", "local")
+
+
+@pytest.fixture
+def local_db(tmp_path):
+    from storage import LocalDatabase
+    return LocalDatabase(str(tmp_path / "store.db"))
+
+
+@pytest.fixture(scope="session")
+def training_df():
+    from ml_model import DropoutPredictor
+    return DropoutPredictor().generate_synthetic_data(600, seed=7)
+
+
+@pytest.fixture(scope="session")
+def server(tmp_path_factory):
+    # imported once, on a throwaway local store; the saved model file is only read
+    os.environ["LOCAL_DB_PATH"] = str(tmp_path_factory.mktemp("server") / "store.db")
+    try:
+        return importlib.import_module("server")
+    finally:
+        del os.environ["LOCAL_DB_PATH"]
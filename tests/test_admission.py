@@ -0,0 +1,232 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from admission import ConcurrencyLimiter, JobQueue, SingleFlight
+
+
+def _hold(context, started, release, log=None, name=None):
+    async def holder():
+        async with context:
+            if log is not None:
+                log.append(name)
+            started.set()
+            await release.wait()
+    return asyncio.ensure_future(holder())
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+# -------------------------------------------------
+# CONCURRENCY LIMITER
+# -------------------------------------------------
+def test_limiter_sheds_with_429_once_the_queue_is_full():
+    async def scenario():
+        limiter = ConcurrencyLimiter("read", limit=1, max_waiting=1, timeout=5)
+        release = asyncio.Event()
+        holding, waiting = asyncio.Event(), asyncio.Event()
+
+        first = _hold(limiter.slot(), holding, release)
+        await holding.wait()
+        second = _hold(limiter.slot(), waiting, release)
+        await _settle()
+        assert limiter.status() == {"limit": 1, "active": 1, "waiting": 1, "shed": 0}
+
+        with pytest.raises(HTTPException) as error:
+            async with limiter.slot():
+                pass
+        assert error.value.status_code == 429
+        assert error.value.headers["Retry-After"]
+        assert limiter.shed == 1
+
+        release.set()
+        await asyncio.gather(first, second)
+        assert waiting.is_set()
+        assert limiter.status()["active"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_limiter_times_out_waiting_with_429():
+    async def scenario():
+        limiter = ConcurrencyLimiter("read", limit=1, max_waiting=5, timeout=0.05)
+        release, holding = asyncio.Event(), asyncio.Event()
+        first = _hold(limiter.slot(), holding, release)
+        await holding.wait()
+
+        with pytest.raises(HTTPException) as error:
+            async with limiter.slot():
+                pass
+        assert error.value.status_code == 429
+        assert limiter.status()["waiting"] == 0
+
+        release.set()
+        await first
+
+    asyncio.run(scenario())
+
+
+def test_limiter_releases_the_slot_when_the_holder_fails():
+    async def scenario():
+        limiter = ConcurrencyLimiter("read", limit=1, max_waiting=0, timeout=1)
+        with pytest.raises(RuntimeError):
+            async with limiter.slot():
+                raise RuntimeError("boom")
+        async with limiter.slot():
+            assert limiter.status()["active"] == 1
+
+    asyncio.run(scenario())
+
+
+# -------------------------------------------------
+# JOB QUEUE
+# -------------------------------------------------
+def test_jobs_run_one_at_a_time_in_arrival_order():
+    async def scenario():
+        jobs = JobQueue(max_pending=2)
+        release, order = asyncio.Event(), []
+        events = [asyncio.Event() for _ in range(3)]
+
+        tasks = [_hold(jobs.run(name), e, release, order, name)
+                 for name, e in zip(["train", "predict_batch", "pipeline"], events)]
+        await events[0].wait()
+        await _settle()
+        assert jobs.status() == {"running": "train", "queued": ["predict_batch", "pipeline"]}
+        assert not events[1].is_set()
+
+        release.set()
+        await asyncio.gather(*tasks)
+        assert order == ["train", "predict_batch", "pipeline"]
+        assert jobs.status() == {"running": None, "queued": []}
+
+    asyncio.run(scenario())
+
+
+def test_jobs_beyond_the_queue_get_429():
+    async def scenario():
+        jobs = JobQueue(max_pending=1)
+        release = asyncio.Event()
+        running, queued = asyncio.Event(), asyncio.Event()
+
+        first = _hold(jobs.run("train"), running, release)
+        await running.wait()
+        second = _hold(jobs.run("predict_batch"), queued, release)
+        await _settle()
+
+        with pytest.raises(HTTPException) as error:
+            async with jobs.run("pipeline"):
+                pass
+        assert error.value.status_code == 429
+        assert "'train' is running" in error.value.detail
+        assert jobs.status()["queued"] == ["predict_batch"]
+
+        release.set()
+        await asyncio.gather(first, second)
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def scenario():
+        jobs = JobQueue(max_pending=1)
+        release, running, queued = asyncio.Event(), asyncio.Event(), asyncio.Event()
+        first = _hold(jobs.run("train"), running, release)
+        await running.wait()
+
+        waiter = _hold(jobs.run("predict_batch"), queued, release)
+        await _settle()
+        waiter.cancel()
+        await _settle()
+        assert jobs.status()["queued"] == []
+
+        release.set()
+        await first
+        async with jobs.run("pipeline"):
+            assert jobs.running == "pipeline"
+
+    asyncio.run(scenario())
+
+
+def test_jobs_on_another_worker_get_429_while_the_lease_is_held(local_db):
+    from storage import AsyncDatabase
+
+    async def scenario():
+        adb = AsyncDatabase(local_db)
+        # two workers: separate queues over the same store
+        first, second = JobQueue(adb=adb), JobQueue(adb=adb)
+        release, running = asyncio.Event(), asyncio.Event()
+        holder = _hold(first.run("train"), running, release)
+        await running.wait()
+
+        with pytest.raises(HTTPException) as error:
+            async with second.run("predict_batch"):
+                pass
+        assert error.value.status_code == 429
+        assert "'train' is running on another worker" in error.value.detail
+        assert second.status() == {"running": None, "queued": []}
+
+        release.set()
+        await holder
+        async with second.run("predict_batch"):
+            assert second.running == "predict_batch"
+
+    asyncio.run(scenario())
+
+
+def test_lease_of_a_crashed_worker_is_taken_over_once_expired(local_db):
+    from storage import AsyncDatabase
+
+    async def scenario():
+        adb = AsyncDatabase(local_db)
+        crashed = JobQueue(adb=adb, lease_seconds=-1)
+        # claimed and never released
+        assert (await adb.run(crashed._claim, "train"))[0] is not None
+
+        async with JobQueue(adb=adb).run("pipeline"):
+            leases = {d.id: d.to_dict() for d in local_db.collection("job_leases").stream()}
+            assert leases["1"]["job"] == "pipeline"
+
+    asyncio.run(scenario())
+
+
+def test_running_job_renews_its_lease(local_db):
+    from storage import AsyncDatabase
+
+    async def scenario():
+        adb = AsyncDatabase(local_db)
+        jobs = JobQueue(adb=adb, lease_seconds=0.3)
+        lease = local_db.collection("job_leases").document("0")
+        async with jobs.run("train"):
+            claimed = lease.get().to_dict()["expires_at"]
+            await asyncio.sleep(0.25)
+            assert lease.get().to_dict()["expires_at"] > claimed
+        # released on exit: the next job claims right away
+        async with JobQueue(adb=adb).run("pipeline"):
+            pass
+
+    asyncio.run(scenario())
+
+
+# -------------------------------------------------
+# SINGLE-FLIGHT
+# -------------------------------------------------
+def test_single_flight_shares_one_computation():
+    async def scenario():
+        flight, calls = SingleFlight(), []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return len(calls)
+
+        results = await asyncio.gather(*(flight.do("key", compute) for _ in range(5)))
+        assert results == [1] * 5
+        assert flight.inflight == 0
+        # nothing is cached once it finished
+        assert await flight.do("key", compute) == 2
+
+    asyncio.run(scenario())
@@ -0,0 +1,60 @@
+import asyncio
+import threading
+
+from fastapi.testclient import TestClient
+
+from cache import DataRevision
+from storage import AsyncDatabase, LocalDatabase
+
+
+def test_concurrent_bumps_are_not_lost(tmp_path):
+    path = tmp_path / "store.db"
+    LocalDatabase(path)
+
+    def bump_many():
+        # one connection each, like separate worker processes on the same file
+        revision = DataRevision(LocalDatabase(path))
+        for _ in range(50):
+            revision.bump()
+
+    threads = [threading.Thread(target=bump_many) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert DataRevision(LocalDatabase(path)).current()[0] == 200
+
+
+def test_async_reads_stay_off_the_event_loop(local_db):
+    DataRevision(local_db).bump()
+    revision = DataRevision(local_db, adb=AsyncDatabase(local_db))
+    readers = []
+    get = revision.ref.get
+
+    def tracked_get():
+        readers.append(threading.current_thread())
+        return get()
+
+    revision.ref.get = tracked_get
+
+    async def scenario():
+        return await asyncio.gather(*(revision.current_async() for _ in range(5)))
+
+    values = asyncio.run(scenario())
+    assert {value for value, _ in values} == {1}
+    # one read for all five, on the storage pool
+    assert len(readers) == 1
+    assert readers[0] is not threading.main_thread()
+
+
+def test_interventions_are_not_served_from_the_revision_cache(server):
+    client = TestClient(server.app)
+    before = client.get("/api/interventions").json()["total"]
+
+    client.post("/api/interventions", json={"student_id": "S1", "intervention_type": "call"})
+    etag = client.get("/api/stats").headers["etag"]
+    response = client.get("/api/interventions", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.json()["total"] == before + 1
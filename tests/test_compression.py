@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score
+
+from compression import CompactForest, select_trees
+from ml_model import DropoutPredictor
+
+
+@pytest.fixture(scope="module")
+def forest():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(800, 6)).astype(np.float32)
+    y = (X[:, 0] + X[:, 1] * X[:, 2] > 0).astype(int) + (X[:, 3] > 1)
+    model = RandomForestClassifier(n_estimators=40, max_depth=8, random_state=0).fit(X[:600], y[:600])
+    return model, X[600:], y[600:]
+
+
+def test_full_compact_forest_predicts_like_sklearn(forest):
+    model, X, _ = forest
+    compact = CompactForest.from_forest(model)
+
+    np.testing.assert_array_equal(compact.predict(X), model.predict(X))
+    np.testing.assert_array_equal(compact.apply(X), model.apply(X))
+    # 16-bit leaves: each class probability is off by at most one step
+    np.testing.assert_allclose(compact.predict_proba(X), model.predict_proba(X), atol=1 / compact.scale)
+    np.testing.assert_allclose(compact.feature_importances_, model.feature_importances_, rtol=1e-5)
+
+
+def test_8_bit_leaves_stay_close(forest):
+    model, X, _ = forest
+    compact = CompactForest.from_forest(model, leaf_bits=8)
+    np.testing.assert_allclose(compact.predict_proba(X), model.predict_proba(X), atol=1 / 255)
+
+
+def test_subset_matches_a_forest_of_those_trees(forest):
+    model, X, y = forest
+    trees, accuracy, _ = select_trees(model, X, y, max_accuracy_loss=0.02, min_trees=5)
+    compact = CompactForest.from_forest(model, trees)
+
+    subset = [model.estimators_[i] for i in trees]
+    proba = np.mean([t.predict_proba(X) for t in subset], axis=0)
+    np.testing.assert_allclose(compact.predict_proba(X), proba, atol=1 / compact.scale)
+    assert accuracy_score(y, compact.predict(X)) == pytest.approx(accuracy)
+
+    importances = np.mean([t.feature_importances_ for t in subset], axis=0)
+    np.testing.assert_allclose(compact.feature_importances_, importances / importances.sum(), rtol=1e-5)
+
+
+def test_compressed_model_metrics_describe_the_compact_forest(training_df):
+    predictor = DropoutPredictor()
+    full = dict(predictor.train_model(training_df))
+    report = predictor.compress(max_accuracy_loss=0.05)
+
+    assert isinstance(predictor.model, CompactForest)
+    assert predictor.model.n_estimators == report["after"]["trees"] <= report["before"]["trees"]
+    metrics = predictor.metrics
+    X_test, y_test = predictor.holdout
+    y_pred = predictor.model.predict(X_test)
+
+    assert metrics["accuracy"] == pytest.approx(accuracy_score(y_test, y_pred))
+    assert metrics["accuracy"] == pytest.approx(report["after"]["accuracy"])
+    assert np.trace(metrics["confusion_matrix"]) == int((y_pred == np.asarray(y_test)).sum())
+    assert metrics["version"] == full["version"]
+
+    by_name = {f["feature"]: f["importance"] for f in metrics["feature_importance"]}
+    expected = dict(zip(predictor.feature_names, predictor.model.feature_importances_))
+    assert by_name == pytest.approx(expected)
+    assert sum(by_name.values()) == pytest.approx(1.0)
@@ -0,0 +1,43 @@
+import pandas as pd
+
+from data_generator import generate_student_data, iter_student_chunks
+
+
+def _values(df):
+    # created_at is relative to the wall clock
+    return df.drop(columns="created_at").reset_index(drop=True)
+
+
+def test_same_seed_same_students():
+    pd.testing.assert_frame_equal(
+        _values(generate_student_data(500, seed=7)),
+        _values(generate_student_data(500, seed=7)),
+    )
+
+
+def test_different_seeds_differ():
+    a = _values(generate_student_data(200, seed=1))
+    b = _values(generate_student_data(200, seed=2))
+    assert not a.equals(b)
+
+
+def test_workers_do_not_change_output():
+    serial = pd.concat(iter_student_chunks(2_500, chunk_size=1_000, seed=3, workers=1))
+    parallel = pd.concat(iter_student_chunks(2_500, chunk_size=1_000, seed=3, workers=2))
+    pd.testing.assert_frame_equal(_values(serial), _values(parallel))
+
+
+def test_chunks_cover_ids_in_order():
+    chunks = list(iter_student_chunks(2_500, chunk_size=1_000, seed=3))
+    assert [len(c) for c in chunks] == [1_000, 1_000, 500]
+
+    df = pd.concat(chunks)
+    assert df["student_id"].tolist() == [f"STU{i:04d}" for i in range(1, 2_501)]
+
+
+def test_chunk_size_keeps_schema():
+    small = pd.concat(iter_student_chunks(300, chunk_size=100, seed=5))
+    large = pd.concat(iter_student_chunks(300, chunk_size=300, seed=5))
+    assert list(small.columns) == list(large.columns)
+    assert small["student_id"].tolist() == large["student_id"].tolist()
+    assert (small.dtypes == large.dtypes).all()
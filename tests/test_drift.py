@@ -0,0 +1,112 @@
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from drift import WORKER_TTL, WORKERS, DriftMonitor, DriftReference, SharedDrift
+
+FEATURES = ["attendance", "marks"]
+
+
+@pytest.fixture
+def reference():
+    rng = np.random.default_rng(0)
+    return DriftReference.fit(rng.uniform(0, 100, (500, 2)), FEATURES)
+
+
+def _students(db, n, start=0, shift=0.0):
+    rng = np.random.default_rng(start)
+    X = rng.uniform(0, 100, (n, 2)) + shift
+    students = []
+    for i in range(n):
+        record = {"student_id": f"S{start + i}", "district": "D1" if i % 2 else "D2"}
+        db.collection("students").document(record["student_id"]).set(record, merge=True)
+        students.append(record)
+    return students, X
+
+
+def _reload(db, students):
+    # what a later read of the students collection returns
+    return [db.collection("students").document(s["student_id"]).get().to_dict() for s in students]
+
+
+def test_added_students_are_not_counted_again_when_scored(local_db, reference):
+    drift = SharedDrift(local_db, DriftMonitor(reference), worker="w1")
+    students, X = _students(local_db, 3)
+
+    for i in range(3):
+        assert drift.observe(students[i:i + 1], X[i:i + 1]) == 1
+    # the batch re-reads every student; all three were observed on add
+    assert drift.observe(_reload(local_db, students), X) == 0
+
+    assert drift.report()["observations"] == 3
+    # nothing is written into the student documents
+    assert _reload(local_db, students) == students
+
+
+def test_changed_students_are_observed_again(local_db, reference):
+    drift = SharedDrift(local_db, DriftMonitor(reference), worker="w1")
+    students, X = _students(local_db, 4)
+    drift.observe(students, X)
+
+    X[0] += 1.0
+    assert drift.observe(_reload(local_db, students), X) == 1
+    assert drift.report()["observations"] == 5
+
+
+def test_workers_counts_are_summed_not_overwritten(local_db, reference):
+    first = SharedDrift(local_db, DriftMonitor(reference), worker="w1")
+    second = SharedDrift(local_db, DriftMonitor(reference), worker="w2")
+
+    first.observe(*_students(local_db, 40, start=0))
+    second.observe(*_students(local_db, 60, start=100))
+
+    for drift in (first, second):
+        report = drift.report()
+        assert report["observations"] == 100
+        weight = sum(d["weight"] for d in report["districts"].values())
+        assert weight == pytest.approx(100, rel=0.01)
+
+
+def test_summed_counts_match_one_monitor_seeing_everything(local_db, reference):
+    first = SharedDrift(local_db, DriftMonitor(reference, half_life=50), worker="w1")
+    second = SharedDrift(local_db, DriftMonitor(reference, half_life=50), worker="w2")
+    single = DriftMonitor(reference, half_life=50)
+
+    for i, drift in enumerate([first, second, first, second]):
+        students, X = _students(local_db, 30, start=i * 100, shift=i * 10.0)
+        drift.observe(students, X)
+        single.observe(X, [s["district"] for s in students])
+
+    shared, expected = first.report(), single.report()
+    assert shared["observations"] == expected["observations"] == 120
+    for got, want in zip(shared["features"], expected["features"]):
+        assert got["psi"] == pytest.approx(want["psi"], abs=1e-3)
+
+
+def test_reset_retires_the_old_reference(local_db, reference):
+    drift = SharedDrift(local_db, DriftMonitor(reference), worker="w1")
+    other = SharedDrift(local_db, DriftMonitor(reference), worker="w2")
+    students, X = _students(local_db, 10)
+    other.observe(students, X)
+
+    rng = np.random.default_rng(1)
+    drift.reset(DriftReference.fit(rng.uniform(0, 50, (500, 2)), FEATURES))
+
+    assert drift.report()["observations"] == 0
+    # students observed under the old reference count again under the new one
+    assert drift.observe(_reload(local_db, students), X) == 10
+
+
+def test_stale_worker_sketches_expire(local_db, reference):
+    gone = SharedDrift(local_db, DriftMonitor(reference), worker="gone")
+    gone.observe(*_students(local_db, 10))
+    old = (datetime.now(timezone.utc) - WORKER_TTL).isoformat()
+    local_db.collection(WORKERS).document(f"{reference.fingerprint()}.gone").set(
+        {"published_at": old}, merge=True
+    )
+
+    live = SharedDrift(local_db, DriftMonitor(reference), worker="live")
+    live.observe(*_students(local_db, 5, start=100))
+
+    assert [doc.id for doc in local_db.collection(WORKERS).stream()] == [f"{reference.fingerprint()}.live"]
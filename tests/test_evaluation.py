@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from compression import CompactForest
+from evaluation import evaluate, load_model_metrics, permutation_importance, save_model_version
+from ml_model import DropoutPredictor
+
+
+@pytest.fixture(scope="module")
+def plain(training_df):
+    predictor = DropoutPredictor()
+    predictor.train_model(training_df)
+    return predictor
+
+
+@pytest.fixture(scope="module")
+def compressed(training_df):
+    predictor = DropoutPredictor()
+    predictor.train_model(training_df)
+    predictor.compress(max_accuracy_loss=0.05)
+    return predictor
+
+
+def _check_report(report, predictor):
+    assert report["holdout_samples"] == len(predictor.holdout[1])
+    assert len(report["cross_validation"]["accuracy"]["folds"]) == 5
+    features = [f["feature"] for f in report["permutation_importance"]]
+    assert sorted(features) == sorted(predictor.feature_names)
+    importances = [f["importance"] for f in report["permutation_importance"]]
+    assert importances == sorted(importances, reverse=True)
+    assert report["calibration"]
+
+
+def test_evaluates_a_plain_forest(plain, training_df):
+    _check_report(evaluate(plain, training_df, n_jobs=1), plain)
+
+
+def test_evaluates_a_compressed_forest(compressed, training_df):
+    assert isinstance(compressed.model, CompactForest)
+    report = evaluate(compressed, training_df, n_jobs=1)
+    _check_report(report, compressed)
+    # attendance and marks drive the synthetic labels
+    top = {f["feature"] for f in report["permutation_importance"][:3]}
+    assert top & {"attendance_percentage", "average_marks"}
+
+
+def test_permutation_importance_matches_between_forest_and_its_compact_copy(plain):
+    X_test, y_test = plain.holdout
+    compact = CompactForest.from_forest(plain.model)
+
+    full = permutation_importance(plain.model, X_test, y_test, n_jobs=1)
+    copy = permutation_importance(compact, X_test, y_test, n_jobs=1)
+    np.testing.assert_allclose(full, copy)
+
+
+def test_evaluate_and_store_runs_synchronously(server, plain, compressed, training_df):
+    for predictor in (plain, compressed):
+        save_model_version(server.db, predictor.metrics)
+        assert server._evaluate_and_store(predictor, training_df) == "completed"
+
+        stored = load_model_metrics(server.db, predictor.version)
+        assert stored["evaluation_status"] == "completed"
+        assert stored["evaluation"]["permutation_importance"]
+
+
+def test_evaluate_and_store_records_failures(server, plain, training_df):
+    save_model_version(server.db, plain.metrics)
+    broken = training_df.drop(columns="attendance_percentage")
+
+    assert server._evaluate_and_store(plain, broken) == "failed"
+    stored = load_model_metrics(server.db, plain.version)
+    assert stored["evaluation_status"] == "failed"
@@ -0,0 +1,73 @@
+import asyncio
+
+from events import EVENTS, MAX_SHARED_EVENT_BYTES, EventBroker
+
+
+def _frames(queue):
+    frames = []
+    while not queue.empty():
+        frames.append(queue.get_nowait().decode())
+    return frames
+
+
+def test_events_reach_subscribers_of_other_workers(local_db):
+    async def scenario():
+        writer, reader = EventBroker(local_db), EventBroker(local_db)
+        queue = reader.subscribe()
+        await reader.poll()
+
+        writer.publish("student_added", {"student_id": "S1"})
+        await writer.poll()
+        await reader.poll()
+        # a repeated poll re-reads the recent past without re-delivering
+        await reader.poll()
+        return _frames(queue)
+
+    [frame] = asyncio.run(scenario())
+    assert "event: student_added" in frame
+    assert '"S1"' in frame
+
+
+def test_own_events_are_not_delivered_twice(local_db):
+    async def scenario():
+        broker = EventBroker(local_db)
+        queue = broker.subscribe()
+        broker.publish("stats", {"total_students": 1})
+        await broker.poll()
+        return _frames(queue)
+
+    assert len(asyncio.run(scenario())) == 1
+    assert len(list(local_db.collection(EVENTS).stream())) == 1
+
+
+def test_oversized_events_are_relayed_as_resync(local_db):
+    async def scenario():
+        writer, reader = EventBroker(local_db), EventBroker(local_db)
+        queue = reader.subscribe()
+        predictions = [{"student_id": f"S{i:06d}", "predicted_risk": "High"} for i in range(10_000)]
+        writer.publish("predictions_updated", {"predictions": predictions})
+        await writer.poll()
+        await reader.poll()
+        return _frames(queue)
+
+    [frame] = asyncio.run(scenario())
+    assert "event: resync" in frame
+    assert 10_000 * 40 > MAX_SHARED_EVENT_BYTES
+
+
+def test_replay_is_limited_to_this_workers_ids():
+    async def scenario():
+        broker, other = EventBroker(), EventBroker()
+        broker.subscribe()
+        broker.publish("stats", {"n": 1})
+        broker.publish("stats", {"n": 2})
+
+        replayed = _frames(broker.subscribe(f"{broker.instance}-1"))
+        foreign = _frames(broker.subscribe(f"{other.instance}-1"))
+        return replayed, foreign
+
+    replayed, foreign = asyncio.run(scenario())
+    [frame] = replayed
+    assert frame.split("\n")[0].endswith("-2")
+    assert '"n":2' in frame
+    assert ["resync" in f for f in foreign] == [True]
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from compression import CompactForest
+from explain import path_contributions, tree_arrays
+from ml_model import DropoutPredictor
+
+
+@pytest.fixture(scope="module")
+def trained(training_df):
+    predictor = DropoutPredictor()
+    predictor.train_model(training_df)
+    return predictor
+
+
+@pytest.fixture(scope="module")
+def X(trained):
+    return np.asarray(trained.holdout[0], dtype=np.float32)
+
+
+def _check_decomposition(model, X, bias, contributions):
+    np.testing.assert_allclose(bias + contributions.sum(axis=1), model.predict_proba(X), atol=1e-6)
+
+
+def test_contributions_sum_to_the_forest_probabilities(trained, X):
+    bias, contributions = trained.explain_batch(X)
+    assert contributions.shape == (len(X), len(trained.feature_names), len(bias))
+    _check_decomposition(trained.model, X, bias, contributions)
+
+
+def test_numpy_traversal_matches_sklearn_leaves(trained, X):
+    trees = tree_arrays(trained.model)
+    n_features = len(trained.feature_names)
+    ours = path_contributions(trees, X, n_features)
+    sklearn = path_contributions(trees, X, n_features, leaves=trained.model.apply(X))
+    for a, b in zip(ours, sklearn):
+        np.testing.assert_allclose(a, b)
+
+
+def test_contributions_sum_to_the_compact_forest_probabilities(trained, X):
+    compact = CompactForest.from_forest(trained.model)
+    bias, contributions = path_contributions(tree_arrays(compact), X, len(trained.feature_names))
+    _check_decomposition(compact, X, bias, contributions)
+
+
+def test_batch_results_explain_the_predicted_class(trained, training_df):
+    students = training_df.drop(columns="dropout_risk").head(20).to_dict("records")
+    for result in trained.predict_batch(students):
+        total = result["base_value"] + sum(result["feature_contributions"].values())
+        assert total == pytest.approx(result["confidence"], abs=1e-4)
+        assert set(result["feature_contributions"]) == set(trained.feature_names)
+
+
+def test_explanation_payload(server, training_df):
+    if server.predictor.model is None:
+        pytest.skip("no bundled model")
+    student = training_df.drop(columns="dropout_risk").iloc[0].to_dict()
+    server.db.collection("students").document(student["student_id"]).set(student)
+    client = TestClient(server.app)
+
+    body = client.get(f"/api/students/{student['student_id']}/explanation").json()
+    assert set(body) == {"student_id", "predicted_risk", "confidence", "base_value", "contributions"}
+    assert {c["feature"] for c in body["contributions"]} == set(server.predictor.feature_names)
+    sizes = [abs(c["contribution"]) for c in body["contributions"]]
+    assert sizes == sorted(sizes, reverse=True)
+    total = body["base_value"] + sum(c["contribution"] for c in body["contributions"])
+    assert total == pytest.approx(body["confidence"], abs=1e-4)
+
+    assert client.get("/api/students/no-such-student/explanation").status_code == 404
@@ -0,0 +1,100 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from features import DERIVED_NAMES, TREND_SCORES, available, derive, inputs_of
+from ml_model import DropoutPredictor
+
+
+def _number(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return math.nan
+    return value
+
+
+def _flag(value):
+    if isinstance(value, (bool, np.bool_)):
+        return float(value)
+    if isinstance(value, (int, float)):
+        return float(value)
+    return {"True": 1.0, "False": 0.0, "true": 1.0, "false": 0.0, "Yes": 1.0, "No": 0.0}.get(value, math.nan)
+
+
+def derive_row(student):
+    """One student at a time, written out plainly: what derive() must match"""
+    get = student.get
+    seasonal = _number(get("monsoon_absences")) + _number(get("health_absences"))
+    values = {
+        "marks_change": _number(get("average_marks")) - _number(get("prev_year_marks")),
+        "marks_trend_score": TREND_SCORES.get(get("marks_trend"), math.nan),
+        "seasonal_absences": seasonal,
+        "health_absence_share": _number(get("health_absences")) / max(seasonal, 1)
+        if not math.isnan(seasonal) else math.nan,
+        "unassisted_distance_km": _number(get("distance_to_school_km")) * (1 - _flag(get("has_transport"))),
+        "support_count": _flag(get("has_transport")) + _flag(get("has_scholarship")) + _flag(get("mid_day_meal")),
+    }
+    # a missing input gives the default, 0.0 for every feature
+    return [v if math.isfinite(v) else 0.0 for v in values.values()]
+
+
+def _check(records):
+    expected = np.array([derive_row(r) for r in records])
+    np.testing.assert_allclose(derive(pd.DataFrame(records), DERIVED_NAMES), expected)
+
+
+def test_matches_per_row_derivation_on_generated_students():
+    df = DropoutPredictor().generate_synthetic_data(300, seed=3)
+    _check(df.to_dict("records"))
+
+
+def test_matches_per_row_derivation_on_messy_records():
+    records = [
+        {"average_marks": 60, "prev_year_marks": 70, "marks_trend": "Declining",
+         "monsoon_absences": 3, "health_absences": 1, "distance_to_school_km": 12.5,
+         "has_transport": "Yes", "has_scholarship": "No", "mid_day_meal": "true"},
+        {"average_marks": "55", "prev_year_marks": None, "marks_trend": "Unknown",
+         "monsoon_absences": 0, "health_absences": 0, "distance_to_school_km": 4,
+         "has_transport": "False", "has_scholarship": "True", "mid_day_meal": None},
+        {"average_marks": 80, "prev_year_marks": "n/a", "marks_trend": None,
+         "monsoon_absences": None, "health_absences": 4, "distance_to_school_km": None,
+         "has_transport": None, "has_scholarship": "Yes", "mid_day_meal": "No"},
+    ]
+    _check(records)
+
+
+def test_flags_as_booleans_or_numbers():
+    _check([
+        {"has_transport": True, "has_scholarship": False, "mid_day_meal": True, "distance_to_school_km": 3.0},
+        {"has_transport": False, "has_scholarship": True, "mid_day_meal": False, "distance_to_school_km": 8.0},
+    ])
+    _check([{"has_transport": 1, "has_scholarship": 0, "mid_day_meal": 1, "distance_to_school_km": 3.0}])
+
+
+def test_missing_columns_give_defaults():
+    out = derive(pd.DataFrame({"average_marks": [50.0, 70.0]}), DERIVED_NAMES)
+    assert out.shape == (2, len(DERIVED_NAMES))
+    assert not out.any()
+    assert derive(pd.DataFrame(), DERIVED_NAMES).shape == (0, len(DERIVED_NAMES))
+
+
+def test_available_needs_non_empty_inputs():
+    df = pd.DataFrame({"average_marks": [50.0], "prev_year_marks": [None], "marks_trend": ["Stable"]})
+    assert available(df) == ["marks_trend_score"]
+    assert inputs_of(["marks_change", "marks_trend_score"]) == ["average_marks", "prev_year_marks", "marks_trend"]
+    with pytest.raises(ValueError):
+        available(df, ["no_such_feature"])
+
+
+def test_scoring_derives_the_same_features_as_training(training_df):
+    predictor = DropoutPredictor()
+    predictor.train_model(training_df, derived_features=True)
+    students = training_df.drop(columns="dropout_risk").head(50)
+
+    X, _ = predictor.preprocess_data(students, training=False)
+    expected = np.array([derive_row(r) for r in students.to_dict("records")])
+    columns = [DERIVED_NAMES.index(name) for name in predictor.derived_features]
+    np.testing.assert_allclose(X[predictor.derived_features].to_numpy(), expected[:, columns])
@@ -0,0 +1,78 @@
+from history import count_history, query_history
+
+
+def _add(db, collection, doc_id, created_at, **fields):
+    db.collection(collection).document(doc_id).set({"created_at": created_at, **fields})
+
+
+def _all_pages(db, collection, limit, **filters):
+    seen, before = [], None
+    while True:
+        items, before = query_history(db, collection, before=before, limit=limit, **filters)
+        seen += [item["id"] for item in items]
+        if before is None:
+            return seen
+
+
+def test_tied_timestamps_across_pages_are_neither_skipped_nor_repeated(local_db):
+    # 7 rows on one timestamp straddle several page boundaries
+    for i in range(3):
+        _add(local_db, "interventions", f"new{i}", "2026-03-03T00:00:00", student_id="S1")
+    for i in range(7):
+        _add(local_db, "interventions", f"tie{i}", "2026-03-02T00:00:00", student_id="S1")
+    for i in range(4):
+        _add(local_db, "interventions", f"old{i}", f"2026-03-01T00:00:0{i}", student_id="S1")
+
+    for limit in (1, 2, 3, 5, 50):
+        ids = _all_pages(local_db, "interventions", limit)
+        assert sorted(ids) == sorted(set(ids))
+        assert len(ids) == 14
+        assert ids[:3] == ["new2", "new1", "new0"]
+        assert ids[3:10] == [f"tie{i}" for i in reversed(range(7))]
+        assert ids[10:] == ["old3", "old2", "old1", "old0"]
+
+
+def test_pages_respect_the_limit(local_db):
+    for i in range(6):
+        _add(local_db, "interventions", f"tie{i}", "2026-03-02T00:00:00")
+
+    items, before = query_history(local_db, "interventions", limit=4)
+    assert len(items) == 4
+    assert before == "2026-03-02T00:00:00|tie2"
+
+    items, before = query_history(local_db, "interventions", before=before, limit=4)
+    assert [item["id"] for item in items] == ["tie1", "tie0"]
+    assert before is None
+
+
+def test_plain_timestamp_cursor_still_works(local_db):
+    for i in range(3):
+        _add(local_db, "interventions", f"i{i}", f"2026-03-0{i + 1}T00:00:00")
+
+    items, before = query_history(local_db, "interventions", before="2026-03-03T00:00:00")
+    assert [item["id"] for item in items] == ["i1", "i0"]
+    assert before is None
+
+
+def test_filters_by_student(local_db):
+    _add(local_db, "interventions", "a", "2026-03-01T00:00:00", student_id="S1")
+    _add(local_db, "interventions", "b", "2026-03-01T00:00:00", student_id="S2")
+
+    assert _all_pages(local_db, "interventions", 1, student_id="S2") == ["b"]
+
+
+def test_counts_cover_the_whole_history_not_one_page(local_db):
+    risks = ["High", "High", "Medium", "Low"] * 20
+    for i, risk in enumerate(risks):
+        status = "failed" if i % 10 == 0 else "delivered"
+        _add(local_db, "alerts", f"a{i:03d}", f"2026-03-01T00:{i // 60:02d}:{i % 60:02d}",
+             student_id="S1" if i < 40 else "S2", risk_level=risk, sms_status=status)
+
+    items, _ = query_history(local_db, "alerts")
+    assert len(items) == 50
+
+    counts = count_history(local_db, "alerts")
+    assert counts == {"total": 80, "by_risk": {"High": 40, "Medium": 20, "Low": 20}, "delivered": 72}
+
+    assert count_history(local_db, "alerts", student_id="S2")["total"] == 40
+    assert count_history(local_db, "interventions") == {"total": 0}
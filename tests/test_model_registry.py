@@ -0,0 +1,61 @@
+import pytest
+
+from model_registry import GLOBAL_SHARD, ShardedModelRegistry, train_shards
+from ml_model import DropoutPredictor
+from pipeline import Pipeline, score_stage
+
+
+@pytest.fixture(scope="module")
+def global_predictor(training_df):
+    predictor = DropoutPredictor()
+    predictor.train_model(training_df)
+    return predictor
+
+
+@pytest.fixture(scope="module")
+def shard_dir(training_df, tmp_path_factory):
+    folder = tmp_path_factory.mktemp("shards")
+    train_shards(training_df, by="region", min_size=150, shard_dir=folder, workers=2)
+    return folder
+
+
+def _students(training_df, n=30):
+    return training_df.drop(columns="dropout_risk").head(n).to_dict("records")
+
+
+def test_results_carry_the_version_of_the_model_that_scored_them(global_predictor, shard_dir, training_df):
+    registry = ShardedModelRegistry(global_predictor, shard_dir)
+    students = _students(training_df)
+    results = registry.predict_batch(students, explain=False)
+
+    shards = registry.manifest["shards"]
+    for student, result in zip(students, results):
+        shard = result["model_shard"]
+        assert shard != GLOBAL_SHARD
+        assert result["model_version"] == shards[shard]["version"] == registry.version_for(student)
+        assert result["model_version"] != global_predictor.version
+
+
+def test_shards_trained_by_another_worker_are_picked_up(global_predictor, shard_dir, training_df, tmp_path):
+    # this worker starts before any shard exists
+    other = ShardedModelRegistry(global_predictor, tmp_path)
+    students = _students(training_df, 5)
+    assert {r["model_shard"] for r in other.predict_batch(students, explain=False)} == {GLOBAL_SHARD}
+
+    # another worker trains shards into the same directory
+    for path in shard_dir.iterdir():
+        (tmp_path / path.name).write_bytes(path.read_bytes())
+
+    results = other.predict_batch(students, explain=False)
+    assert GLOBAL_SHARD not in {r["model_shard"] for r in results}
+    assert other.manifest is not None
+
+
+def test_pipeline_does_not_rescore_students_served_by_a_shard(local_db, global_predictor, shard_dir, training_df):
+    for student in _students(training_df, 10):
+        local_db.collection("students").document(student["student_id"]).set(student)
+
+    pipeline = Pipeline(local_db, global_predictor, ShardedModelRegistry(global_predictor, shard_dir))
+    pipeline.run_id = "run-1"
+    assert score_stage(pipeline, {})["scored"] == 10
+    assert score_stage(pipeline, {})["scored"] == 0
@@ -0,0 +1,206 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from pipeline import (
+    LEASES, RUNS, STAGE_NAMES, WRITE_CHUNK, Pipeline, RunNotFound,
+    run_scheduled, scheduled_run_id, score_stage, source_path
+)
+
+
+@pytest.fixture
+def import_dir(tmp_path):
+    folder = tmp_path / "imports"
+    folder.mkdir()
+    (folder / "students.csv").write_text("student_id\n")
+    (tmp_path / "secret.csv").write_text("student_id\n")
+    return folder
+
+
+def _pipeline(db, import_dir=None):
+    # stands in for a trained DropoutPredictor; these tests never score
+    predictor = SimpleNamespace(model=object(), version="v1")
+    return Pipeline(db, predictor, import_dir=import_dir)
+
+
+# -------------------------------------------------
+# SOURCES
+# -------------------------------------------------
+def test_sources_must_be_inside_the_import_dir(import_dir):
+    assert source_path("students.csv", import_dir) == (import_dir / "students.csv").resolve()
+    assert source_path(str(import_dir / "students.csv"), import_dir).name == "students.csv"
+
+    for source in ("../secret.csv", str(import_dir.parent / "secret.csv"), "/etc/passwd"):
+        with pytest.raises(ValueError):
+            source_path(source, import_dir)
+
+
+def test_sources_must_be_existing_csv_or_parquet_files(import_dir):
+    (import_dir / "notes.txt").write_text("")
+    for source in ("notes.txt", "missing.csv"):
+        with pytest.raises(ValueError):
+            source_path(source, import_dir)
+
+
+def test_run_refuses_a_source_before_starting(local_db, import_dir):
+    pipeline = _pipeline(local_db, import_dir)
+    with pytest.raises(ValueError, match="import directory"):
+        pipeline.run({"source": "../secret.csv"})
+    assert pipeline.latest_run() is None
+
+
+# -------------------------------------------------
+# SCORE
+# -------------------------------------------------
+class _History:
+    def __init__(self):
+        self.batches = []
+
+    def append(self, records):
+        self.batches.append(len(records))
+
+
+def _scoring_pipeline(db, fail_after=None):
+    calls = []
+
+    def predict_batch(students):
+        calls.append(len(students))
+        if fail_after is not None and len(calls) > fail_after:
+            raise RuntimeError("scoring failed")
+        return [{"predicted_risk": "Low", "confidence": 0.9} for _ in students]
+
+    predictor = SimpleNamespace(model=object(), version="v1", predict_batch=predict_batch)
+    pipeline = Pipeline(db, predictor, history=_History())
+    pipeline.run_id = "run-1"
+    return pipeline
+
+
+def _add_students(db, n):
+    for i in range(n):
+        db.collection("students").document(f"S{i:05d}").set({"student_id": f"S{i:05d}"})
+
+
+def test_score_stage_appends_history_once(local_db):
+    _add_students(local_db, WRITE_CHUNK * 2 + 10)
+    pipeline = _scoring_pipeline(local_db)
+
+    assert score_stage(pipeline, {})["scored"] == WRITE_CHUNK * 2 + 10
+    assert pipeline.history.batches == [WRITE_CHUNK * 2 + 10]
+
+
+def test_a_failed_score_stage_still_records_the_written_chunks(local_db):
+    _add_students(local_db, WRITE_CHUNK * 2 + 10)
+    pipeline = _scoring_pipeline(local_db, fail_after=2)
+
+    with pytest.raises(RuntimeError):
+        score_stage(pipeline, {})
+    assert pipeline.history.batches == [WRITE_CHUNK * 2]
+
+
+# -------------------------------------------------
+# RESUME
+# -------------------------------------------------
+def test_manual_runs_in_the_same_second_get_their_own_ids(local_db):
+    pipeline = _pipeline(local_db)
+    first = pipeline.run(stages=[])
+    second = pipeline.run(stages=[])
+
+    assert first["run_id"] != second["run_id"]
+
+
+def test_resuming_an_unknown_run_is_an_error(local_db):
+    pipeline = _pipeline(local_db)
+    local_db.collection(RUNS).document("run-1").set({
+        "run_id": "run-1", "status": "failed", "stages": {}, "started_at": "2026-01-01", "params": {}
+    })
+
+    with pytest.raises(RunNotFound):
+        pipeline.run(run_id="run-2", resume=True)
+    assert local_db.collection(RUNS).document("run-1").get().to_dict()["status"] == "failed"
+
+
+# -------------------------------------------------
+# LEASES + SCHEDULE
+# -------------------------------------------------
+def test_only_one_holder_at_a_time(local_db):
+    first, second = _pipeline(local_db), _pipeline(local_db)
+
+    assert first.acquire_lease("job")
+    assert not second.acquire_lease("job")
+
+    first.release_lease()
+    assert second.acquire_lease("job")
+
+
+def test_an_expired_lease_is_taken_over(local_db):
+    crashed, other = _pipeline(local_db), _pipeline(local_db)
+    assert crashed.acquire_lease("job", seconds=-1)
+
+    assert other.acquire_lease("job")
+    assert other.lease[1] == 1
+    # the old holder finds out before its next stage
+    with pytest.raises(RuntimeError):
+        crashed.renew_lease()
+    assert not _pipeline(local_db).acquire_lease("job")
+
+
+def _stored_run(db, run_id, status, stages):
+    db.collection(RUNS).document(run_id).set({
+        "run_id": run_id, "trigger": "schedule", "params": {}, "status": status,
+        "started_at": "2026-01-01T02:00:00", "finished_at": None,
+        "stages": {name: {"status": "completed", "summary": {}} for name in stages}
+    })
+
+
+def test_a_crashed_scheduled_run_is_resumed(local_db):
+    run_id = scheduled_run_id()
+    # the worker died after its last stage, holding a lease that has lapsed
+    _stored_run(local_db, run_id, "running", STAGE_NAMES)
+    assert _pipeline(local_db).acquire_lease(run_id, seconds=-1)
+
+    run = run_scheduled(_pipeline(local_db), {})
+    assert run["status"] == "completed"
+    assert run["trigger"] == "schedule"
+
+
+def test_a_scheduled_run_held_by_another_worker_is_left_alone(local_db):
+    run_id = scheduled_run_id()
+    _stored_run(local_db, run_id, "running", STAGE_NAMES[:1])
+    assert _pipeline(local_db).acquire_lease(run_id)
+
+    run = run_scheduled(_pipeline(local_db), {})
+    assert run["status"] == "running"
+    assert local_db.collection(RUNS).document(run_id).get().to_dict()["status"] == "running"
+
+
+def test_a_completed_scheduled_run_is_not_repeated(local_db):
+    run_id = scheduled_run_id()
+    _stored_run(local_db, run_id, "completed", STAGE_NAMES)
+
+    assert run_scheduled(_pipeline(local_db), {})["status"] == "completed"
+    assert not list(local_db.collection(LEASES).stream())
+
+
+def test_scheduled_day_is_the_last_one_that_started():
+    at = datetime(2026, 3, 2, 1, 0, tzinfo=timezone.utc)
+    # a retry at 01:00 still belongs to the run scheduled yesterday at 02:00
+    assert scheduled_run_id("02:00", at) == "scheduled-20260301"
+    assert scheduled_run_id("02:00", at + timedelta(hours=1)) == "scheduled-20260302"
+    assert scheduled_run_id(None, at) == "scheduled-20260302"
+
+
+# -------------------------------------------------
+# API
+# -------------------------------------------------
+def test_api_maps_bad_sources_to_400_and_unknown_runs_to_404(server, tmp_path):
+    client = TestClient(server.app)
+    outside = tmp_path / "students.csv"
+    outside.write_text("student_id\n")
+
+    response = client.post("/api/pipeline/run", json={"source": str(outside)})
+    assert response.status_code == 400
+
+    response = client.post("/api/pipeline/run", json={"run_id": "no-such-run", "resume": True})
+    assert response.status_code == 404
@@ -0,0 +1,99 @@
+import multiprocessing
+import threading
+from datetime import date
+
+import pytest
+
+from risk_history import RiskHistory
+
+DAY = "2026-03-04"
+
+
+def _records(start, n, risk="High", day=DAY, hour=9):
+    return [
+        {
+            "student_id": f"S{i:04d}",
+            "school": f"School {i % 3}",
+            "district": "North" if i % 2 else "South",
+            "predicted_risk": risk,
+            "confidence": 0.8,
+            "predicted_at": f"{day}T{hour:02d}:00:00+00:00",
+            "model_version": "v1",
+        }
+        for i in range(start, start + n)
+    ]
+
+
+def _append(root, start, n):
+    RiskHistory(root).append(_records(start, n))
+
+
+def _total(history, period="daily"):
+    return {row["period"]: row["total"] for row in history.trend(period)}
+
+
+def test_rollups_count_each_students_latest_prediction(tmp_path):
+    history = RiskHistory(tmp_path)
+    history.append(_records(0, 4, risk="High", hour=9))
+    history.append(_records(0, 2, risk="Low", hour=10))
+
+    [row] = history.trend("daily")
+    assert (row["total"], row["High"], row["Low"]) == (4, 2, 2)
+
+    districts = {row["key"]: row["total"] for row in history.trend("daily", level="district")}
+    assert districts == {"North": 2, "South": 2}
+    # 2026-03-04 is a Wednesday
+    assert history.trend("weekly")[0]["period"] == "2026-03-02"
+
+
+def test_concurrent_processes_do_not_lose_batches(tmp_path):
+    # each batch touches the same day and week; with unserialized
+    # read-modify-writes the last writer would drop the others' students
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=_append, args=(tmp_path, i * 25, 25)) for i in range(6)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+        assert worker.exitcode == 0
+
+    history = RiskHistory(tmp_path)
+    assert _total(history) == {DAY: 150}
+    assert _total(history, "weekly") == {"2026-03-02": 150}
+
+
+def test_concurrent_threads_do_not_lose_batches(tmp_path):
+    history = RiskHistory(tmp_path)
+    threads = [
+        threading.Thread(target=history.append, args=(_records(i * 10, 10),)) for i in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert _total(history) == {DAY: 80}
+
+
+def test_rebuild_matches_incremental_rollups(tmp_path):
+    history = RiskHistory(tmp_path)
+    history.append(_records(0, 5, day="2026-03-04"))
+    history.append(_records(3, 5, day="2026-03-05", risk="Medium"))
+    before = history.trend("daily", level="school")
+
+    history.rebuild()
+    assert RiskHistory(tmp_path).trend("daily", level="school") == before
+    assert [p.name for p in (tmp_path / "rollups").glob("*.tmp")] == []
+    assert {date.fromisoformat(r["period"]) for r in before} == {date(2026, 3, 4), date(2026, 3, 5)}
+
+
+def test_student_history_filters_and_validates_dates(tmp_path):
+    history = RiskHistory(tmp_path)
+    history.append(_records(0, 1, hour=9) + _records(0, 1, hour=12))
+
+    assert len(history.student_history("S0000", since=DAY)) == 2
+    assert len(history.student_history("S0000", since=f"{DAY}T10:00:00")) == 1
+    assert len(history.student_history("S0000", until=f"{DAY}T10:00:00+00:00")) == 1
+    for bad in ("yesterday", "2026-13-01"):
+        with pytest.raises(ValueError, match="since"):
+            history.student_history("S0000", since=bad)
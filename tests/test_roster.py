@@ -0,0 +1,72 @@
+from events import EventBroker
+from roster import Roster
+
+
+def _student(student_id, risk=None):
+    return {"student_id": student_id, "district": "North", "attendance_percentage": 90.0, "predicted_risk": risk}
+
+
+def _synced(revision=5):
+    roster = Roster()
+    roster.upsert([_student("S1"), _student("S2")])
+    roster.synced_revision = revision
+    return roster
+
+
+# -------------------------------------------------
+# EVENTS
+# -------------------------------------------------
+def test_a_failing_listener_does_not_fail_publish():
+    broker = EventBroker()
+    seen = []
+
+    def broken(event_type, data):
+        raise RuntimeError("boom")
+
+    broker.add_listener(broken)
+    broker.add_listener(lambda event_type, data: seen.append(event_type))
+    broker.publish("student_added", {"student_id": "S1"})
+
+    assert seen == ["student_added"]
+    assert broker._last_id == 1
+
+
+def test_a_half_applied_event_marks_the_roster_stale():
+    roster = _synced()
+    try:
+        roster.apply("predictions_updated", {})
+    except KeyError:
+        pass
+    assert roster.stale(5)
+
+
+# -------------------------------------------------
+# REVISION
+# -------------------------------------------------
+def test_own_writes_keep_the_roster_fresh():
+    roster = _synced(5)
+    roster.apply("student_added", _student("S3"))
+    roster.apply("predictions_updated", {"predictions": [{"student_id": "S1", "predicted_risk": "High"}]})
+
+    # the shared revision may not show our bumps yet
+    assert not roster.stale(5)
+    assert not roster.stale(6)
+    assert not roster.stale(7)
+    assert (roster.synced_revision, roster.local_bumps) == (7, 0)
+    assert roster.stats()["total_students"] == 1
+    assert roster.stats()["risk_distribution"]["High"] == 1
+
+
+def test_foreign_writes_make_the_roster_stale():
+    roster = _synced(5)
+    roster.apply("student_added", _student("S3"))
+
+    assert roster.stale(7)
+    assert roster.stale(4)
+    assert Roster().stale(0)
+
+
+def test_resync_makes_the_roster_stale():
+    roster = _synced(5)
+    roster.apply("resync", {})
+    assert roster.stale(5)
@@ -0,0 +1,136 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+from ml_model import DropoutPredictor
+from model_registry import ShardedModelRegistry
+from simulation import BOUNDS, simulate
+
+
+@pytest.fixture(scope="module")
+def plain(training_df):
+    predictor = DropoutPredictor()
+    predictor.train_model(training_df)
+    return predictor
+
+
+@pytest.fixture(scope="module")
+def derived(training_df):
+    predictor = DropoutPredictor()
+    predictor.train_model(training_df, derived_features=True)
+    return predictor
+
+
+@pytest.fixture
+def students(training_df):
+    return training_df.drop(columns="dropout_risk").head(12).to_dict("records")
+
+
+def _apply(student, changes):
+    # the perturbation spelled out on the raw record, one student at a time
+    student = dict(student)
+    for change in changes:
+        feature, op, value = change["feature"], change["op"], change["value"]
+        if op == "set":
+            student[feature] = value
+            continue
+        new = student[feature] + value if op == "add" else student[feature] * value
+        low, high = BOUNDS.get(feature, (None, None))
+        student[feature] = float(np.clip(new, low, high))
+    return student
+
+
+def _per_row(predictor, students, result):
+    labels = [str(c) for c in predictor.label_encoders["dropout_risk"].classes_]
+    high = labels.index("High")
+    for point in result["surface"]:
+        for i, student in enumerate(students):
+            X, _ = predictor.preprocess_data(pd.DataFrame([_apply(student, point["changes"])]), training=False)
+            yield point["scenario"], i, predictor.model.predict_proba(X)[0, high]
+
+
+def _check_against_per_row(predictor, students, result):
+    for scenario, i, expected in _per_row(predictor, students, result):
+        got = result["per_student"][i]["high_risk_probability"][scenario]
+        assert got == pytest.approx(expected, abs=1e-4)
+
+
+def test_matches_per_row_scoring(plain, students):
+    grid = {
+        "attendance_percentage": {"set": [60, 95], "add": [15]},
+        "absences_per_month": {"scale": [0.5]},
+        "family_income_level": {"set": ["High"]},
+    }
+    result = simulate(plain, students, grid)
+
+    assert result["scenarios"] == 1 + 3 * 1 * 1
+    assert result["rows_scored"] == len(students) * result["scenarios"]
+    assert result["surface"][0]["changes"] == []
+    _check_against_per_row(plain, students, result)
+
+
+def test_perturbed_inputs_of_derived_features_are_recomputed(derived, students):
+    assert "marks_change" in derived.derived_features
+    grid = {"prev_year_marks": {"set": [20, 90]}, "has_transport": {"set": [True]}}
+    _check_against_per_row(derived, students, simulate(derived, students, grid))
+
+
+@pytest.mark.parametrize("grid, message", [
+    ({"shoe_size": {"set": [40]}}, "Unknown features"),
+    ({"attendance_percentage": {"double": [2]}}, "Unknown operation"),
+    ({"family_income_level": {"add": [1]}}, "categorical"),
+    ({"family_income_level": {"set": ["Billionaire"]}}, "unseen"),
+])
+def test_invalid_grids_are_rejected(plain, students, grid, message):
+    with pytest.raises(ValueError, match=message):
+        simulate(plain, students, grid)
+
+
+def test_inputs_the_model_does_not_use_are_unknown(plain, students):
+    # a raw input of a derived feature only counts when the model has it
+    with pytest.raises(ValueError, match="prev_year_marks"):
+        simulate(plain, students, {"prev_year_marks": {"set": [50]}})
+
+
+def test_students_are_simulated_with_their_shard_model(plain, training_df, students, tmp_path):
+    shard = DropoutPredictor()
+    shard.train_model(training_df[training_df["region"] == "Urban"])
+    shard.save_model(str(tmp_path / "region-urban.pkl"))
+    (tmp_path / "manifest.json").write_text(json.dumps({
+        "by": "region",
+        "shards": {"Urban": {"status": "trained", "file": "region-urban.pkl", "version": shard.version}}
+    }))
+    registry = ShardedModelRegistry(plain, tmp_path)
+
+    grid = {"attendance_percentage": {"set": [50, 90]}}
+    result = simulate(registry, students, grid)
+
+    for scenario, i, expected in _per_row(plain, students, result):
+        if students[i]["region"] == "Urban":
+            continue
+        assert result["per_student"][i]["high_risk_probability"][scenario] == pytest.approx(expected, abs=1e-4)
+
+    urban = [s for s in students if s["region"] == "Urban"]
+    assert urban
+    alone = simulate(shard, urban, grid)
+    routed = [p for p, s in zip(result["per_student"], students) if s["region"] == "Urban"]
+    assert [p["high_risk_probability"] for p in routed] == [p["high_risk_probability"] for p in alone["per_student"]]
+
+
+def test_api_maps_bad_grids_to_400(server, students):
+    if server.predictor.model is None:
+        pytest.skip("no bundled model")
+    client = TestClient(server.app)
+    cohort = json.loads(pd.DataFrame(students[:2]).to_json(orient="records"))
+
+    response = client.post("/api/simulate", json={"students": cohort, "grid": {"shoe_size": {"set": [1]}}})
+    assert response.status_code == 400
+
+    response = client.post("/api/simulate", json={
+        "students": cohort, "grid": {"attendance_percentage": {"set": [90]}}
+    })
+    assert response.status_code == 200
+    assert len(response.json()["per_student"]) == 2
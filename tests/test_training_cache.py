@@ -0,0 +1,99 @@
+import pytest
+
+from training_cache import TrainingSnapshot
+
+
+def _put(db, student_id, created_at, updated_at=None, **fields):
+    record = {"student_id": student_id, "created_at": created_at, "average_marks": 50.5, **fields}
+    if updated_at:
+        record["updated_at"] = updated_at
+    db.collection("training_students").document(student_id).set(record)
+
+
+@pytest.fixture
+def snapshot(local_db, tmp_path):
+    return TrainingSnapshot(local_db, cache_dir=tmp_path / "cache")
+
+
+def _marks(snapshot):
+    df = snapshot.load()
+    return dict(zip(df["student_id"], df["average_marks"]))
+
+
+def test_first_sync_reads_everything(local_db, snapshot):
+    for i in range(3):
+        _put(local_db, f"S{i}", f"2026-01-0{i + 1}T00:00:00")
+
+    result = snapshot.sync()
+    assert result["mode"] == "full"
+    assert result["rows"] == 3
+    assert snapshot.meta()["high_water"] == "2026-01-03T00:00:00"
+
+
+def test_incremental_sync_picks_up_new_documents_only(local_db, snapshot):
+    for i in range(3):
+        _put(local_db, f"S{i}", f"2026-01-0{i + 1}T00:00:00")
+    snapshot.sync()
+
+    _put(local_db, "S9", "2026-01-05T00:00:00")
+    result = snapshot.sync()
+    assert result["mode"] == "incremental"
+    # the document at the mark is read again but not re-applied
+    assert result["documents_read"] == 1
+    assert result["rows"] == 4
+
+    assert snapshot.sync()["documents_read"] == 0
+
+
+def test_incremental_sync_picks_up_edits(local_db, snapshot):
+    _put(local_db, "S0", "2026-01-01T00:00:00")
+    _put(local_db, "S1", "2026-01-02T00:00:00")
+    snapshot.sync()
+
+    # an older student rewritten after the mark
+    _put(local_db, "S0", "2026-01-01T00:00:00", updated_at="2026-02-01T00:00:00", average_marks=91.0)
+    result = snapshot.sync()
+
+    assert result["mode"] == "incremental"
+    assert result["rows"] == 2
+    assert result["high_water"] == "2026-02-01T00:00:00"
+    assert _marks(snapshot) == {"S0": 91.0, "S1": 50.5}
+
+
+def test_full_sync_drops_deleted_documents(local_db, snapshot):
+    _put(local_db, "S0", "2026-01-01T00:00:00")
+    _put(local_db, "S1", "2026-01-02T00:00:00")
+    snapshot.sync()
+
+    local_db.collection("training_students").document("S0").delete()
+    assert snapshot.sync()["rows"] == 2
+    assert snapshot.sync(full=True)["rows"] == 1
+
+
+def test_load_maps_the_file_and_leaves_no_temporary_files(local_db, snapshot):
+    for i in range(3):
+        _put(local_db, f"S{i}", f"2026-01-0{i + 1}T00:00:00")
+    snapshot.sync()
+
+    marks = snapshot.load()["average_marks"].to_numpy()
+    # backed by the mapped file, not a private copy
+    assert not marks.flags.owndata
+    assert not marks.flags.writeable
+
+    files = sorted(p.name for p in snapshot.path.parent.iterdir())
+    assert files == ["training_students.arrow", "training_students.json"]
+
+
+def test_concurrent_writers_use_their_own_temp_files(local_db, tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    for i in range(20):
+        _put(local_db, f"S{i}", f"2026-01-{i + 1:02d}T00:00:00")
+    # separate instances share the directory but not the lock, like separate workers
+    writers = [TrainingSnapshot(local_db, cache_dir=tmp_path / "cache") for _ in range(4)]
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(lambda s: s.sync(), writers))
+
+    assert all(r["rows"] == 20 for r in results)
+    assert len(_marks(writers[0])) == 20
+    assert not list((tmp_path / "cache").glob("*.tmp"))